@@ -1,12 +1,29 @@
 """多智能体旅行规划系统"""
 
-import json
+import threading
 import time
-from typing import Dict, Any, List
-from aitravelplanner_core import SimpleAgent, MCPTool
-from ..services.llm_service import get_llm
-from ..models.schemas import TripRequest, TripPlan, DayPlan, Attraction, Meal, WeatherInfo, Location, Hotel
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from aitravelplanner_core import SimpleAgent
+from ..services.amap_service import get_amap_mcp_tool, get_amap_service
+from ..services.cache_backend import SharedCache, stable_key
+from ..services.cassette import cassette_call, record_reference
+from ..services.city_pack import get_city_pack
+from ..services.deadline import Deadline, DeadlineExceeded, current_deadline
+from ..services.degraded_plan import PartialResults, build_degraded_plan
+from ..services.gazetteer import canonical_city
+from ..services.hedging import HedgePolicy, run_hedged
+from ..services.metrics import REGISTRY, RETRIES, bind_context, span, stage_timings_var
+from ..services.llm_cache import discard_last_completion
+from ..services.llm_service import get_llm, get_llm_for
+from ..services.plan_edit import finalize_edit, shift_plan_dates
+from ..services.multi_city import build_city_requests, split_days, stitch_plans
+from ..services.plan_store import save_plan
+from ..services.poi_candidates import format_candidates
+from ..services.poi_retrieval import city_center, rank_candidates, retrieve_candidates
+from ..models.schemas import TripRequest, MultiCityTripRequest, TripPlan, TripEditRequest, DayPlan, WeatherInfo, Hotel
 from ..config import get_settings
+from ..logging_config import log_preview, logger
 
 # ============ Agent提示词 ============
 
@@ -72,6 +89,25 @@ HOTEL_AGENT_PROMPT = """你是酒店推荐专家。你的任务是根据城市
 3. 关键词使用"酒店"或"宾馆"
 """
 
+PLANNER_TIER = REGISTRY.counter(
+    "aitp_planner_tier_total", "Trip plans by the model tier that produced them (fast/strong/fallback)", ("tier",)
+)
+DEGRADED_PLANS = REGISTRY.counter(
+    "aitp_degraded_plans_total", "Plans assembled locally from partial results (deadline/error/unparsable)", ("cause",)
+)
+
+# 降级原因中各阶段的名称
+_STAGE_LABELS = {"attraction": "景点检索", "weather": "天气查询", "hotel": "酒店检索", "planner": "行程规划"}
+
+
+def _request_deadline(deadline_seconds: Optional[float]) -> Deadline:
+    """本次规划的截止时间: 未指定时沿用外层已生效的截止时间(异步任务取消/超时时会使其到期)"""
+    if deadline_seconds is None:
+        active = current_deadline()
+        if active is not None:
+            return active
+    return Deadline(deadline_seconds or get_settings().plan_deadline_seconds)
+
 PLANNER_AGENT_PROMPT = """你是行程规划专家。你的任务是根据景点信息和天气信息,生成详细的旅行计划。
 
 请严格按照以下JSON格式返回旅行计划:
@@ -152,59 +188,92 @@ PLANNER_AGENT_PROMPT = """你是行程规划专家。你的任务是根据景点
 """
 
 
+DAY_EDITOR_PROMPT = """你是行程调整专家。你的任务是根据用户的修改要求,只重新安排旅行计划中的某一天。
+
+请严格按照以下JSON格式返回这一天的安排(只返回这一天,不要返回整个行程):
+```json
+{
+  "date": "YYYY-MM-DD",
+  "day_index": 0,
+  "description": "当天行程概述",
+  "transportation": "交通方式",
+  "accommodation": "住宿类型",
+  "hotel": {
+    "name": "酒店名称",
+    "address": "酒店地址",
+    "location": {"longitude": 116.397128, "latitude": 39.916527},
+    "estimated_cost": 400
+  },
+  "attractions": [
+    {
+      "name": "景点名称",
+      "address": "详细地址",
+      "location": {"longitude": 116.397128, "latitude": 39.916527},
+      "visit_duration": 120,
+      "description": "景点详细描述",
+      "category": "景点类别",
+      "ticket_price": 60
+    }
+  ],
+  "meals": [
+    {"type": "breakfast", "name": "早餐推荐", "description": "早餐描述", "estimated_cost": 30},
+    {"type": "lunch", "name": "午餐推荐", "description": "午餐描述", "estimated_cost": 50},
+    {"type": "dinner", "name": "晚餐推荐", "description": "晚餐描述", "estimated_cost": 80}
+  ]
+}
+```
+
+**重要提示:**
+1. 优先从提供的候选景点中选择,不要与其他天已安排的景点重复
+2. 用户没有要求修改的内容(酒店、其余景点)保持不变
+3. 每天必须包含早中晚三餐,并给出门票和餐饮的预估费用
+4. 景点的经纬度坐标要真实准确
+"""
+
+
 class MultiAgentTripPlanner:
     """多智能体旅行规划系统"""
 
     def __init__(self):
         """初始化多智能体系统"""
-        print("🔄 开始初始化多智能体旅行规划系统...")
+        logger.info("开始初始化多智能体旅行规划系统")
 
         try:
             settings = get_settings()
             self.llm = get_llm()
-
-            # 创建共享的MCP工具(只创建一次)
-            print("  - 创建共享MCP工具...")
-            self.amap_tool = MCPTool(
-                name="amap",
-                description="高德地图服务",
-                server_command=["uvx", "amap-mcp-server"],
-                env={"AMAP_MAPS_API_KEY": settings.amap_api_key},
-                auto_expand=True
+            # 各Agent可单独配置模型(LLM_MODEL_<ROLE>),未配置时使用默认模型
+            self.planner_llm = get_llm_for("planner")
+            # 级联模式: 先用快速模型生成计划,校验失败再交给主模型
+            self.planner_fast_llm = get_llm(settings.planner_fast_model) if settings.planner_fast_model else None
+
+            # 复用全局高德MCP工具(工具结果经共享缓存跨worker去重)
+            self.amap_tool = get_amap_mcp_tool()
+
+            # 成功生成的计划按规范化请求缓存,相同请求在各worker间复用
+            self._plan_cache = SharedCache("trip_plan", ttl=settings.plan_cache_ttl_seconds)
+
+            # 创建景点搜索/天气查询/酒店推荐Agent; Agent带对话历史,并行规划时每个线程使用自己的一组
+            self._local = threading.local()
+            self._local.agents = self._create_data_agents()
+            self.attraction_agent = self._local.agents["attraction"]
+            self.weather_agent = self._local.agents["weather"]
+            self.hotel_agent = self._local.agents["hotel"]
+
+            # 景点候选检索: 各偏好的实时搜索并发执行(经过高德工具缓存与配额守卫)
+            self.amap_service = get_amap_service()
+            self._search_executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.candidate_search_concurrency), thread_name_prefix="poi-search"
             )
 
-            # 创建景点搜索Agent
-            print("  - 创建景点搜索Agent...")
-            self.attraction_agent = SimpleAgent(
-                name="景点搜索专家",
-                llm=self.llm,
-                system_prompt=ATTRACTION_AGENT_PROMPT
-            )
-            self.attraction_agent.add_tool(self.amap_tool)
-
-            # 创建天气查询Agent
-            print("  - 创建天气查询Agent...")
-            self.weather_agent = SimpleAgent(
-                name="天气查询专家",
-                llm=self.llm,
-                system_prompt=WEATHER_AGENT_PROMPT
-            )
-            self.weather_agent.add_tool(self.amap_tool)
-
-            # 创建酒店推荐Agent
-            print("  - 创建酒店推荐Agent...")
-            self.hotel_agent = SimpleAgent(
-                name="酒店推荐专家",
-                llm=self.llm,
-                system_prompt=HOTEL_AGENT_PROMPT
+            # 多城市规划时各城市并行收集数据和规划(共享全局LLM/高德限流)
+            self._city_executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.multi_city_max_parallel), thread_name_prefix="city-planner"
             )
-            self.hotel_agent.add_tool(self.amap_tool)
 
             # 创建行程规划Agent(不需要工具)
-            print("  - 创建行程规划Agent...")
             self.planner_agent = SimpleAgent(
                 name="行程规划专家",
-                llm=self.llm,
+                llm=self.planner_llm,
                 system_prompt=PLANNER_AGENT_PROMPT
             )
 
@@ -213,83 +282,185 @@ class MultiAgentTripPlanner:
             self._planner_retry_delay = 2.0  # seconds
             self._planner_section_limit = 1500  # characters
 
-            print(f"✅ 多智能体系统初始化成功")
-            print(f"   景点搜索Agent: {len(self.attraction_agent.list_tools())} 个工具")
-            print(f"   天气查询Agent: {len(self.weather_agent.list_tools())} 个工具")
-            print(f"   酒店推荐Agent: {len(self.hotel_agent.list_tools())} 个工具")
+            # 对冲模式: 规划请求超过近期耗时百分位仍未返回时并行发起第二个请求,替代"超时-等待-重试"
+            self._planner_hedge = HedgePolicy(
+                initial_delay=settings.planner_hedge_initial_delay_seconds,
+                percentile=settings.planner_hedge_percentile,
+                min_delay=settings.planner_hedge_min_delay_seconds,
+                budget_ratio=settings.planner_hedge_budget_ratio,
+            ) if settings.planner_hedge_enabled else None
+
+            logger.bind(
+                attraction_tools=len(self.attraction_agent.list_tools()),
+                weather_tools=len(self.weather_agent.list_tools()),
+                hotel_tools=len(self.hotel_agent.list_tools()),
+            ).info("多智能体系统初始化成功")
 
         except Exception as e:
-            print(f"❌ 多智能体系统初始化失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("多智能体系统初始化失败: {}", e)
             raise
     
-    def plan_trip(self, request: TripRequest) -> TripPlan:
+    def _create_data_agents(self) -> Dict[str, SimpleAgent]:
+        """创建一组数据收集Agent(景点/天气/酒店),均挂载高德MCP工具"""
+        specs = {
+            "attraction": ("景点搜索专家", ATTRACTION_AGENT_PROMPT),
+            "weather": ("天气查询专家", WEATHER_AGENT_PROMPT),
+            "hotel": ("酒店推荐专家", HOTEL_AGENT_PROMPT),
+        }
+        agents = {}
+        for role, (name, prompt) in specs.items():
+            agent = SimpleAgent(name=name, llm=get_llm_for(role), system_prompt=prompt)
+            agent.add_tool(self.amap_tool)
+            agents[role] = agent
+        return agents
+
+    def _data_agents(self) -> Dict[str, SimpleAgent]:
+        """当前线程的数据收集Agent(首次使用时创建)"""
+        agents = getattr(self._local, "agents", None)
+        if agents is None:
+            agents = self._local.agents = self._create_data_agents()
+        return agents
+
+    def plan_trip(self, request: TripRequest, deadline_seconds: Optional[float] = None) -> TripPlan:
         """
         使用多智能体协作生成旅行计划
 
         Args:
             request: 旅行请求
+            deadline_seconds: 截止时间(秒),默认沿用外层已生效的截止时间(如异步任务),
+                否则使用PLAN_DEADLINE_SECONDS; 到期时返回降级计划
 
         Returns:
             旅行计划
         """
+        started = time.perf_counter()
+        # 保存计划并分配plan_id,之后可直接按ID读取,无需重新规划
+        with _request_deadline(deadline_seconds).activate():
+            trip_plan = save_plan(self._plan_trip(request))
+        # 录制模式下保存最终计划,离线回放时用于比对输出
+        record_reference(
+            "plan", "trip",
+            {"request": request.model_dump(mode="json")},
+            trip_plan.model_dump(mode="json"),
+            time.perf_counter() - started,
+        )
+        return trip_plan
+
+    def _plan_trip(self, request: TripRequest) -> TripPlan:
+        # 由plan_trip/plan_multi_city激活; 直接调用时单独计时(不取消进行中的LLM请求)
+        deadline = current_deadline() or Deadline(get_settings().plan_deadline_seconds)
+        # 各阶段已获得的候选,到期或出错时用于组装降级计划
+        partial = PartialResults()
         try:
-            print(f"\n{'='*60}")
-            print(f"🚀 开始多智能体协作规划旅行...")
-            print(f"目的地: {request.city}")
-            print(f"日期: {request.start_date} 至 {request.end_date}")
-            print(f"天数: {request.travel_days}天")
-            print(f"偏好: {', '.join(request.preferences) if request.preferences else '无'}")
-            print(f"{'='*60}\n")
-
-            # 步骤1: 景点搜索Agent搜索景点
-            print("📍 步骤1: 搜索景点...")
-            attraction_query = self._build_attraction_query(request)
-            attraction_response = self.attraction_agent.run(attraction_query)
-            print(f"景点搜索结果: {attraction_response[:200]}...\n")
+            # 统一目的地写法("北京市"/"帝都"/"Beijing"),保证缓存键和工具参数一致
+            request = request.model_copy(update={"city": canonical_city(request.city)})
+
+            logger.bind(
+                city=request.city,
+                start_date=request.start_date,
+                end_date=request.end_date,
+                travel_days=request.travel_days,
+                preferences=request.preferences,
+            ).info("开始多智能体协作规划旅行")
+
+            cache_key = self._plan_cache_key(request)
+            cached = self._plan_cache.get(cache_key)
+            if cached is not None:
+                logger.info("命中行程计划缓存")
+                return TripPlan.model_validate(cached)
+
+            agents = self._data_agents()
+
+            # 步骤1: 按全部偏好检索景点候选(离线数据包优先,未覆盖的偏好并发搜索),排序后交给规划Agent
+            attraction_response = self._collect_attractions(request, agents["attraction"], deadline, partial)
+            log_preview("景点搜索结果", attraction_response, stage="attraction")
 
             # 步骤2: 天气查询Agent查询天气
-            print("🌤️  步骤2: 查询天气...")
             weather_query = f"请查询{request.city}的天气信息"
-            weather_response = self.weather_agent.run(weather_query)
-            print(f"天气查询结果: {weather_response[:200]}...\n")
+            weather_response = deadline.run("weather", self._run_agent, agents["weather"], "weather", weather_query)
+            log_preview("天气查询结果", weather_response, stage="weather")
 
-            # 步骤3: 酒店推荐Agent搜索酒店
-            print("🏨 步骤3: 搜索酒店...")
-            hotel_query = f"请搜索{request.city}的{request.accommodation}酒店"
-            hotel_response = self.hotel_agent.run(hotel_query)
-            print(f"酒店搜索结果: {hotel_response[:200]}...\n")
+            # 步骤3: 酒店候选同样优先取数据包,城市不在数据包中时由酒店推荐Agent搜索
+            hotel_response = self._collect_hotels(request, agents["hotel"], deadline, partial)
+            log_preview("酒店搜索结果", hotel_response, stage="hotel")
 
             # 步骤4: 行程规划Agent整合信息生成计划
-            print("📋 步骤4: 生成行程计划...")
             planner_query = self._build_planner_query(request, attraction_response, weather_response, hotel_response)
-            planner_response = self._run_planner_with_retry(planner_query)
-            print(f"行程规划结果: {planner_response[:300]}...\n")
+            planner_response, trip_plan, tier = deadline.run("planner", self._generate_plan, planner_query)
+            log_preview("行程规划结果", planner_response, stage="planner")
 
-            # 解析最终计划
-            trip_plan = self._parse_response(planner_response, request)
+            # 只缓存解析成功的计划,备用方案不缓存
+            if trip_plan is None:
+                logger.warning("行程解析失败,将使用备用方案生成计划")
+                return self._create_fallback_plan(request, partial, "行程规划结果无法解析", cause="unparsable")
+            self._plan_cache.set(cache_key, trip_plan.model_dump(mode="json"))
 
-            print(f"{'='*60}")
-            print(f"✅ 旅行计划生成完成!")
-            print(f"{'='*60}\n")
+            logger.bind(tier=tier, stages=stage_timings_var.get()).info("旅行计划生成完成")
 
             return trip_plan
 
+        except DeadlineExceeded as exc:
+            # 落后的阶段可能仍在使用本线程的Agent,下次规划时重新创建一组
+            self._local.agents = None
+            logger.bind(stage=exc.stage, budget=exc.budget, stages=stage_timings_var.get()).warning(
+                "规划超出截止时间,使用已获得的结果生成降级计划"
+            )
+            reason = f"规划超出截止时间({exc.budget:g}秒),{_STAGE_LABELS.get(exc.stage, exc.stage)}未完成"
+            return self._create_fallback_plan(request, partial, reason, cause="deadline")
+
         except Exception as e:
-            print(f"❌ 生成旅行计划失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return self._create_fallback_plan(request)
+            logger.exception("生成旅行计划失败: {}", e)
+            return self._create_fallback_plan(request, partial, "规划过程出错", cause="error")
     
-    def _build_attraction_query(self, request: TripRequest) -> str:
+    @staticmethod
+    def _plan_cache_key(request: TripRequest) -> str:
+        """规范化请求作为缓存键(偏好顺序不影响结果)"""
+        data = request.model_dump(mode="json")
+        data["preferences"] = sorted(data.get("preferences") or [])
+        return stable_key(data)
+
+    def _collect_attractions(
+        self, request: TripRequest, agent: SimpleAgent, deadline: Deadline, partial: PartialResults
+    ) -> str:
+        """景点信息: 每个偏好各取候选(数据包优先,其余并发实时搜索),合并排序后取前K个"""
+        settings = get_settings()
+        with span("candidates", "attraction"):
+            # 实时搜索最多等待剩余时间,到期时使用已返回的部分结果
+            candidates = retrieve_candidates(
+                request.city,
+                request.preferences,
+                pack=get_city_pack(),
+                search=self.amap_service.search_candidates,
+                executor=self._search_executor,
+                pack_limit=settings.city_pack_attractions,
+                top_k=settings.candidate_top_k,
+                timeout=deadline.remaining(),
+            )
+        partial.attractions = candidates
+        deadline.check("attraction")
+        if candidates:
+            return format_candidates(candidates)
+        # 所有来源都没有候选(如高德直连搜索失败)时退回景点搜索Agent
+        return deadline.run("attraction", self._run_agent, agent, "attraction", self._build_attraction_query(request))
+
+    def _collect_hotels(
+        self, request: TripRequest, agent: SimpleAgent, deadline: Deadline, partial: PartialResults
+    ) -> str:
+        """酒店信息: 数据包中有该城市时直接使用,否则实时搜索"""
+        pack = get_city_pack()
+        if pack is not None:
+            with span("city_pack", "hotel"):
+                partial.hotels = pack.hotels(request.city, request.accommodation, limit=get_settings().city_pack_hotels)
+            if partial.hotels:
+                return format_candidates(partial.hotels)
+        hotel_query = f"请搜索{request.city}的{request.accommodation}酒店"
+        return deadline.run("hotel", self._run_agent, agent, "hotel", hotel_query)
+
+    def _build_attraction_query(self, request: TripRequest, keywords: Optional[str] = None) -> str:
         """构建景点搜索查询 - 直接包含工具调用"""
-        keywords = []
-        if request.preferences:
-            # 只取第一个偏好作为关键词
-            keywords = request.preferences[0]
-        else:
-            keywords = "景点"
+        if not keywords:
+            # 未指定时只取第一个偏好作为关键词
+            keywords = request.preferences[0] if request.preferences else "景点"
 
         # 直接返回工具调用格式
         query = f"请使用amap_maps_text_search工具搜索{request.city}的{keywords}相关景点。\n[TOOL_CALL:amap_maps_text_search:keywords={keywords},city={request.city}]"
@@ -341,117 +512,293 @@ class MultiAgentTripPlanner:
         cleaned = raw_text.strip()
         limit = getattr(self, "_planner_section_limit", None)
         if limit and len(cleaned) > limit:
-            print(f"ℹ️ {section_name}内容较长,已截断至{limit}字符以内以提升响应速度")
+            logger.debug("{}内容较长,已截断至{}字符以内", section_name, limit)
             return cleaned[:limit].rstrip() + "..."
         return cleaned
 
-    def _run_planner_with_retry(self, query: str) -> str:
-        """对行程规划Agent进行有限次重试"""
+    @staticmethod
+    def _run_agent(agent: SimpleAgent, target: str, query: str) -> str:
+        """运行单个Agent(计时,并经过cassette录制/回放)"""
+        # 每次规划相互独立,清空上一次的对话历史,避免提示词无限增长且无法命中补全缓存
+        agent.clear_history()
+        with span("agent", target):
+            return cassette_call("agent", target, {"input": query}, agent.run, query)
+
+    def _generate_plan(self, query: str) -> Tuple[str, Optional[TripPlan], str]:
+        """
+        生成并解析计划; 配置了快速模型时先用快速模型,结果通过TripPlan校验则直接采用,否则升级到主模型
+
+        Returns:
+            (规划Agent原始输出, 解析后的计划或None, 模型层级fast/strong)
+        """
+        if self.planner_fast_llm is not None:
+            agent = SimpleAgent(name="行程规划专家", llm=self.planner_fast_llm, system_prompt=PLANNER_AGENT_PROMPT)
+            try:
+                with span("planner_attempt", "planner_fast"):
+                    response = cassette_call("agent", "planner_fast", {"input": query}, agent.run, query)
+                trip_plan = self._try_parse_response(response)
+                if trip_plan is not None:
+                    PLANNER_TIER.inc(tier="fast")
+                    return response, trip_plan, "fast"
+                logger.info("快速模型的规划结果未通过校验,升级到主模型")
+            except Exception as exc:
+                logger.warning("快速模型规划失败,升级到主模型: {}", exc)
+
+        response, trip_plan = self._run_planner_with_retry(query)
+        if trip_plan is not None:
+            PLANNER_TIER.inc(tier="strong")
+        return response, trip_plan, "strong"
+
+    def _run_planner_with_retry(self, query: str) -> Tuple[str, Optional[TripPlan]]:
+        """
+        对行程规划Agent进行有限次重试(启用对冲时改为对冲请求)
+
+        Returns:
+            (规划Agent原始输出, 解析后的计划或None); 每个输出只解析一次
+        """
+        if self._planner_hedge is not None:
+            return self._run_planner_hedged(query)
+
         max_retries = getattr(self, "_planner_max_retries", 1)
         delay = getattr(self, "_planner_retry_delay", 1.0)
         last_error = None
 
         for attempt in range(1, max_retries + 1):
             try:
-                print(f"🧠 行程规划Agent尝试 {attempt}/{max_retries} ...")
-                return self.planner_agent.run(query)
+                logger.debug("行程规划Agent尝试 {}/{}", attempt, max_retries)
+                if attempt > 1:
+                    RETRIES.inc(stage="planner")
+                self.planner_agent.clear_history()
+                with span("planner_attempt", "planner"):
+                    response = cassette_call("agent", "planner", {"input": query}, self.planner_agent.run, query)
+                return response, self._try_parse_response(response)
             except Exception as exc:
                 last_error = exc
-                print(f"⚠️ 行程规划第{attempt}次失败: {exc}")
+                logger.warning("行程规划第{}次失败: {}", attempt, exc)
+                # 已超出截止时间(请求被取消)时不再重试
+                deadline = current_deadline()
+                if deadline is not None and deadline.expired:
+                    break
                 if attempt < max_retries:
                     time.sleep(delay)
 
         # 所有尝试都失败,抛出最后一次异常交由上层处理
         raise last_error
+
+    def _run_planner_hedged(self, query: str) -> Tuple[str, Optional[TripPlan]]:
+        """对冲执行行程规划: 先返回可解析计划的请求胜出,失败或无效时立即补发"""
+
+        def attempt() -> Tuple[str, Optional[TripPlan]]:
+            # 并行的尝试各用独立的Agent,避免共享对话历史; 解析也在尝试线程内完成,结果随输出一起返回
+            agent = SimpleAgent(name="行程规划专家", llm=self.planner_llm, system_prompt=PLANNER_AGENT_PROMPT)
+            with span("planner_attempt", "planner"):
+                response = cassette_call("agent", "planner", {"input": query}, agent.run, query)
+            return response, self._try_parse_response(response)
+
+        return run_hedged(
+            attempt,
+            self._planner_hedge,
+            is_valid=lambda result: result[1] is not None,
+            stage="planner",
+            max_attempts=max(2, self._planner_max_retries),
+        )
     
-    def _parse_response(self, response: str, request: TripRequest) -> TripPlan:
+    def _try_parse_response(self, response: str) -> Optional[TripPlan]:
         """
-        解析Agent响应
-        
-        Args:
-            response: Agent响应文本
-            request: 原始请求
-            
-        Returns:
-            旅行计划
+        解析Agent响应,失败时返回None
+
+        LLM输出只在这里校验一次: JSON文本直接交给pydantic-core解析并校验(不经过中间dict),
+        得到的TripPlan之后视为可信,包装进响应模型或缓存时不再重复校验。
         """
         try:
-            # 尝试从响应中提取JSON
-            # 查找JSON代码块
-            if "```json" in response:
-                json_start = response.find("```json") + 7
-                json_end = response.find("```", json_start)
-                json_str = response[json_start:json_end].strip()
-            elif "```" in response:
-                json_start = response.find("```") + 3
-                json_end = response.find("```", json_start)
-                json_str = response[json_start:json_end].strip()
-            elif "{" in response and "}" in response:
-                # 直接查找JSON对象
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                json_str = response[json_start:json_end]
-            else:
-                raise ValueError("响应中未找到JSON数据")
-            
-            # 解析JSON
-            data = json.loads(json_str)
-            
-            # 转换为TripPlan对象
-            trip_plan = TripPlan(**data)
-            
-            return trip_plan
-            
+            return TripPlan.model_validate_json(self._extract_json(response))
         except Exception as e:
-            print(f"⚠️  解析响应失败: {str(e)}")
-            print(f"   将使用备用方案生成计划")
-            return self._create_fallback_plan(request)
+            logger.warning("解析响应失败: {}", e)
+            # 无法解析的回复不能留在补全缓存中,否则重试/对冲会立即得到同一个回复
+            discard_last_completion()
+            return None
+
+    @staticmethod
+    def _extract_json(response: str) -> str:
+        """从Agent响应中提取JSON文本(代码块优先,其次是最外层的花括号)"""
+        # 查找JSON代码块
+        if "```json" in response:
+            json_start = response.find("```json") + 7
+            json_end = response.find("```", json_start)
+            json_str = response[json_start:json_end].strip()
+        elif "```" in response:
+            json_start = response.find("```") + 3
+            json_end = response.find("```", json_start)
+            json_str = response[json_start:json_end].strip()
+        elif "{" in response and "}" in response:
+            # 直接查找JSON对象
+            json_start = response.find("{")
+            json_end = response.rfind("}") + 1
+            json_str = response[json_start:json_end]
+        else:
+            raise ValueError("响应中未找到JSON数据")
+        return json_str
     
-    def _create_fallback_plan(self, request: TripRequest) -> TripPlan:
-        """创建备用计划(当Agent失败时)"""
-        from datetime import datetime, timedelta
-        
-        # 解析日期
-        start_date = datetime.strptime(request.start_date, "%Y-%m-%d")
-        
-        # 创建每日行程
-        days = []
-        for i in range(request.travel_days):
-            current_date = start_date + timedelta(days=i)
-            
-            day_plan = DayPlan(
-                date=current_date.strftime("%Y-%m-%d"),
-                day_index=i,
-                description=f"第{i+1}天行程",
-                transportation=request.transportation,
-                accommodation=request.accommodation,
-                attractions=[
-                    Attraction(
-                        name=f"{request.city}景点{j+1}",
-                        address=f"{request.city}市",
-                        location=Location(longitude=116.4 + i*0.01 + j*0.005, latitude=39.9 + i*0.01 + j*0.005),
-                        visit_duration=120,
-                        description=f"这是{request.city}的著名景点",
-                        category="景点"
-                    )
-                    for j in range(2)
-                ],
-                meals=[
-                    Meal(type="breakfast", name=f"第{i+1}天早餐", description="当地特色早餐"),
-                    Meal(type="lunch", name=f"第{i+1}天午餐", description="午餐推荐"),
-                    Meal(type="dinner", name=f"第{i+1}天晚餐", description="晚餐推荐")
-                ]
+    def plan_multi_city(self, request: MultiCityTripRequest, deadline_seconds: Optional[float] = None) -> TripPlan:
+        """
+        多城市规划: 按天数拆分为单城市请求并行规划,再拼接为一个计划(城市之间插入城际交通日)
+
+        总耗时接近最慢的单个城市; 各城市的LLM和高德调用共享全局限流与缓存,也共享同一个截止时间。
+
+        Args:
+            request: 多城市请求
+            deadline_seconds: 截止时间(秒),默认沿用外层已生效的截止时间(如异步任务),
+                否则使用PLAN_DEADLINE_SECONDS; 到期时未完成的城市返回降级计划
+
+        Returns:
+            拼接后的旅行计划
+
+        Raises:
+            ValueError: 天数分配不合法
+        """
+        city_requests = build_city_requests(request, split_days(request))
+        logger.bind(
+            cities=[city_request.city for city_request in city_requests],
+            city_days=[city_request.travel_days for city_request in city_requests],
+        ).info("开始多城市并行规划")
+
+        with _request_deadline(deadline_seconds).activate():
+            futures = [
+                self._city_executor.submit(bind_context(self._plan_trip, city_request))
+                for city_request in city_requests
+            ]
+            plans = [future.result() for future in futures]
+        return save_plan(stitch_plans(request, plans))
+
+    def edit_plan(self, edit: TripEditRequest) -> TripPlan:
+        """
+        增量编辑已有计划: 替换景点/重新生成某一天只调用一次LLM,平移日期不调用LLM;
+        预算和天气在本地重新计算
+
+        Args:
+            edit: 编辑请求
+
+        Returns:
+            编辑后的旅行计划
+
+        Raises:
+            ValueError: 编辑参数与计划不匹配
+        """
+        # 编辑结果作为新计划保存,原计划保持不变
+        return save_plan(self._edit_plan(edit))
+
+    def _edit_plan(self, edit: TripEditRequest) -> TripPlan:
+        plan = edit.plan
+        logger.bind(action=edit.action, day_index=edit.day_index, city=plan.city).info("开始增量编辑旅行计划")
+
+        if edit.action == "shift_dates":
+            if not edit.new_start_date:
+                raise ValueError("平移日期需要提供new_start_date")
+            shifted = shift_plan_dates(plan, edit.new_start_date)
+            return finalize_edit(shifted, shifted.days, weather_source=plan.weather_info)
+
+        position = next((i for i, day in enumerate(plan.days) if day.day_index == edit.day_index), None)
+        if position is None:
+            raise ValueError(f"计划中不存在第{edit.day_index}天")
+        day = plan.days[position]
+        if edit.action == "replace_attraction" and (
+            edit.attraction_index is None or edit.attraction_index >= len(day.attractions)
+        ):
+            raise ValueError(f"第{edit.day_index}天不存在第{edit.attraction_index}个景点")
+
+        # 候选景点与生成计划时走同一条检索路径(数据包优先,实时搜索参数一致,命中同一份工具缓存),
+        # 去重排序后再交给调整Agent; 指定了替换目标时按该关键词检索
+        settings = get_settings()
+        with span("candidates", "day_editor"):
+            candidates = retrieve_candidates(
+                canonical_city(plan.city),
+                [edit.replacement] if edit.replacement else edit.preferences,
+                pack=get_city_pack(),
+                search=self.amap_service.search_candidates,
+                executor=self._search_executor,
+                pack_limit=settings.city_pack_attractions,
+                top_k=settings.candidate_top_k,
             )
-            days.append(day_plan)
-        
-        return TripPlan(
-            city=request.city,
-            start_date=request.start_date,
-            end_date=request.end_date,
-            days=days,
-            weather_info=[],
-            overall_suggestions=f"这是为您规划的{request.city}{request.travel_days}日游行程,建议提前查看各景点的开放时间。"
-        )
+
+        query = self._build_day_edit_query(edit, day, format_candidates(candidates))
+        # 并发编辑各用独立的Agent,避免共享对话历史
+        agent = SimpleAgent(name="行程调整专家", llm=self.planner_llm, system_prompt=DAY_EDITOR_PROMPT)
+        response = self._run_agent(agent, "day_editor", query)
+        log_preview("行程调整结果", response, stage="day_editor")
+
+        try:
+            new_day = DayPlan.model_validate_json(self._extract_json(response))
+        except Exception as exc:
+            discard_last_completion()
+            raise RuntimeError(f"无法解析调整后的行程: {exc}") from exc
+        # 日期与序号以原计划为准,LLM未返回酒店时沿用原酒店
+        new_day = new_day.model_copy(update={
+            "date": day.date,
+            "day_index": day.day_index,
+            "hotel": new_day.hotel or day.hotel,
+        })
+
+        days = list(plan.days)
+        days[position] = new_day
+        return finalize_edit(plan, days)
+
+    def _build_day_edit_query(self, edit: TripEditRequest, day: DayPlan, candidates: str) -> str:
+        """构建单日调整查询"""
+        other_attractions = [
+            attraction.name
+            for other in edit.plan.days if other.day_index != day.day_index
+            for attraction in other.attractions
+        ]
+        if edit.action == "replace_attraction":
+            target = day.attractions[edit.attraction_index].name
+            task = f"把景点「{target}」替换为{edit.replacement or '一个更合适的景点'},其余景点保持不变"
+        else:
+            task = "重新安排这一天的景点和餐饮"
+
+        query = f"""请调整{edit.plan.city}旅行计划中第{day.day_index + 1}天({day.date})的安排:
+
+**修改要求:** {task}
+**偏好:** {', '.join(edit.preferences) if edit.preferences else '无'}
+
+**当天原安排:**
+{day.model_dump_json(exclude_none=True)}
+
+**其他天已安排的景点(不要重复):** {', '.join(other_attractions) if other_attractions else '无'}
+
+**候选景点:**
+{self._prepare_section_for_planner(candidates, "候选景点")}
+"""
+        if edit.instruction:
+            query += f"\n**额外要求:** {edit.instruction}"
+
+        return query
+
+    def _create_fallback_plan(
+        self,
+        request: TripRequest,
+        partial: Optional[PartialResults] = None,
+        reason: str = "行程规划失败",
+        cause: str = "error",
+    ) -> TripPlan:
+        """
+        创建备用计划(Agent失败或超出截止时间时): 用已获得的候选在本地组装,不调用LLM或外部服务
+
+        尚未获得候选时从离线数据包补充(本地读取); 数据包也没有该城市时只返回每日框架。
+        """
+        PLANNER_TIER.inc(tier="fallback")
+        DEGRADED_PLANS.inc(cause=cause)
+        partial = partial or PartialResults()
+        pack = get_city_pack()
+        if pack is not None and not partial.attractions:
+            # 偏好不在数据包的关键词中时,用通用的"景点"兜底,偏好匹配的候选在排序中仍靠前
+            keywords = list(dict.fromkeys([*request.preferences, "景点"]))
+            candidates, _ = pack.attractions(request.city, keywords, limit=get_settings().city_pack_attractions)
+            partial.attractions = rank_candidates(
+                candidates, keywords, city_center(request.city), get_settings().candidate_top_k
+            )
+        if pack is not None and not partial.hotels:
+            partial.hotels = pack.hotels(request.city, request.accommodation, limit=get_settings().city_pack_hotels)
+        return build_degraded_plan(request, partial, reason)
 
 
 # 全局多智能体系统实例
@@ -0,0 +1,202 @@
+"""HTTP缓存与压缩中间件
+
+- GET的200 JSON响应计算强ETag(响应体SHA-256),If-None-Match命中时返回304且不带响应体
+- Cache-Control由路由在成功取得真实数据时通过cache_headers()设置: POI详情/图片较长,天气较短,
+  按内容寻址的计划可永久缓存; 中间件不按路由统一添加,避免把以200返回的失败结果缓存下来
+- 超过阈值的JSON/文本响应按Accept-Encoding协商压缩(br需要安装brotli,否则使用gzip)
+压缩后的表示使用带编码后缀的ETag(如"<hash>-gzip"),If-None-Match按弱比较忽略后缀。
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import get_settings
+from ..services.metrics import REGISTRY
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+NOT_MODIFIED = REGISTRY.counter(
+    "aitp_http_not_modified_total", "Conditional requests answered with 304", ("route",)
+)
+COMPRESSED = REGISTRY.counter(
+    "aitp_http_compressed_total", "Responses compressed by the HTTP cache middleware", ("encoding",)
+)
+
+# 路由模板(不含/api前缀) -> Cache-Control; 未列出的路由只有ETag,由客户端自行决定是否复用
+CACHE_POLICIES: Dict[str, str] = {
+    "/poi/detail/{poi_id}": "public, max-age=86400, stale-while-revalidate=3600",
+    "/poi/photo": "public, max-age=86400",
+    "/poi/search": "public, max-age=3600",
+    "/map/poi": "public, max-age=3600",
+    "/map/weather": "public, max-age=600",
+    # 计划ID由内容哈希得到,同一ID的内容不会变化
+    "/trip/plans/{plan_id}": "public, max-age=31536000, immutable",
+    "/trip/plans": "no-cache",
+}
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def cache_headers(route: str) -> Dict[str, str]:
+    """路由成功返回真实数据时附加的Cache-Control响应头; 未配置策略或关闭HTTP缓存时为空"""
+    policy = CACHE_POLICIES.get(route)
+    if not policy or not get_settings().http_cache_enabled:
+        return {}
+    return {"Cache-Control": policy}
+
+
+def _negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """从Accept-Encoding中选出可用的压缩算法(br优先于gzip,q=0表示拒绝)"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=min(11, level))
+    return gzip.compress(body, compresslevel=level)
+
+
+def _etag_matches(if_none_match: str, digest: str) -> bool:
+    """If-None-Match使用弱比较: 忽略W/前缀与编码后缀,只比较内容摘要"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate.split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+class HTTPCacheMiddleware:
+    """
+    ETag/条件请求、Cache-Control与响应压缩(ASGI中间件)
+
+    Args:
+        app: 下游ASGI应用
+        min_compress_bytes: 响应体达到该大小才压缩
+        compress_level: 压缩级别(gzip 1-9)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_compress_bytes: int = 1024,
+        compress_level: int = 6,
+    ):
+        self.app = app
+        self.min_compress_bytes = min_compress_bytes
+        self.compress_level = compress_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        cacheable_method = scope["method"] == "GET"
+        start: Optional[Message] = None
+        body: List[bytes] = []
+        buffering = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, buffering
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                # 只缓冲成功、可压缩且未编码的响应;图片、流式响应、304等直接透传
+                buffering = (
+                    message["status"] == 200
+                    and content_type.startswith(_COMPRESSIBLE_TYPES)
+                    and "content-encoding" not in headers
+                )
+                if buffering:
+                    start = message
+                else:
+                    await send(message)
+                return
+
+            if not buffering:
+                await send(message)
+                return
+
+            body.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(scope, request_headers, cacheable_method, start, b"".join(body), send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _finish(
+        self,
+        scope: Scope,
+        request_headers: Headers,
+        cacheable_method: bool,
+        start: Message,
+        payload: bytes,
+        send: Send,
+    ) -> None:
+        status = start["status"]
+        headers = MutableHeaders(raw=list(start["headers"]))
+        # 不同FastAPI版本中子路由的模板可能带或不带挂载前缀
+        route = getattr(scope.get("route"), "path", "").removeprefix("/api")
+
+        encoding = None
+        if len(payload) >= self.min_compress_bytes:
+            # 是否压缩取决于请求头,未压缩的响应也要声明Vary,避免CDN把未压缩版本发给支持压缩的客户端
+            headers.add_vary_header("Accept-Encoding")
+            encoding = _negotiate_encoding(request_headers.get("accept-encoding", ""))
+
+        # 已自带ETag的响应(如静态文件)由下游自行处理条件请求
+        if cacheable_method and "etag" not in headers:
+            digest = hashlib.sha256(payload).hexdigest()[:32]
+            headers["ETag"] = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+            if_none_match = request_headers.get("if-none-match")
+            if if_none_match and _etag_matches(if_none_match, digest):
+                NOT_MODIFIED.inc(route=route or "unmatched")
+                for name in ("content-length", "content-type"):
+                    if name in headers:
+                        del headers[name]
+                await send({"type": "http.response.start", "status": 304, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if encoding:
+            payload = _compress(payload, encoding, self.compress_level)
+            headers["Content-Encoding"] = encoding
+            COMPRESSED.inc(encoding=encoding)
+        headers["Content-Length"] = str(len(payload))
+
+        await send({"type": "http.response.start", "status": status, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": payload})
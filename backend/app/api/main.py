@@ -1,16 +1,34 @@
 """FastAPI主应用"""
 
 import os
+import time
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from ..config import get_settings, validate_config, print_config
+from ..logging_config import logger, setup_logging, shutdown_logging
+from ..services.city_pack import get_city_pack
+from ..services.gazetteer import get_gazetteer
+from ..services.job_service import shutdown_job_manager
+from ..services.llm_service import shutdown_llm_client
+from ..services.metrics import (
+    HTTP_INFLIGHT,
+    HTTP_LATENCY,
+    new_request_id,
+    render_metrics,
+    request_id_var,
+    stage_timings_var,
+)
+from .http_cache import HTTPCacheMiddleware
+from .responses import FastJSONResponse
 from .routes import trip, poi, map as map_routes, voice
 
 # 获取配置
 settings = get_settings()
+setup_logging()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -18,7 +36,9 @@ app = FastAPI(
     version=settings.app_version,
     description="基于AiTravelPlanner框架的智能旅行规划助手API",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # 未直接返回响应对象的路由(dict结果)也用orjson编码
+    default_response_class=FastJSONResponse,
 )
 
 # 配置CORS
@@ -30,6 +50,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ETag/条件请求、Cache-Control与响应压缩
+if settings.http_cache_enabled:
+    app.add_middleware(
+        HTTPCacheMiddleware,
+        min_compress_bytes=settings.http_compress_min_bytes,
+        compress_level=settings.http_compress_level,
+    )
+
+
+@app.middleware("http")
+async def request_context_middleware(request: Request, call_next):
+    """为每个请求分配请求ID并记录耗时,响应头回传X-Request-ID便于关联日志与指标"""
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    id_token = request_id_var.set(request_id)
+    timings_token = stage_timings_var.set({})
+    HTTP_INFLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        HTTP_INFLIGHT.dec()
+        elapsed = time.perf_counter() - started
+        # 使用路由模板作为标签,避免路径参数导致标签基数膨胀
+        route = getattr(request.scope.get("route"), "path", "") or "unmatched"
+        HTTP_LATENCY.observe(elapsed, method=request.method, route=route, status=str(status))
+        logger.bind(
+            method=request.method,
+            route=route,
+            status=status,
+            duration_ms=round(elapsed * 1000, 2),
+            stages=stage_timings_var.get(),
+        ).info("请求完成")
+        stage_timings_var.reset(timings_token)
+        request_id_var.reset(id_token)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus指标"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # 注册路由
 app.include_router(trip.router, prefix="/api")
 app.include_router(poi.router, prefix="/api")
@@ -63,6 +129,15 @@ async def startup_event():
         print(f"\n❌ 配置验证失败:\n{e}")
         print("\n请检查.env文件并确保所有必要的配置项都已设置")
         raise
+
+    # 预加载城市索引,避免首个请求承担构建开销
+    gazetteer = get_gazetteer()
+    print(f"🗺️  城市索引已加载: {len(gazetteer.entries)} 个行政区划")
+
+    # 映射离线城市数据包,规划时直接从中取景点/酒店候选
+    city_pack = get_city_pack()
+    if city_pack is not None:
+        print(f"📦 离线城市数据包已加载: {len(city_pack.cities)} 个城市, {city_pack.poi_count} 个POI")
     
     print("\n" + "="*60)
     print("📚 API文档: http://localhost:8000/docs")
@@ -77,6 +152,11 @@ async def shutdown_event():
     print("👋 应用正在关闭...")
     print("="*60 + "\n")
 
+    # 取消尚未完成的异步规划任务
+    await shutdown_job_manager()
+    shutdown_llm_client()
+    shutdown_logging()
+
 
 if not _spa_mounted:
 
@@ -0,0 +1,39 @@
+"""API响应序列化
+
+声明了response_model的路由返回模型对象时,FastAPI会按response_model再校验一遍,
+然后转成dict并用标准json模块编码;包含几十天DayPlan的计划会被完整遍历多次。
+路由中构造的响应模型已经校验过(可信),直接返回FastJSONResponse即可跳过重复校验:
+- Pydantic模型由pydantic-core一次性序列化为JSON bytes
+- 其它内容(dict/list)使用orjson编码,未安装时回退到标准json
+response_model仍保留在路由上,用于生成OpenAPI文档。
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"无法序列化类型: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """直接序列化可信内容的JSON响应"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        if orjson is not None:
+            return orjson.dumps(content, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_encode_default
+        ).encode("utf-8")
@@ -10,6 +10,9 @@ from ...models.schemas import (
     WeatherResponse
 )
 from ...services.amap_service import get_amap_service
+from ...logging_config import logger
+from ..http_cache import cache_headers
+from ..responses import FastJSONResponse
 
 router = APIRouter(prefix="/map", tags=["地图服务"])
 
@@ -43,14 +46,15 @@ async def search_poi(
         # 搜索POI
         pois = service.search_poi(keywords, city, citylimit)
         
-        return POISearchResponse(
+        # 搜索失败时结果为空,不设置缓存策略
+        return FastJSONResponse(POISearchResponse(
             success=True,
             message="POI搜索成功",
             data=pois
-        )
+        ), headers=cache_headers("/map/poi") if pois else None)
         
     except Exception as e:
-        print(f"❌ POI搜索失败: {str(e)}")
+        logger.error("POI搜索失败: {}", e)
         raise HTTPException(
             status_code=500,
             detail=f"POI搜索失败: {str(e)}"
@@ -82,14 +86,15 @@ async def get_weather(
         # 查询天气
         weather_info = service.get_weather(city)
         
-        return WeatherResponse(
+        # 查询失败时结果为空,不设置缓存策略
+        return FastJSONResponse(WeatherResponse(
             success=True,
             message="天气查询成功",
             data=weather_info
-        )
+        ), headers=cache_headers("/map/weather") if weather_info else None)
         
     except Exception as e:
-        print(f"❌ 天气查询失败: {str(e)}")
+        logger.error("天气查询失败: {}", e)
         raise HTTPException(
             status_code=500,
             detail=f"天气查询失败: {str(e)}"
@@ -125,14 +130,14 @@ async def plan_route(request: RouteRequest):
             route_type=request.route_type
         )
         
-        return RouteResponse(
+        return FastJSONResponse(RouteResponse(
             success=True,
             message="路线规划成功",
             data=route_info
-        )
+        ))
         
     except Exception as e:
-        print(f"❌ 路线规划失败: {str(e)}")
+        logger.error("路线规划失败: {}", e)
         raise HTTPException(
             status_code=500,
             detail=f"路线规划失败: {str(e)}"
@@ -2,9 +2,13 @@
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from typing import List, Optional
-from ...services.amap_service import get_amap_service
+from typing import Dict, List, Optional
+from ...services.amap_service import get_amap_service, is_failed_poi_detail
+from ...config import get_settings
 from ...services.unsplash_service import get_unsplash_service
+from ...logging_config import logger
+from ..http_cache import cache_headers
+from ..responses import FastJSONResponse
 
 router = APIRouter(prefix="/poi", tags=["POI"])
 
@@ -16,6 +20,19 @@ class POIDetailResponse(BaseModel):
     data: Optional[dict] = None
 
 
+class POIDetailBatchRequest(BaseModel):
+    """批量POI详情请求"""
+    poi_ids: List[str] = Field(..., min_length=1, description="POI ID列表(可重复,服务端去重)")
+
+
+class POIDetailBatchResponse(BaseModel):
+    """批量POI详情响应"""
+    success: bool
+    message: str
+    data: Dict[str, dict] = Field(default_factory=dict, description="POI ID -> 详情")
+    missing: List[str] = Field(default_factory=list, description="获取失败的POI ID")
+
+
 @router.get(
     "/detail/{poi_id}",
     response_model=POIDetailResponse,
@@ -37,20 +54,63 @@ async def get_poi_detail(poi_id: str):
         
         # 调用高德地图POI详情API
         result = amap_service.get_poi_detail(poi_id)
-        
-        return POIDetailResponse(
-            success=True,
-            message="获取POI详情成功",
-            data=result
-        )
-        
     except Exception as e:
-        print(f"❌ 获取POI详情失败: {str(e)}")
+        logger.error("获取POI详情失败: {}", e)
         raise HTTPException(
             status_code=500,
             detail=f"获取POI详情失败: {str(e)}"
         )
 
+    # 熔断/限流/调用失败时返回的错误文本不能作为详情返回(也不能被缓存)
+    if is_failed_poi_detail(result):
+        message = str(result.get("raw", "")) if result else ""
+        logger.warning("获取POI详情失败: {}", message[:200])
+        raise HTTPException(status_code=502, detail=f"获取POI详情失败: {message or '高德服务无结果'}")
+
+    return FastJSONResponse(
+        POIDetailResponse(success=True, message="获取POI详情成功", data=result),
+        headers=cache_headers("/poi/detail/{poi_id}"),
+    )
+
+
+@router.post(
+    "/details/batch",
+    response_model=POIDetailBatchResponse,
+    summary="批量获取POI详情",
+    description="一次获取多个POI的详情(如行程中全部景点),ID去重后有限并发获取"
+)
+async def get_poi_details_batch(request: POIDetailBatchRequest):
+    """
+    批量获取POI详情
+
+    Args:
+        request: POI ID列表
+
+    Returns:
+        批量POI详情响应
+    """
+    max_ids = get_settings().poi_batch_max_ids
+    unique_ids = list(dict.fromkeys(poi_id for poi_id in request.poi_ids if poi_id))
+    if len(unique_ids) > max_ids:
+        raise HTTPException(status_code=400, detail=f"单次最多获取{max_ids}个POI")
+
+    try:
+        details = await get_amap_service().get_poi_details(unique_ids)
+    except Exception as e:
+        logger.error("批量获取POI详情失败: {}", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"批量获取POI详情失败: {str(e)}"
+        )
+
+    missing = [poi_id for poi_id in unique_ids if poi_id not in details]
+    return FastJSONResponse(POIDetailBatchResponse(
+        success=True,
+        message=f"获取{len(details)}/{len(unique_ids)}个POI详情",
+        data=details,
+        missing=missing
+    ))
+
 
 @router.get(
     "/search",
@@ -72,14 +132,14 @@ async def search_poi(keywords: str, city: str = "北京"):
         amap_service = get_amap_service()
         result = amap_service.search_poi(keywords, city)
 
-        return {
-            "success": True,
-            "message": "搜索成功",
-            "data": result
-        }
+        # 搜索失败时结果为空,不设置缓存策略
+        return FastJSONResponse(
+            {"success": True, "message": "搜索成功", "data": result},
+            headers=cache_headers("/poi/search") if result else None,
+        )
 
     except Exception as e:
-        print(f"❌ 搜索POI失败: {str(e)}")
+        logger.error("搜索POI失败: {}", e)
         raise HTTPException(
             status_code=500,
             detail=f"搜索POI失败: {str(e)}"
@@ -111,17 +171,14 @@ async def get_attraction_photo(name: str):
             # 如果没找到,尝试只用景点名称搜索
             photo_url = unsplash_service.get_photo_url(name)
 
-        return {
-            "success": True,
-            "message": "获取图片成功",
-            "data": {
-                "name": name,
-                "photo_url": photo_url
-            }
-        }
+        # 未找到图片(可能是Unsplash调用失败)时不设置缓存策略,下次重新查询
+        return FastJSONResponse(
+            {"success": True, "message": "获取图片成功", "data": {"name": name, "photo_url": photo_url}},
+            headers=cache_headers("/poi/photo") if photo_url else None,
+        )
 
     except Exception as e:
-        print(f"❌ 获取景点图片失败: {str(e)}")
+        logger.error("获取景点图片失败: {}", e)
         raise HTTPException(
             status_code=500,
             detail=f"获取景点图片失败: {str(e)}"
@@ -1,66 +1,285 @@
 """旅行规划API路由"""
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
 from ...models.schemas import (
     TripRequest,
+    TripEditRequest,
+    MultiCityTripRequest,
+    TripPlan,
     TripPlanResponse,
+    PlanListResponse,
+    PlanningJobResponse,
     ErrorResponse
 )
 from ...agents.trip_planner_agent import get_trip_planner_agent
+from ..http_cache import cache_headers
+from ..responses import FastJSONResponse
+from ...services.job_service import JobQueueFullError, get_job_manager
+from ...services.gazetteer import canonical_city
+from ...services.metrics import bind_context
+from ...services.plan_store import get_plan_store
+from ...logging_config import logger
 
 router = APIRouter(prefix="/trip", tags=["旅行规划"])
 
 
+def _plan_message(trip_plan: TripPlan, message: str) -> str:
+    """降级结果在消息中说明原因"""
+    if trip_plan.degraded:
+        return f"部分数据未能及时获取,已返回降级计划: {trip_plan.degraded_reason}"
+    return message
+
+
 @router.post(
     "/plan",
     response_model=TripPlanResponse,
     summary="生成旅行计划",
     description="根据用户输入的旅行需求,生成详细的旅行计划"
 )
-async def plan_trip(request: TripRequest):
+async def plan_trip(
+    request: TripRequest,
+    deadline_seconds: Optional[float] = Query(None, gt=0, description="规划截止时间(秒),到期返回降级计划,默认使用服务端配置")
+):
     """
     生成旅行计划
 
     Args:
         request: 旅行请求参数
+        deadline_seconds: 规划截止时间
 
     Returns:
         旅行计划响应
     """
     try:
-        print(f"\n{'='*60}")
-        print(f"📥 收到旅行规划请求:")
-        print(f"   城市: {request.city}")
-        print(f"   日期: {request.start_date} - {request.end_date}")
-        print(f"   天数: {request.travel_days}")
-        print(f"{'='*60}\n")
+        logger.bind(
+            city=request.city,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            travel_days=request.travel_days,
+        ).info("收到旅行规划请求")
 
         # 获取Agent实例
-        print("🔄 获取多智能体系统实例...")
         agent = get_trip_planner_agent()
 
-        # 生成旅行计划
-        print("🚀 开始生成旅行计划...")
-        trip_plan = agent.plan_trip(request)
+        # 生成旅行计划(在线程池中等待各阶段,不阻塞事件循环)
+        loop = asyncio.get_running_loop()
+        trip_plan = await loop.run_in_executor(None, bind_context(agent.plan_trip, request, deadline_seconds))
+
+        return FastJSONResponse(TripPlanResponse(
+            success=True,
+            message=_plan_message(trip_plan, "旅行计划生成成功"),
+            data=trip_plan
+        ))
+
+    except Exception as e:
+        logger.exception("生成旅行计划失败: {}", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"生成旅行计划失败: {str(e)}"
+        )
+
+
+@router.post(
+    "/plan/multi-city",
+    response_model=TripPlanResponse,
+    summary="生成多城市旅行计划",
+    description="按顺序游览多个城市: 天数在城市间分配,各城市并行规划后拼接为一个计划,城市之间插入城际交通日"
+)
+async def plan_multi_city_trip(
+    request: MultiCityTripRequest,
+    deadline_seconds: Optional[float] = Query(None, gt=0, description="规划截止时间(秒),到期返回降级计划,默认使用服务端配置")
+):
+    """
+    生成多城市旅行计划
 
-        print("✅ 旅行计划生成成功,准备返回响应\n")
+    Args:
+        request: 多城市旅行请求
+        deadline_seconds: 规划截止时间
 
-        return TripPlanResponse(
+    Returns:
+        旅行计划响应
+    """
+    try:
+        logger.bind(
+            cities=request.cities,
+            start_date=request.start_date,
+            travel_days=request.travel_days,
+        ).info("收到多城市旅行规划请求")
+
+        agent = get_trip_planner_agent()
+        loop = asyncio.get_running_loop()
+        trip_plan = await loop.run_in_executor(None, bind_context(agent.plan_multi_city, request, deadline_seconds))
+
+        return FastJSONResponse(TripPlanResponse(
             success=True,
-            message="旅行计划生成成功",
+            message=_plan_message(trip_plan, "多城市旅行计划生成成功"),
             data=trip_plan
+        ))
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("生成多城市旅行计划失败: {}", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"生成多城市旅行计划失败: {str(e)}"
         )
 
+
+@router.patch(
+    "/plan",
+    response_model=TripPlanResponse,
+    summary="增量编辑旅行计划",
+    description="替换某个景点、重新生成某一天或平移日期; 只重新生成受影响的一天,预算和天气在本地重算"
+)
+async def edit_trip_plan(edit: TripEditRequest):
+    """
+    增量编辑旅行计划
+
+    Args:
+        edit: 编辑请求(包含原计划)
+
+    Returns:
+        编辑后的旅行计划
+    """
+    try:
+        agent = get_trip_planner_agent()
+        loop = asyncio.get_running_loop()
+        trip_plan = await loop.run_in_executor(None, bind_context(agent.edit_plan, edit))
+
+        return FastJSONResponse(TripPlanResponse(
+            success=True,
+            message="旅行计划修改成功",
+            data=trip_plan
+        ))
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"❌ 生成旅行计划失败: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("修改旅行计划失败: {}", e)
         raise HTTPException(
             status_code=500,
-            detail=f"生成旅行计划失败: {str(e)}"
+            detail=f"修改旅行计划失败: {str(e)}"
         )
 
 
+@router.get(
+    "/plans",
+    response_model=PlanListResponse,
+    summary="列出已保存的计划",
+    description="按城市和开始日期范围列出已保存的旅行计划摘要"
+)
+def list_trip_plans(
+    city: Optional[str] = Query(None, description="目的地城市"),
+    start_date_from: Optional[str] = Query(None, description="开始日期下限 YYYY-MM-DD"),
+    start_date_to: Optional[str] = Query(None, description="开始日期上限 YYYY-MM-DD"),
+    limit: int = Query(20, ge=1, le=100, description="返回条数"),
+    offset: int = Query(0, ge=0, description="偏移量")
+):
+    """列出已保存的计划(同步路由,在线程池中访问SQLite)"""
+    store = get_plan_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="计划存储未启用")
+    summaries = store.list(
+        city=canonical_city(city) if city else None,
+        start_date_from=start_date_from,
+        start_date_to=start_date_to,
+        limit=limit,
+        offset=offset,
+    )
+    return FastJSONResponse(
+        PlanListResponse(success=True, message=f"共{len(summaries)}条", data=summaries),
+        headers=cache_headers("/trip/plans"),
+    )
+
+
+@router.get(
+    "/plans/{plan_id}",
+    response_model=TripPlanResponse,
+    summary="获取已保存的计划",
+    description="按计划ID读取已生成的旅行计划,不会重新调用LLM"
+)
+def get_trip_plan(plan_id: str):
+    """按ID获取计划(同步路由,在线程池中访问SQLite)"""
+    store = get_plan_store()
+    trip_plan = store.get(plan_id) if store is not None else None
+    if trip_plan is None:
+        raise HTTPException(status_code=404, detail="计划不存在")
+    return FastJSONResponse(
+        TripPlanResponse(success=True, message="获取旅行计划成功", data=trip_plan),
+        headers=cache_headers("/trip/plans/{plan_id}"),
+    )
+
+
+@router.post(
+    "/jobs",
+    response_model=PlanningJobResponse,
+    status_code=202,
+    summary="提交异步规划任务",
+    description="立即返回任务ID,通过GET /api/trip/jobs/{job_id}轮询状态和结果"
+)
+async def submit_trip_job(
+    request: TripRequest,
+    deadline_seconds: Optional[float] = Query(None, gt=0, description="任务截止时间(秒),默认使用服务端配置")
+):
+    """
+    提交异步旅行规划任务
+
+    Args:
+        request: 旅行请求参数
+        deadline_seconds: 任务截止时间
+
+    Returns:
+        任务状态
+    """
+    manager = get_job_manager()
+
+    async def runner():
+        agent = await manager.run_blocking(get_trip_planner_agent)
+        # 沿用任务的截止时间(已扣除排队时间),任务取消或超时时规划随之中止
+        trip_plan = await manager.run_blocking(agent.plan_trip, request)
+        return {"data": trip_plan}
+
+    try:
+        job = manager.submit("trip", runner, deadline_seconds)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+    logger.bind(job_id=job.id, city=request.city, travel_days=request.travel_days).info("已提交规划任务")
+    return FastJSONResponse(job.to_response("规划任务已提交"), status_code=202)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=PlanningJobResponse,
+    summary="查询规划任务",
+    description="查询异步规划任务(含语音规划任务)的状态和结果"
+)
+async def get_trip_job(job_id: str):
+    """查询规划任务"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或结果已过期")
+    return FastJSONResponse(job.to_response())
+
+
+@router.delete(
+    "/jobs/{job_id}",
+    response_model=PlanningJobResponse,
+    summary="取消规划任务",
+    description="取消排队中或执行中的规划任务"
+)
+async def cancel_trip_job(job_id: str):
+    """取消规划任务"""
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或结果已过期")
+    return FastJSONResponse(job.to_response())
+
+
 @router.get(
     "/health",
     summary="健康检查",
@@ -1,9 +1,18 @@
 """语音输入相关API"""
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from typing import Optional
 
-from ...models.schemas import VoicePlanResponse, VoiceTextPlanRequest, VoiceTranscriptionResponse
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+
+from ...models.schemas import (
+    PlanningJobResponse,
+    VoicePlanResponse,
+    VoiceTextPlanRequest,
+    VoiceTranscriptionResponse,
+)
+from ...services.job_service import JobQueueFullError, get_job_manager
 from ...services.voice_service import VoiceServiceError, get_voice_service
+from ..responses import FastJSONResponse
 
 router = APIRouter(prefix="/voice", tags=["语音输入"])
 
@@ -24,13 +33,13 @@ async def transcribe_voice(audio: UploadFile = File(..., description="16k PCM WA
         suggestion = await voice_service.parse_form_suggestion(transcript)
         missing = voice_service.get_missing_fields(suggestion, require_travel_days=False)
 
-        return VoiceTranscriptionResponse(
+        return FastJSONResponse(VoiceTranscriptionResponse(
             success=True,
             message="语音解析成功",
             transcript=transcript,
             form=suggestion,
             missing_fields=missing,
-        )
+        ))
     except VoiceServiceError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
@@ -48,14 +57,14 @@ async def plan_by_voice(audio: UploadFile = File(..., description="16k PCM WAV
         audio_bytes = await audio.read()
         voice_service = get_voice_service()
         transcript, suggestion, plan = await voice_service.plan_trip_from_voice(audio_bytes)
-        return VoicePlanResponse(
+        return FastJSONResponse(VoicePlanResponse(
             success=True,
             message="语音规划成功",
             transcript=transcript,
             form=suggestion,
             missing_fields=[],
             data=plan,
-        )
+        ))
     except VoiceServiceError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
@@ -73,13 +82,73 @@ async def plan_by_voice_text(payload: VoiceTextPlanRequest):
     try:
         voice_service = get_voice_service()
         transcript, suggestion, plan = await voice_service.plan_trip_from_transcript(transcript)
-        return VoicePlanResponse(
+        return FastJSONResponse(VoicePlanResponse(
             success=True,
             message="语音文本规划成功",
             transcript=transcript,
             form=suggestion,
             missing_fields=[],
             data=plan,
-        )
+        ))
     except VoiceServiceError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _submit_voice_job(kind: str, plan, deadline_seconds: Optional[float]) -> FastJSONResponse:
+    manager = get_job_manager()
+
+    async def runner():
+        transcript, suggestion, plan_result = await plan(manager.executor)
+        return {"transcript": transcript, "form": suggestion, "data": plan_result}
+
+    try:
+        job = manager.submit(kind, runner, deadline_seconds)
+    except JobQueueFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "10"}) from exc
+    return FastJSONResponse(job.to_response("语音规划任务已提交"), status_code=202)
+
+
+@router.post(
+    "/plan/jobs",
+    response_model=PlanningJobResponse,
+    status_code=202,
+    summary="提交语音异步规划任务",
+    description="立即返回任务ID,通过GET /api/trip/jobs/{job_id}轮询结果",
+)
+async def submit_voice_plan_job(
+    audio: UploadFile = File(..., description="16k PCM WAV音频"),
+    deadline_seconds: Optional[float] = Query(None, gt=0, description="任务截止时间(秒)"),
+):
+    if not audio:
+        raise HTTPException(status_code=400, detail="请上传音频文件")
+
+    audio_bytes = await audio.read()
+    voice_service = get_voice_service()
+    return _submit_voice_job(
+        "voice",
+        lambda executor: voice_service.plan_trip_from_voice(audio_bytes, executor=executor),
+        deadline_seconds,
+    )
+
+
+@router.post(
+    "/plan-text/jobs",
+    response_model=PlanningJobResponse,
+    status_code=202,
+    summary="提交语音文本异步规划任务",
+    description="立即返回任务ID,通过GET /api/trip/jobs/{job_id}轮询结果",
+)
+async def submit_voice_text_plan_job(
+    payload: VoiceTextPlanRequest,
+    deadline_seconds: Optional[float] = Query(None, gt=0, description="任务截止时间(秒)"),
+):
+    transcript = (payload.transcript or "").strip()
+    if not transcript:
+        raise HTTPException(status_code=400, detail="请输入语音识别文本")
+
+    voice_service = get_voice_service()
+    return _submit_voice_job(
+        "voice_text",
+        lambda executor: voice_service.plan_trip_from_transcript(transcript, executor=executor),
+        deadline_seconds,
+    )
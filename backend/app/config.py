@@ -38,6 +38,18 @@ class Settings(BaseSettings):
 
     # 高德地图API配置
     amap_api_key: str = ""
+    # 高德MCP服务启动命令(压测时可指向本地替身 benchmarks.fake_amap_mcp)
+    amap_mcp_command: str = "uvx amap-mcp-server"
+    # 高德配额(每个工具): QPS、突发量、每日预算(<=0不限制); 按工具覆盖格式 tool=qps:burst:daily,逗号分隔
+    amap_qps: float = 3.0
+    amap_burst: int = 5
+    amap_daily_budget: int = 0
+    amap_tool_limits: str = ""
+    amap_max_wait_seconds: float = 2.0  # 排队超过该时间直接拒绝
+    # 高德熔断: 连续失败次数、冷却时间; 熔断/限流/失败时返回过期缓存,过期缓存保留时长
+    amap_breaker_failures: int = 5
+    amap_breaker_recovery_seconds: float = 30.0
+    amap_stale_ttl_seconds: int = 7 * 86400
 
     # Unsplash API配置
     unsplash_access_key: str = ""
@@ -47,6 +59,32 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     openai_base_url: str = "https://api.openai.com/v1"
     openai_model: str = "gpt-4"
+    llm_temperature: float = 0.7
+
+    # 按调用方配置模型,为空时使用默认模型(LLM_MODEL_ID)
+    llm_model_attraction: str = ""
+    llm_model_weather: str = ""
+    llm_model_hotel: str = ""
+    llm_model_planner: str = ""
+    llm_model_voice: str = ""
+    # 行程规划级联: 配置后先用该快速模型生成,未通过TripPlan校验再交给规划主模型
+    planner_fast_model: str = ""
+
+    # LLM客户端: 连接池、并发上限、每分钟请求数/token数限流(<=0不限制)、429/5xx重试
+    llm_max_connections: int = 20
+    llm_max_keepalive: int = 10
+    llm_max_concurrency: int = 8
+    llm_requests_per_minute: int = 120
+    llm_tokens_per_minute: int = 200000
+    llm_max_retries: int = 3
+    llm_retry_base_delay: float = 0.5
+
+    # LLM补全缓存: temperature不高于阈值的调用按消息精确匹配缓存; persist时写入共享缓存后端
+    llm_cache_enabled: bool = True
+    llm_cache_max_temperature: float = 0.3
+    llm_cache_ttl_seconds: int = 3600
+    llm_cache_max_entries: int = 512
+    llm_cache_persist: bool = False
 
     # 阿里云百炼语音识别配置
     bailian_api_key: str = ""
@@ -57,8 +95,75 @@ class Settings(BaseSettings):
     bailian_sample_rate: int = 16000
     bailian_language: str = "zh"
 
-    # 日志配置
+    # 语音表单规则抽取: 置信度达到阈值且字段齐全时跳过LLM
+    voice_rule_enabled: bool = True
+    voice_rule_min_confidence: float = 0.85
+
+    # 语音缓存: 音频哈希->识别文本, 规范化文本->表单建议
+    voice_cache_ttl_seconds: int = 1800
+    voice_cache_max_entries: int = 256
+
+    # 异步规划任务: worker数量、排队上限、单任务截止时间、结果保留时间
+    planning_job_workers: int = 2
+    planning_job_queue_size: int = 32
+    planning_job_deadline_seconds: float = 180.0
+    planning_job_retention_seconds: float = 3600.0
+
+    # 多城市规划: 同时规划的城市数上限
+    multi_city_max_parallel: int = 4
+
+    # 规划截止时间(秒): 各阶段只等待剩余时间,到期后取消进行中的调用,用已获得的数据返回降级计划
+    plan_deadline_seconds: float = 120.0
+
+    # 行程规划对冲请求: 首个请求超过近期耗时百分位仍未返回时再发一个,预算比例限制额外token花费
+    planner_hedge_enabled: bool = True
+    planner_hedge_percentile: float = 90.0
+    planner_hedge_initial_delay_seconds: float = 45.0  # 样本不足时的阈值
+    planner_hedge_min_delay_seconds: float = 5.0
+    planner_hedge_budget_ratio: float = 0.1
+
+    # 跨worker共享缓存: memory(进程内) / sqlite(本机WAL文件) / redis(Redis协议服务)
+    cache_backend: str = "memory"
+    cache_sqlite_path: str = ""  # 为空时使用系统临时目录
+    cache_redis_url: str = "redis://127.0.0.1:6379/0"
+    cache_key_prefix: str = "atp:"
+    plan_cache_ttl_seconds: int = 21600
+    photo_cache_ttl_seconds: int = 7 * 86400
+
+    # 离线城市数据包: 热门城市的景点/酒店快照(city_pack_builder构建),作为规划候选来源; 超过有效期视为过期
+    city_pack_enabled: bool = True
+    city_pack_path: str = ""  # 为空时使用app/data/city_packs.bin
+    city_pack_max_age_days: int = 30  # <=0不过期
+    city_pack_attractions: int = 100  # 每次从数据包取的景点数(再经排序取前K个)
+    city_pack_hotels: int = 8
+
+    # 景点候选检索: 每个偏好各搜索一次(并发数),合并去重并排序后交给规划Agent的候选数
+    candidate_search_concurrency: int = 4
+    candidate_top_k: int = 20
+
+    # 批量POI详情: 单次请求的ID上限与并发调用数
+    poi_batch_max_ids: int = 100
+    poi_batch_max_concurrency: int = 4
+
+    # HTTP缓存: 读接口的ETag/304与Cache-Control,以及JSON响应的gzip/br压缩
+    http_cache_enabled: bool = True
+    http_compress_min_bytes: int = 1024
+    http_compress_level: int = 6
+
+    # 行程计划存储: 生成的计划按ID保存到本机SQLite,供刷新/分享/再次查看(生产环境应配置到持久化目录)
+    plan_store_enabled: bool = True
+    plan_store_path: str = ""  # 为空时使用系统临时目录
+
+    # 日志配置: JSON结构化输出; 大段LLM/工具输出按采样率记录预览
     log_level: str = "INFO"
+    log_json: bool = True
+    log_preview_sample_rate: float = 0.1
+    log_preview_chars: int = 200
+
+    # LLM/MCP交互录制回放: off / record / replay; 回放速度0为立即返回,1为按录制耗时
+    cassette_mode: str = "off"
+    cassette_path: str = ""
+    cassette_replay_speed: float = 0.0
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,218 @@
+"""日志配置
+
+基于loguru的异步结构化日志: 请求线程只做级别判断并把调用参数入队,由后台线程构建loguru记录、格式化并写出。
+每条记录自动带上当前请求ID; 大段的LLM/工具输出按采样率记录预览。
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger as _loguru
+
+from .config import get_settings
+from .services.metrics import get_request_id
+
+_configured = False
+# 低于该级别的调用在请求线程直接返回; 0表示尚未配置,调用直接交给loguru
+_min_level = 0
+
+
+def _patch_record(record) -> None:
+    record["extra"].setdefault("request_id", get_request_id())
+
+
+def _format_json(message) -> str:
+    record = message.record
+    payload = {
+        "time": record["time"].isoformat(timespec="milliseconds"),
+        "level": record["level"].name,
+        "logger": f"{record['name']}:{record['line']}",
+        "message": record["message"],
+        **record["extra"],
+    }
+    if record["exception"] is not None:
+        payload["exception"] = str(message)[len(record["message"]):].strip()
+    return json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+
+
+class _StreamSink:
+    """loguru sink: 在调用线程(通常是日志写出线程)格式化并写入stream"""
+
+    def __init__(self, stream, as_json: bool):
+        self.stream = stream
+        self.as_json = as_json
+        self._lock = threading.Lock()
+
+    def __call__(self, message) -> None:
+        text = _format_json(message) if self.as_json else str(message)
+        with self._lock:
+            self.stream.write(text)
+
+    def flush(self) -> None:
+        with self._lock:
+            self.stream.flush()
+
+
+class _LogWriter:
+    """
+    日志写出线程: 从有界队列取出调用参数,交给loguru构建记录并写出
+
+    loguru在调用线程上构建记录(调用栈、时间、线程信息与格式化)约需数十微秒;
+    这里请求线程只入队一个元组,记录的时间、调用位置与请求ID在入队时取得,写出时回填。
+    loguru自带的enqueue基于多进程管道,每条记录都要pickle,开销更高。队列满时丢弃并计数,绝不阻塞请求线程。
+    """
+
+    def __init__(self, sink: _StreamSink, maxsize: int = 10000):
+        self.sink = sink
+        self.maxsize = maxsize
+        self.dropped = 0
+        # SimpleQueue由C实现,入队不经过Condition锁; 容量按qsize()近似控制
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._drain, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, item: tuple) -> None:
+        if self._queue.qsize() >= self.maxsize:
+            self.dropped += 1
+            return
+        self._queue.put(item)
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            try:
+                self._emit(*item)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _emit(timestamp, level, message, args, kwargs, extra, request_id, name, function, line, exception) -> None:
+        def restore(record) -> None:
+            record["time"] = type(record["time"]).fromtimestamp(timestamp, record["time"].tzinfo)
+            record["name"] = name
+            record["function"] = function
+            record["line"] = line
+            record["extra"]["request_id"] = request_id
+
+        _loguru.patch(restore).opt(exception=exception).bind(**extra).log(level, message, *args, **kwargs)
+
+    def flush(self) -> None:
+        """等待此前入队的记录全部写出"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        self.sink.flush()
+
+
+class _QueuedLogger:
+    """
+    应用使用的logger,接口与loguru的常用部分一致(bind/debug/info/warning/error/exception)
+
+    请求线程只做级别判断、取时间/调用位置/请求ID并入队; 消息参数在写出线程格式化,
+    因此传入的可变对象应在记录后不再修改。
+    """
+
+    __slots__ = ("_extra",)
+
+    def __init__(self, extra: Optional[Dict[str, Any]] = None):
+        self._extra = extra or {}
+
+    def bind(self, **extra) -> "_QueuedLogger":
+        return _QueuedLogger({**self._extra, **extra})
+
+    def debug(self, message: str, *args, **kwargs) -> None:
+        self._log("DEBUG", 10, message, args, kwargs)
+
+    def info(self, message: str, *args, **kwargs) -> None:
+        self._log("INFO", 20, message, args, kwargs)
+
+    def warning(self, message: str, *args, **kwargs) -> None:
+        self._log("WARNING", 30, message, args, kwargs)
+
+    def error(self, message: str, *args, **kwargs) -> None:
+        self._log("ERROR", 40, message, args, kwargs)
+
+    def critical(self, message: str, *args, **kwargs) -> None:
+        self._log("CRITICAL", 50, message, args, kwargs)
+
+    def exception(self, message: str, *args, **kwargs) -> None:
+        self._log("ERROR", 40, message, args, kwargs, exception=sys.exc_info())
+
+    def _log(self, level: str, level_no: int, message: str, args: tuple, kwargs: dict, exception=None) -> None:
+        if level_no < _min_level:
+            return
+        writer = _writer
+        if writer is None:
+            # 尚未调用setup_logging: 同步交给loguru的默认输出
+            _loguru.opt(depth=2, exception=exception).bind(**self._extra).log(level, message, *args, **kwargs)
+            return
+        frame = sys._getframe(2)
+        writer.put((
+            time.time(), level, message, args, kwargs, self._extra, get_request_id(),
+            frame.f_globals.get("__name__"), frame.f_code.co_name, frame.f_lineno, exception,
+        ))
+
+
+logger = _QueuedLogger()
+_writer: Optional[_LogWriter] = None
+
+
+def setup_logging(level: Optional[str] = None) -> None:
+    """配置全局logger(幂等),级别取自Settings.log_level"""
+    global _configured, _writer, _min_level
+
+    if _configured:
+        return
+
+    settings = get_settings()
+    level_name = (level or settings.log_level).upper()
+    sink = _StreamSink(sys.stderr, as_json=settings.log_json)
+    _loguru.remove()
+    _loguru.configure(patcher=_patch_record)
+    _loguru.add(
+        sink,
+        level=level_name,
+        format=(
+            "{message}" if settings.log_json
+            else "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <7} | {extra[request_id]} | {name}:{line} - {message}"
+        ),
+        backtrace=False,
+        diagnose=False,
+    )
+    _writer = _LogWriter(sink)
+    _min_level = _loguru.level(level_name).no
+    _configured = True
+
+
+def shutdown_logging() -> None:
+    """等待队列中的日志写完"""
+    if _writer is not None:
+        _writer.flush()
+
+
+def log_preview(label: str, text: Optional[str], **extra) -> None:
+    """
+    按采样率记录大段输出的预览
+
+    未被采样时只做一次随机数比较,不做截断与格式化。
+    """
+    settings = get_settings()
+    if random.random() >= settings.log_preview_sample_rate:
+        return
+    limit = settings.log_preview_chars
+    content = text or ""
+    snippet = content[:limit] + ("..." if len(content) > limit else "")
+    logger.bind(preview=label, length=len(content), **extra).info("{}: {}", label, snippet)
+
+
+__all__ = ["logger", "setup_logging", "shutdown_logging", "log_preview"]
@@ -1,6 +1,6 @@
 """数据模型定义"""
 
-from typing import List, Optional, Union
+from typing import List, Literal, Optional, Union
 from pydantic import BaseModel, Field, field_validator
 from datetime import date
 
@@ -33,6 +33,20 @@ class TripRequest(BaseModel):
         }
 
 
+class MultiCityTripRequest(BaseModel):
+    """多城市旅行规划请求(总天数包含城市之间的城际交通日)"""
+    cities: List[str] = Field(..., min_length=2, max_length=6, description="按游览顺序排列的城市", example=["北京", "西安", "成都"])
+    city_days: Optional[List[int]] = Field(default=None, description="每个城市的游玩天数(不含城际交通日),为空时平均分配", example=[2, 2, 2])
+    start_date: str = Field(..., description="开始日期 YYYY-MM-DD", example="2025-06-01")
+    end_date: str = Field(..., description="结束日期 YYYY-MM-DD", example="2025-06-08")
+    travel_days: int = Field(..., description="旅行总天数", ge=2, le=30, example=8)
+    transportation: str = Field(..., description="城市内交通方式", example="公共交通")
+    inter_city_transportation: str = Field(default="高铁", description="城际交通方式", example="高铁")
+    accommodation: str = Field(..., description="住宿偏好", example="经济型酒店")
+    preferences: List[str] = Field(default=[], description="旅行偏好标签", example=["历史文化", "美食"])
+    free_text_input: Optional[str] = Field(default="", description="额外要求")
+
+
 class VoiceFormSuggestion(BaseModel):
     """语音表单建议"""
     city: Optional[str] = Field(default=None, description="目的地城市")
@@ -43,6 +57,7 @@ class VoiceFormSuggestion(BaseModel):
     accommodation: Optional[str] = Field(default=None, description="住宿偏好")
     preferences: List[str] = Field(default_factory=list, description="旅行偏好")
     free_text_input: Optional[str] = Field(default=None, description="补充需求")
+    confidence: Optional[float] = Field(default=None, description="规则抽取置信度(0-1),LLM结果为空")
 
 
 class POISearchRequest(BaseModel):
@@ -133,10 +148,9 @@ class WeatherInfo(BaseModel):
     def parse_temperature(cls, v):
         """解析温度,移除°C等单位"""
         if isinstance(v, str):
-            # 移除°C, ℃等单位符号
-            v = v.replace('°C', '').replace('℃', '').replace('°', '').strip()
+            # 一次去掉末尾的°C, ℃等单位符号(int会忽略首尾空白),无法解析时为0
             try:
-                return int(v)
+                return int(v.rstrip(" °C℃"))
             except ValueError:
                 return 0
         return v
@@ -160,6 +174,23 @@ class TripPlan(BaseModel):
     weather_info: List[WeatherInfo] = Field(default=[], description="天气信息")
     overall_suggestions: str = Field(..., description="总体建议")
     budget: Optional[Budget] = Field(default=None, description="预算信息")
+    plan_id: Optional[str] = Field(default=None, description="计划ID,可通过GET /api/trip/plans/{plan_id}再次获取")
+    degraded: bool = Field(default=False, description="是否为降级结果(超出截止时间或规划失败时,用已获得的数据在本地生成)")
+    degraded_reason: Optional[str] = Field(default=None, description="降级原因")
+
+
+class TripEditRequest(BaseModel):
+    """行程增量编辑请求(只重新生成受影响的一天)"""
+    plan: TripPlan = Field(..., description="待编辑的旅行计划")
+    action: Literal["replace_attraction", "regenerate_day", "shift_dates"] = Field(
+        ..., description="编辑类型: replace_attraction/regenerate_day/shift_dates"
+    )
+    day_index: Optional[int] = Field(default=None, ge=0, description="要编辑的第几天(从0开始)")
+    attraction_index: Optional[int] = Field(default=None, ge=0, description="要替换的景点序号(从0开始)")
+    replacement: Optional[str] = Field(default=None, description="替换后的景点名称或关键词,为空时由系统推荐")
+    new_start_date: Optional[str] = Field(default=None, description="新的开始日期 YYYY-MM-DD(shift_dates)")
+    preferences: List[str] = Field(default_factory=list, description="旅行偏好标签")
+    instruction: Optional[str] = Field(default="", description="额外要求", example="这一天安排轻松一些")
 
 
 class TripPlanResponse(BaseModel):
@@ -169,6 +200,23 @@ class TripPlanResponse(BaseModel):
     data: Optional[TripPlan] = Field(default=None, description="旅行计划数据")
 
 
+class PlanSummary(BaseModel):
+    """已保存计划的摘要"""
+    plan_id: str = Field(..., description="计划ID")
+    city: str = Field(..., description="目的地城市")
+    start_date: str = Field(..., description="开始日期")
+    end_date: str = Field(..., description="结束日期")
+    days: int = Field(..., description="天数")
+    created_at: str = Field(..., description="保存时间")
+
+
+class PlanListResponse(BaseModel):
+    """已保存计划列表响应"""
+    success: bool = Field(..., description="是否成功")
+    message: str = Field(default="", description="消息")
+    data: List[PlanSummary] = Field(default_factory=list, description="计划摘要列表")
+
+
 class VoiceTranscriptionResponse(BaseModel):
     """语音识别响应"""
     success: bool = Field(..., description="是否成功")
@@ -193,6 +241,23 @@ class VoiceTextPlanRequest(BaseModel):
     transcript: str = Field(..., min_length=1, description="用户确认后的语音文本")
 
 
+class PlanningJobResponse(BaseModel):
+    """异步规划任务响应"""
+    success: bool = Field(..., description="是否成功")
+    message: str = Field(default="", description="消息")
+    job_id: str = Field(..., description="任务ID")
+    kind: str = Field(..., description="任务类型: trip/voice/voice_text")
+    status: str = Field(..., description="任务状态: queued/running/succeeded/failed/cancelled/timeout")
+    created_at: Optional[str] = Field(default=None, description="创建时间")
+    started_at: Optional[str] = Field(default=None, description="开始执行时间")
+    finished_at: Optional[str] = Field(default=None, description="结束时间")
+    deadline_at: Optional[str] = Field(default=None, description="截止时间")
+    error: Optional[str] = Field(default=None, description="失败原因")
+    transcript: Optional[str] = Field(default=None, description="识别文本(语音任务)")
+    form: Optional[VoiceFormSuggestion] = Field(default=None, description="表单建议(语音任务)")
+    data: Optional[TripPlan] = Field(default=None, description="旅行计划")
+
+
 class POIInfo(BaseModel):
     """POI信息"""
     id: str = Field(..., description="POI ID")
@@ -1,9 +1,246 @@
 """高德地图MCP服务封装"""
 
-from typing import List, Dict, Any, Optional
+import asyncio
+import shlex
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from aitravelplanner_core import MCPTool
 from ..config import get_settings
 from ..models.schemas import Location, POIInfo, WeatherInfo
+from ..services.cache_backend import SharedCache, stable_key
+from ..services.cassette import cassette_call
+from ..services.circuit_breaker import CircuitBreaker
+from ..services.deadline import current_deadline
+from ..services.gazetteer import canonical_city
+from ..services.json_extract import extract_json_object
+from ..services.metrics import REGISTRY, bind_context, record_cache, span
+from ..services.poi_candidates import POICandidate, parse_poi_search
+from ..services.rate_limit import DailyBudget, TokenBucket
+from ..logging_config import log_preview, logger
+
+# 各高德工具结果的缓存时间(秒); 未列出的工具不缓存
+AMAP_TOOL_CACHE_TTL = {
+    "maps_weather": 1800,
+    "maps_text_search": 86400,
+    "maps_around_search": 86400,
+    "maps_search_detail": 7 * 86400,
+    "maps_geo": 30 * 86400,
+    "maps_regeocode": 30 * 86400,
+    "maps_direction_driving": 3600,
+    "maps_direction_walking": 3600,
+    "maps_direction_transit_integrated": 3600,
+    "maps_direction_bicycling": 3600,
+    "maps_distance": 3600,
+}
+
+# 工具列表缓存时间: 同一主机的worker只需一个完成发现
+_TOOL_LIST_TTL = 86400
+
+# 高德返回的配额/频率超限错误码
+_QUOTA_ERROR_MARKERS = ("QPS_HAS_EXCEEDED_THE_LIMIT", "DAILY_QUERY_OVER_LIMIT", "ACCESS_TOO_FREQUENT")
+
+_REJECT_MESSAGES = {
+    "circuit_open": "高德服务连续失败,已暂时熔断",
+    "daily_budget": "今日调用预算已用完",
+    "rate_limited": "调用过于频繁,已限流",
+    "deadline": "请求已超出截止时间,不再调用",
+}
+
+AMAP_CALLS = REGISTRY.counter("aitp_amap_calls_total", "AMap tool calls by result (ok/error/quota)", ("tool", "result"))
+AMAP_REJECTED = REGISTRY.counter("aitp_amap_rejected_total", "AMap tool calls rejected locally", ("tool", "reason"))
+AMAP_DAILY_USED = REGISTRY.gauge("aitp_amap_daily_used", "AMap calls made today (UTC+8)", ("tool",))
+AMAP_DAILY_BUDGET = REGISTRY.gauge("aitp_amap_daily_budget", "Configured AMap daily budget (0=unlimited)", ("tool",))
+
+
+def _parse_tool_limits(spec: str) -> Dict[str, Tuple[float, int, int]]:
+    """解析 "maps_weather=2:4:3000,maps_text_search=5:10:0" 形式的按工具配额"""
+    limits = {}
+    for item in (spec or "").split(","):
+        name, _, values = item.strip().partition("=")
+        parts = values.split(":")
+        if not name or len(parts) != 3:
+            continue
+        try:
+            limits[name.strip()] = (float(parts[0]), int(parts[1]), int(parts[2]))
+        except ValueError:
+            logger.warning("忽略无效的高德配额配置: {}", item)
+    return limits
+
+
+class AmapQuotaGuard:
+    """
+    高德调用守卫: 按工具的QPS令牌桶(含突发)与每日预算,以及全局熔断器
+
+    进程内生效; 多worker部署时每个worker的配额应按worker数折算。
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.defaults = (settings.amap_qps, settings.amap_burst, settings.amap_daily_budget)
+        self.overrides = _parse_tool_limits(settings.amap_tool_limits)
+        self.max_wait = settings.amap_max_wait_seconds
+        self.breaker = CircuitBreaker(
+            "amap",
+            failure_threshold=settings.amap_breaker_failures,
+            recovery_seconds=settings.amap_breaker_recovery_seconds,
+        )
+        self._quotas: Dict[str, Tuple[TokenBucket, DailyBudget]] = {}
+        self._lock = threading.Lock()
+
+    def _quota(self, tool: str) -> Tuple[TokenBucket, DailyBudget]:
+        with self._lock:
+            quota = self._quotas.get(tool)
+            if quota is None:
+                qps, burst, daily = self.overrides.get(tool, self.defaults)
+                quota = (TokenBucket(qps * 60, capacity=max(1, burst)), DailyBudget(daily))
+                self._quotas[tool] = quota
+                AMAP_DAILY_BUDGET.set(max(0, daily), tool=tool)
+            return quota
+
+    def admit(self, tool: str) -> Optional[str]:
+        """放行返回None,否则返回拒绝原因; 需要排队时在当前线程等待"""
+        bucket, budget = self._quota(tool)
+        if budget.limit > 0 and budget.used >= budget.limit:
+            return "daily_budget"
+        if not self.breaker.allow():
+            return "circuit_open"
+        wait = bucket.reserve()
+        if wait > self.max_wait:
+            bucket.adjust(-1)
+            self.breaker.release()
+            return "rate_limited"
+        if not budget.try_consume():
+            bucket.adjust(-1)
+            self.breaker.release()
+            return "daily_budget"
+        AMAP_DAILY_USED.set(budget.used, tool=tool)
+        if wait:
+            with span("amap_rate_limit", tool):
+                time.sleep(wait)
+        return None
+
+    def record(self, tool: str, result: Any) -> None:
+        if _is_quota_error(result):
+            AMAP_CALLS.inc(tool=tool, result="quota")
+            self.breaker.record_failure()
+        elif _is_error_result(result):
+            AMAP_CALLS.inc(tool=tool, result="error")
+            self.breaker.record_failure()
+        else:
+            AMAP_CALLS.inc(tool=tool, result="ok")
+            self.breaker.record_success()
+
+
+class CachedMCPTool(MCPTool):
+    """
+    带共享缓存的MCP工具
+
+    - 工具发现结果写入共享缓存,其它worker启动时直接复用
+    - call_tool结果按(工具名,规范化参数)缓存,跨worker去重
+    - 失败结果(字符串形式返回的错误)不缓存
+    - call_tool经过配额守卫(QPS/每日预算/熔断); 被拒绝或调用失败时返回过期的缓存结果
+    """
+
+    def __init__(self, *args, **kwargs):
+        # 父类构造函数中会执行工具发现,缓存需先就绪
+        self.result_cache = SharedCache("amap_tool", ttl=3600)
+        self.stale_ttl = get_settings().amap_stale_ttl_seconds
+        self.quota_guard = AmapQuotaGuard()
+        self._tool_list_cache = SharedCache("mcp_tools", ttl=_TOOL_LIST_TTL)
+        super().__init__(*args, **kwargs)
+
+    def _discover_tools(self):
+        # 工具列表总是经过cassette,回放时无需启动MCP服务(键与启动命令无关,便于跨环境回放)
+        self._available_tools = cassette_call("mcp_tools", "list_tools", {}, self._discover_cached)
+
+    def _discover_cached(self) -> List[Dict[str, Any]]:
+        key = stable_key(self.server_command, self.server_args)
+        cached = self._tool_list_cache.get(key)
+        if cached:
+            return cached
+        super()._discover_tools()
+        if self._available_tools:
+            self._tool_list_cache.set(key, self._available_tools)
+        return self._available_tools
+
+    def run(self, parameters: Dict[str, Any]) -> str:
+        action = _action(parameters)
+        tool_name = parameters.get("tool_name")
+        ttl = AMAP_TOOL_CACHE_TTL.get(tool_name) if action == "call_tool" else None
+        if not ttl:
+            return self._call(parameters, tool_name or action)
+
+        arguments = dict(parameters.get("arguments") or {})
+        if isinstance(arguments.get("city"), str):
+            arguments["city"] = canonical_city(arguments["city"])
+        key = stable_key(tool_name, arguments)
+
+        # 缓存条目在新鲜期过后继续保留stale_ttl,供熔断/限流时兜底
+        stale = None
+        cached = self.result_cache.get(key)
+        if isinstance(cached, dict):
+            if time.time() - cached.get("stored_at", 0) < ttl:
+                return cached["result"]
+            stale = cached["result"]
+        elif cached is not None:
+            return cached
+
+        result = self._call({**parameters, "action": "call_tool", "arguments": arguments}, tool_name)
+        if _is_successful_result(result):
+            self.result_cache.set(key, {"result": result, "stored_at": time.time()}, ttl=ttl + self.stale_ttl)
+            return result
+        if stale is not None:
+            record_cache("amap_tool_stale", "hit")
+            logger.bind(tool=tool_name).warning("高德调用失败,返回过期缓存: {}", str(result)[:200])
+            return stale
+        return result
+
+    def _call(self, parameters: Dict[str, Any], target: str) -> str:
+        # 每次调用都会启动MCP子进程,单独计时以区分LLM与工具耗时
+        with span("mcp_call", target) as state:
+            result = cassette_call("mcp", target, parameters, self._guarded_run, parameters, target)
+            state["error"] = _is_error_result(result)
+        return result
+
+    def _guarded_run(self, parameters: Dict[str, Any], target: str) -> str:
+        if _action(parameters) != "call_tool":
+            return MCPTool.run(self, parameters)
+        # 请求已到期时落后的Agent不再发起调用(缓存命中在run中已返回)
+        deadline = current_deadline()
+        rejected = "deadline" if deadline is not None and deadline.expired else self.quota_guard.admit(target)
+        if rejected:
+            AMAP_REJECTED.inc(tool=target, reason=rejected)
+            return f"错误: {_REJECT_MESSAGES[rejected]}"
+        result = MCPTool.run(self, parameters)
+        self.quota_guard.record(target, result)
+        return result
+
+
+def _action(parameters: Dict[str, Any]) -> str:
+    return (parameters.get("action") or ("call_tool" if "tool_name" in parameters else "")).lower()
+
+
+def _is_quota_error(result: Any) -> bool:
+    return isinstance(result, str) and any(marker in result for marker in _QUOTA_ERROR_MARKERS)
+
+
+def _is_error_result(result: Any) -> bool:
+    return not isinstance(result, str) or result.startswith(("MCP 操作失败", "异步操作失败", "错误"))
+
+
+def is_failed_poi_detail(detail: Dict[str, Any]) -> bool:
+    """get_poi_detail的结果是否表示获取失败(空结果,或熔断/限流/调用失败的错误文本)"""
+    return not detail or ("raw" in detail and _is_error_result(detail["raw"]))
+
+
+def _is_successful_result(result: Any) -> bool:
+    """MCPTool把错误作为字符串返回,只缓存明确成功的结果"""
+    if not isinstance(result, str) or not result.startswith("工具 '"):
+        return False
+    head = result[:300].lower()
+    return "error" not in head and "invalid" not in head
+
 
 # 全局MCP工具实例
 _amap_mcp_tool = None
@@ -24,25 +261,19 @@ def get_amap_mcp_tool() -> MCPTool:
         if not settings.amap_api_key:
             raise ValueError("高德地图API Key未配置,请在.env文件中设置AMAP_API_KEY")
         
-        # 创建MCP工具
-        _amap_mcp_tool = MCPTool(
+        # 创建MCP工具(结果经共享缓存去重)
+        _amap_mcp_tool = CachedMCPTool(
             name="amap",
             description="高德地图服务,支持POI搜索、路线规划、天气查询等功能",
-            server_command=["uvx", "amap-mcp-server"],
+            server_command=shlex.split(settings.amap_mcp_command),
             env={"AMAP_MAPS_API_KEY": settings.amap_api_key},
             auto_expand=True  # 自动展开为独立工具
         )
         
-        print(f"✅ 高德地图MCP工具初始化成功")
-        print(f"   工具数量: {len(_amap_mcp_tool._available_tools)}")
-        
-        # 打印可用工具列表
-        if _amap_mcp_tool._available_tools:
-            print("   可用工具:")
-            for tool in _amap_mcp_tool._available_tools[:5]:  # 只打印前5个
-                print(f"     - {tool.get('name', 'unknown')}")
-            if len(_amap_mcp_tool._available_tools) > 5:
-                print(f"     ... 还有 {len(_amap_mcp_tool._available_tools) - 5} 个工具")
+        logger.bind(
+            tool_count=len(_amap_mcp_tool._available_tools),
+            tools=[tool.get("name", "unknown") for tool in _amap_mcp_tool._available_tools],
+        ).info("高德地图MCP工具初始化成功")
     
     return _amap_mcp_tool
 
@@ -54,41 +285,60 @@ class AmapService:
         """初始化服务"""
         self.mcp_tool = get_amap_mcp_tool()
     
-    def search_poi(self, keywords: str, city: str, citylimit: bool = True) -> List[POIInfo]:
+    def search_candidates(self, keywords: str, city: str, citylimit: bool = True) -> List[POICandidate]:
         """
-        搜索POI
-        
+        关键词搜索POI并解析为候选(保留评分、价格与排名)
+
         Args:
             keywords: 搜索关键词
             city: 城市
             citylimit: 是否限制在城市范围内
-            
+
         Returns:
-            POI信息列表
+            候选列表,按高德返回顺序; 调用失败时为空
         """
         try:
-            # 调用MCP工具
             result = self.mcp_tool.run({
                 "action": "call_tool",
                 "tool_name": "maps_text_search",
                 "arguments": {
                     "keywords": keywords,
-                    "city": city,
+                    "city": canonical_city(city),
                     "citylimit": str(citylimit).lower()
                 }
             })
-            
-            # 解析结果
-            # 注意: MCP工具返回的是字符串,需要解析
-            # 这里简化处理,实际应该解析JSON
-            print(f"POI搜索结果: {result[:200]}...")  # 打印前200字符
-            
-            # TODO: 解析实际的POI数据
-            return []
-            
+
+            log_preview("POI搜索结果", result)
+
+            return parse_poi_search(result, keywords)
+
         except Exception as e:
-            print(f"❌ POI搜索失败: {str(e)}")
+            logger.error("POI搜索失败: {}", e)
             return []
+
+    def search_poi(self, keywords: str, city: str, citylimit: bool = True) -> List[POIInfo]:
+        """
+        搜索POI
+        
+        Args:
+            keywords: 搜索关键词
+            city: 城市
+            citylimit: 是否限制在城市范围内
+            
+        Returns:
+            POI信息列表
+        """
+        return [
+            POIInfo(
+                id=candidate.id,
+                name=candidate.name,
+                type=candidate.category or candidate.typecode,
+                address=candidate.address,
+                location=Location(longitude=candidate.longitude, latitude=candidate.latitude),
+                tel=candidate.tel or None,
+            )
+            for candidate in self.search_candidates(keywords, city, citylimit)
+        ]
     
     def get_weather(self, city: str) -> List[WeatherInfo]:
         """
@@ -106,17 +356,17 @@ class AmapService:
                 "action": "call_tool",
                 "tool_name": "maps_weather",
                 "arguments": {
-                    "city": city
+                    "city": canonical_city(city)
                 }
             })
             
-            print(f"天气查询结果: {result[:200]}...")
+            log_preview("天气查询结果", result)
             
             # TODO: 解析实际的天气数据
             return []
             
         except Exception as e:
-            print(f"❌ 天气查询失败: {str(e)}")
+            logger.error("天气查询失败: {}", e)
             return []
     
     def plan_route(
@@ -156,6 +406,9 @@ class AmapService:
                 "destination_address": destination_address
             }
             
+            origin_city = canonical_city(origin_city)
+            destination_city = canonical_city(destination_city)
+
             # 公共交通需要城市参数
             if route_type == "transit":
                 if origin_city:
@@ -176,13 +429,13 @@ class AmapService:
                 "arguments": arguments
             })
             
-            print(f"路线规划结果: {result[:200]}...")
+            log_preview("路线规划结果", result)
             
             # TODO: 解析实际的路线数据
             return {}
             
         except Exception as e:
-            print(f"❌ 路线规划失败: {str(e)}")
+            logger.error("路线规划失败: {}", e)
             return {}
     
     def geocode(self, address: str, city: Optional[str] = None) -> Optional[Location]:
@@ -199,7 +452,7 @@ class AmapService:
         try:
             arguments = {"address": address}
             if city:
-                arguments["city"] = city
+                arguments["city"] = canonical_city(city)
 
             result = self.mcp_tool.run({
                 "action": "call_tool",
@@ -207,13 +460,13 @@ class AmapService:
                 "arguments": arguments
             })
 
-            print(f"地理编码结果: {result[:200]}...")
+            log_preview("地理编码结果", result)
 
             # TODO: 解析实际的坐标数据
             return None
 
         except Exception as e:
-            print(f"❌ 地理编码失败: {str(e)}")
+            logger.error("地理编码失败: {}", e)
             return None
 
     def get_poi_detail(self, poi_id: str) -> Dict[str, Any]:
@@ -235,24 +488,45 @@ class AmapService:
                 }
             })
 
-            print(f"POI详情结果: {result[:200]}...")
+            log_preview("POI详情结果", result)
 
-            # 解析结果并提取图片
-            import json
-            import re
-
-            # 尝试从结果中提取JSON
-            json_match = re.search(r'\{.*\}', result, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
+            # 线性时间提取结果中的JSON对象(大段输出也只扫描一遍)
+            data = extract_json_object(result)
+            if isinstance(data, dict):
                 return data
 
             return {"raw": result}
 
         except Exception as e:
-            print(f"❌ 获取POI详情失败: {str(e)}")
+            logger.error("获取POI详情失败: {}", e)
             return {}
 
+    async def get_poi_details(self, poi_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取POI详情: 去重后以有限并发调用(经过工具缓存与配额保护),保持输入顺序
+
+        Args:
+            poi_ids: POI ID列表(可重复)
+
+        Returns:
+            POI ID -> 详情; 获取失败的ID不在结果中
+        """
+        unique_ids = list(dict.fromkeys(poi_id for poi_id in poi_ids if poi_id))
+        semaphore = asyncio.Semaphore(max(1, get_settings().poi_batch_max_concurrency))
+        loop = asyncio.get_running_loop()
+
+        async def fetch(poi_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await loop.run_in_executor(None, bind_context(self.get_poi_detail, poi_id))
+
+        results = await asyncio.gather(*(fetch(poi_id) for poi_id in unique_ids))
+        # 工具返回的错误文本(熔断/限流/调用失败)视为获取失败
+        return {
+            poi_id: detail
+            for poi_id, detail in zip(unique_ids, results)
+            if not is_failed_poi_detail(detail)
+        }
+
 
 # 创建全局服务实例
 _amap_service = None
@@ -0,0 +1,330 @@
+"""跨进程共享缓存后端
+
+多个uvicorn worker各自持有进程内单例,同一主机上的工具结果、图片、语音识别和行程计划
+通过共享后端去重。支持:
+- memory: 进程内(单worker或开发环境)
+- sqlite: 本机SQLite WAL文件,多进程并发读写
+- redis: Redis协议(RESP)服务,可由redis-server或任何兼容实现提供
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from ..config import get_settings
+from .cache import TTLCache
+from .metrics import record_cache
+from ..logging_config import logger
+
+
+class CacheBackend(ABC):
+    """键值缓存后端接口,值为bytes"""
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """读取未过期的值,不存在时返回None"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """写入值,ttl为秒"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除值"""
+
+    def close(self) -> None:
+        """释放连接"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内后端"""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 4096):
+        self._cache: TTLCache[bytes] = TTLCache(maxsize=maxsize, name="shared_memory")
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """SQLite WAL后端: 同一主机的多个进程共享一个文件"""
+
+    name = "sqlite"
+    _PRUNE_EVERY = 500
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache(expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 每个线程一个连接; autocommit模式,WAL允许读写并发
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(value), time.time() + ttl),
+        )
+        self._writes += 1
+        if self._writes % self._PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisCacheBackend(CacheBackend):
+    """最小RESP2客户端,只使用GET/SET PX/DEL,无需额外依赖"""
+
+    name = "redis"
+    # 连接失败后的退避时间,避免服务不可用时每次请求都等待连接超时
+    _RETRY_AFTER = 5.0
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int((parsed.path or "/0").lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _connect(self):
+        if time.monotonic() < self._down_until:
+            raise ConnectionError("Redis暂不可用")
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError:
+            self._down_until = time.monotonic() + self._RETRY_AFTER
+            raise
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reader = sock.makefile("rb")
+        self._local.sock, self._local.reader = sock, reader
+        if self.password:
+            self._command("AUTH", self.password)
+        if self.db:
+            self._command("SELECT", str(self.db))
+
+    def _command(self, *parts):
+        if getattr(self._local, "sock", None) is None:
+            self._connect()
+        payload = [f"*{len(parts)}\r\n".encode()]
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+            payload.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            self._local.sock.sendall(b"".join(payload))
+            return self._read_reply()
+        except (OSError, ConnectionError):
+            self._reset()
+            raise
+
+    def _read_reply(self):
+        reader = self._local.reader
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis连接已关闭")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body
+        if prefix == b"-":
+            raise RuntimeError(body.decode("utf-8", "replace"))
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            return [self._read_reply() for _ in range(int(body))]
+        raise RuntimeError(f"无法解析的Redis响应: {line!r}")
+
+    def _reset(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+        self._local.reader = None
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._command("GET", key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._command("SET", key, value, "PX", str(max(1, int(ttl * 1000))))
+
+    def delete(self, key: str) -> None:
+        self._command("DEL", key)
+
+    def close(self) -> None:
+        self._reset()
+
+
+class SharedCache:
+    """
+    带命名空间的JSON缓存,读写失败时视为未命中,绝不影响主流程
+
+    Args:
+        namespace: 键前缀,如"amap_tool"、"photo"
+        ttl: 默认过期时间(秒)
+        backend: 缓存后端,默认使用全局配置的后端
+    """
+
+    def __init__(self, namespace: str, ttl: float, backend: Optional[CacheBackend] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend or get_cache_backend()
+
+    def make_key(self, key: str) -> str:
+        prefix = get_settings().cache_key_prefix
+        if len(key) > 200:
+            key = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return f"{prefix}{self.namespace}:{key}"
+
+    def get(self, key: str) -> Any:
+        try:
+            raw = self.backend.get(self.make_key(key))
+        except Exception as exc:
+            self.errors += 1
+            record_cache(self.namespace, "error")
+            logger.warning("共享缓存读取失败({}): {}", self.namespace, exc)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            record_cache(self.namespace, "miss")
+            return None
+        self.hits += 1
+        record_cache(self.namespace, "hit")
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            payload = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self.backend.set(self.make_key(key), payload, self.ttl if ttl is None else ttl)
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("共享缓存写入失败({}): {}", self.namespace, exc)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self.make_key(key))
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("共享缓存删除失败({}): {}", self.namespace, exc)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "name": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+        }
+
+
+def stable_key(*parts: Any) -> str:
+    """将参数序列化为稳定的缓存键(字典键排序)"""
+    return json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+# 全局缓存后端实例
+_cache_backend: Optional[CacheBackend] = None
+_cache_backend_lock = threading.Lock()
+
+
+def _create_backend() -> CacheBackend:
+    settings = get_settings()
+    kind = (settings.cache_backend or "memory").strip().lower()
+    if kind == "sqlite":
+        path = settings.cache_sqlite_path or str(Path(tempfile.gettempdir()) / "aitravelplanner_cache.sqlite3")
+        return SQLiteCacheBackend(Path(path))
+    if kind == "redis":
+        return RedisCacheBackend(settings.cache_redis_url)
+    if kind != "memory":
+        logger.warning("未知的缓存后端 '{}',使用进程内缓存", kind)
+    return MemoryCacheBackend()
+
+
+def get_cache_backend() -> CacheBackend:
+    """获取共享缓存后端实例(单例模式)"""
+    global _cache_backend
+
+    if _cache_backend is None:
+        with _cache_backend_lock:
+            if _cache_backend is None:
+                _cache_backend = _create_backend()
+                logger.info("共享缓存后端: {}", _cache_backend.name)
+
+    return _cache_backend
+
+
+def reset_cache_backend() -> None:
+    """关闭并重置缓存后端(用于测试或重新配置)"""
+    global _cache_backend
+    if _cache_backend is not None:
+        _cache_backend.close()
+    _cache_backend = None
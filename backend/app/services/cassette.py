@@ -0,0 +1,191 @@
+"""LLM与MCP交互的录制/回放(cassette)
+
+- record: 记录每次Agent运行(输入、输出)与MCP调用(参数、结果)及耗时,追加写入JSONL文件
+- replay: 按相同的键从文件取回结果,不访问LLM和高德; 可按录制时的耗时回放或立即返回
+- off: 直接调用
+
+键由(类型, 对象, 请求内容)决定; 同一个键多次出现时按录制顺序依次回放,用尽后重复最后一条。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from ..config import get_settings
+from ..logging_config import logger
+from .cache_backend import stable_key
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# 仅作为参照记录、回放时不直接返回的交互类型(如整次规划的最终结果)
+REFERENCE_KINDS = {"plan"}
+
+
+class CassetteMissError(Exception):
+    """回放模式下找不到对应的录制记录"""
+
+
+class CassetteReplayError(Exception):
+    """回放录制时的失败调用"""
+
+
+def interaction_key(kind: str, target: str, request: Any) -> str:
+    return hashlib.sha256(stable_key(kind, target, request).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    一个cassette文件
+
+    Args:
+        path: JSONL文件路径
+        mode: record / replay
+        replay_speed: 回放时的耗时倍率,0为立即返回,1为按录制速度
+    """
+
+    def __init__(self, path: Path, mode: str, replay_speed: float = 0.0):
+        self.path = Path(path)
+        self.mode = mode
+        self.replay_speed = max(0.0, replay_speed)
+        self._lock = threading.Lock()
+        self._tracks: Dict[str, Deque[dict]] = {}
+        self._last: Dict[str, dict] = {}
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        if mode == MODE_REPLAY:
+            self._load()
+        elif mode == MODE_RECORD:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            raise FileNotFoundError(f"cassette文件不存在: {self.path}")
+        for entry in self.entries(self.path):
+            if entry.get("kind") in REFERENCE_KINDS:
+                continue
+            self._tracks.setdefault(entry["key"], deque()).append(entry)
+
+    @staticmethod
+    def entries(path: Path) -> List[dict]:
+        """读取cassette中的全部记录(按录制顺序)"""
+        with Path(path).open(encoding="utf-8") as fh:
+            return [json.loads(line) for line in fh if line.strip()]
+
+    def record(
+        self,
+        kind: str,
+        target: str,
+        request: Any,
+        response: Any,
+        duration: float,
+        error: Optional[str] = None,
+    ) -> None:
+        entry = {
+            "key": interaction_key(kind, target, request),
+            "kind": kind,
+            "target": target,
+            "request": request,
+            "response": response,
+            "error": error,
+            "duration": round(duration, 6),
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+            self.recorded += 1
+
+    def replay(self, kind: str, target: str, request: Any) -> Any:
+        key = interaction_key(kind, target, request)
+        with self._lock:
+            track = self._tracks.get(key)
+            if track:
+                entry = track.popleft()
+                self._last[key] = entry
+            else:
+                entry = self._last.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.replayed += 1
+        if entry is None:
+            raise CassetteMissError(f"cassette中没有匹配的{kind}记录: {target}")
+        if self.replay_speed:
+            time.sleep(entry["duration"] * self.replay_speed)
+        if entry.get("error"):
+            raise CassetteReplayError(entry["error"])
+        return entry["response"]
+
+    def call(self, kind: str, target: str, request: Any, func: Callable[[], Any]) -> Any:
+        """按模式执行一次交互"""
+        if self.mode == MODE_REPLAY:
+            return self.replay(kind, target, request)
+
+        started = time.perf_counter()
+        try:
+            response = func()
+        except Exception as exc:
+            self.record(kind, target, request, None, time.perf_counter() - started, error=str(exc) or exc.__class__.__name__)
+            raise
+        self.record(kind, target, request, response, time.perf_counter() - started)
+        return response
+
+
+# 全局cassette实例
+_cassette: Optional[Cassette] = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """获取cassette实例(单例模式); 未启用时返回None"""
+    global _cassette, _cassette_loaded
+
+    if not _cassette_loaded:
+        with _cassette_lock:
+            if not _cassette_loaded:
+                settings = get_settings()
+                mode = (settings.cassette_mode or MODE_OFF).strip().lower()
+                if mode in (MODE_RECORD, MODE_REPLAY):
+                    if not settings.cassette_path:
+                        raise ValueError("启用cassette时必须设置CASSETTE_PATH")
+                    _cassette = Cassette(Path(settings.cassette_path), mode, settings.cassette_replay_speed)
+                    logger.bind(path=settings.cassette_path).info("cassette已启用: {}", mode)
+                elif mode != MODE_OFF:
+                    logger.warning("未知的cassette模式 '{}',已忽略", mode)
+                _cassette_loaded = True
+
+    return _cassette
+
+
+def set_cassette(cassette: Optional[Cassette]) -> None:
+    """替换全局cassette(用于离线回放脚本)"""
+    global _cassette, _cassette_loaded
+    with _cassette_lock:
+        _cassette = cassette
+        _cassette_loaded = True
+
+
+def cassette_call(kind: str, target: str, request: Any, func: Callable[..., Any], *args) -> Any:
+    """经过cassette执行func(*args); 未启用时直接调用"""
+    cassette = get_cassette()
+    if cassette is None:
+        return func(*args)
+    return cassette.call(kind, target, request, lambda: func(*args))
+
+
+def record_reference(kind: str, target: str, request: Any, response: Any, duration: float) -> None:
+    """录制模式下记录参照结果(回放时用于比对,不会直接返回)"""
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == MODE_RECORD:
+        cassette.record(kind, target, request, response, duration)
@@ -0,0 +1,92 @@
+"""熔断器
+
+closed: 正常放行,连续失败达到阈值后进入open
+open: 直接拒绝,冷却时间过后进入half_open
+half_open: 只放行一个探测请求,成功则恢复closed,失败则重新open
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from .metrics import REGISTRY
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+_STATE_VALUES = {STATE_CLOSED: 0, STATE_OPEN: 1, STATE_HALF_OPEN: 2}
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    "aitp_circuit_state", "Circuit breaker state (0=closed, 1=open, 2=half_open)", ("name",)
+)
+CIRCUIT_TRIPS = REGISTRY.counter("aitp_circuit_trips_total", "Times a circuit breaker opened", ("name",))
+
+
+class CircuitBreaker:
+    """
+    连续失败计数熔断器(线程安全)
+
+    Args:
+        name: 名称(用于指标)
+        failure_threshold: 连续失败多少次后熔断
+        recovery_seconds: 熔断后多久允许探测
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(0, name=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], name=self.name)
+
+    def allow(self) -> bool:
+        """是否放行本次调用"""
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_seconds:
+                    return False
+                self._set_state(STATE_HALF_OPEN)
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def release(self) -> None:
+        """放行后未实际调用(如被限流拒绝),归还半开状态的探测名额"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state != STATE_CLOSED:
+                self._set_state(STATE_CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != STATE_OPEN:
+                    CIRCUIT_TRIPS.inc(name=self.name)
+                self._set_state(STATE_OPEN)
+                self._opened_at = time.monotonic()
@@ -0,0 +1,348 @@
+"""离线城市数据包: 热门景点/酒店的紧凑列式快照,启动时mmap只读加载
+
+热门目的地的景点和酒店相对稳定,数据包由构建命令(city_pack_builder)离线抓取后写入一个文件,
+规划时直接从内存映射中取候选,只有数据包未覆盖的城市/偏好才实时调用高德。
+
+文件布局(小端,各段按4字节对齐):
+    header    magic | version u16 | 关键词数 u16 | 城市数 u32 | POI数 u32 | 字符串数 u32 | 构建时间 f64
+    keywords  u32[关键词数]             关键词的字符串下标,下标i对应标签位 1 << i
+    cities    (名称 u32, 起始行 u32, 景点数 u32, 酒店数 u32)[城市数]
+    columns   每列连续存放POI数个值: 经纬度(i32微度)、价格(f32, NaN未知)、标签(u32)、
+              id/名称/地址/类别/typecode(u32字符串下标)、热度(u16 ×100)、评分(u8 ×10)
+    strings   u32偏移[字符串数+1] + UTF-8字节(重复的字符串如类别只存一次)
+同一城市的景点在前、酒店在后,各自按构建时的排名排序;查询只是按标签位过滤连续的行。
+"""
+
+from __future__ import annotations
+
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..config import get_settings
+from ..logging_config import logger
+from .metrics import REGISTRY
+from .poi_candidates import POICandidate
+
+DEFAULT_PACK_FILE = Path(__file__).resolve().parent.parent / "data" / "city_packs.bin"
+
+_MAGIC = b"AITPPACK"
+_VERSION = 1
+_HEADER = struct.Struct("<8sHHIIId")
+_CITY_FIELDS = 4
+_MAX_KEYWORDS = 32
+_MICRO = 1_000_000
+
+# (列名, struct格式); 宽类型在前,窄类型在后,保证每列自然对齐
+_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("longitude", "i"),
+    ("latitude", "i"),
+    ("cost", "f"),
+    ("tags", "I"),
+    ("id", "I"),
+    ("name", "I"),
+    ("address", "I"),
+    ("category", "I"),
+    ("typecode", "I"),
+    ("popularity", "H"),
+    ("rating", "B"),
+)
+
+CITY_PACK_LOOKUPS = REGISTRY.counter(
+    "aitp_city_pack_lookups_total", "City data pack candidate lookups (hit/partial/miss)", ("kind", "result")
+)
+
+
+def _align(offset: int) -> int:
+    return (offset + 3) & ~3
+
+
+def _layout(n_keywords: int, n_cities: int, n_pois: int, n_strings: int) -> Tuple[Dict[str, Tuple[int, str, int]], int]:
+    """各段的(偏移, 格式, 元素数)以及字符串字节区的起始偏移"""
+    sections: Dict[str, Tuple[int, str, int]] = {}
+    offset = _HEADER.size
+    for name, fmt, count in (
+        ("keywords", "I", n_keywords),
+        ("cities", "I", n_cities * _CITY_FIELDS),
+        *((name, fmt, n_pois) for name, fmt in _COLUMNS),
+        ("string_offsets", "I", n_strings + 1),
+    ):
+        offset = _align(offset)
+        sections[name] = (offset, fmt, count)
+        offset += struct.calcsize(fmt) * count
+    return sections, offset
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def add(self, value: str) -> int:
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+
+def write_city_pack(
+    path: Path,
+    cities: Dict[str, Tuple[Sequence[POICandidate], Sequence[POICandidate]]],
+    built_at: Optional[float] = None,
+) -> int:
+    """
+    写入数据包(先写临时文件再原子替换,正在mmap旧文件的进程不受影响)
+
+    Args:
+        path: 输出文件
+        cities: 规范城市名 -> (景点, 酒店),均已按排名排序
+        built_at: 构建时间(Unix时间戳),默认当前时间
+
+    Returns:
+        写入的字节数
+    """
+    strings = _StringTable()
+    keywords: Dict[str, int] = {}
+    for attractions, hotels in cities.values():
+        for candidate in (*attractions, *hotels):
+            for keyword in candidate.keywords:
+                keywords.setdefault(keyword, len(keywords))
+    if len(keywords) > _MAX_KEYWORDS:
+        raise ValueError(f"数据包最多支持{_MAX_KEYWORDS}个关键词,实际{len(keywords)}个")
+
+    keyword_column = [strings.add(keyword) for keyword in keywords]
+    city_column: List[int] = []
+    columns: Dict[str, List] = {name: [] for name, _ in _COLUMNS}
+    for city in sorted(cities):
+        attractions, hotels = cities[city]
+        city_column.extend((strings.add(city), len(columns["id"]), len(attractions), len(hotels)))
+        for candidate in (*attractions, *hotels):
+            columns["longitude"].append(round(candidate.longitude * _MICRO))
+            columns["latitude"].append(round(candidate.latitude * _MICRO))
+            columns["cost"].append(math.nan if candidate.cost is None else candidate.cost)
+            columns["tags"].append(sum(1 << keywords[keyword] for keyword in set(candidate.keywords)))
+            columns["id"].append(strings.add(candidate.id))
+            columns["name"].append(strings.add(candidate.name))
+            columns["address"].append(strings.add(candidate.address))
+            columns["category"].append(strings.add(candidate.category))
+            columns["typecode"].append(strings.add(candidate.typecode))
+            columns["popularity"].append(min(0xFFFF, round(candidate.popularity * 100)))
+            columns["rating"].append(min(0xFF, round(candidate.rating * 10)))
+
+    encoded = [value.encode("utf-8") for value in strings.values]
+    string_offsets = [0]
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    n_pois = len(columns["id"])
+    sections, blob_start = _layout(len(keyword_column), len(cities), n_pois, len(encoded))
+    data = {"keywords": keyword_column, "cities": city_column, "string_offsets": string_offsets, **columns}
+
+    buffer = bytearray(blob_start + string_offsets[-1])
+    _HEADER.pack_into(
+        buffer, 0, _MAGIC, _VERSION, len(keyword_column), len(cities), n_pois, len(encoded),
+        time.time() if built_at is None else built_at,
+    )
+    for name, (offset, fmt, count) in sections.items():
+        struct.pack_into(f"<{count}{fmt}", buffer, offset, *data[name])
+    buffer[blob_start:] = b"".join(encoded)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(buffer)
+    os.replace(tmp_path, path)
+    return len(buffer)
+
+
+class CityPack:
+    """
+    只读的城市数据包(mmap)
+
+    各列通过memoryview.cast直接映射为定长数组,不会把整个文件解码成Python对象;
+    查询只遍历目标城市的连续行,命中的行才解码为POICandidate。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with self.path.open("rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if len(view) < _HEADER.size:
+            raise ValueError("数据包文件不完整")
+        magic, version, n_keywords, n_cities, n_pois, n_strings, built_at = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"不支持的数据包格式: {magic!r} v{version}")
+        sections, blob_start = _layout(n_keywords, n_cities, n_pois, n_strings)
+
+        self._views: Dict[str, memoryview] = {}
+        for name, (offset, fmt, count) in sections.items():
+            end = offset + struct.calcsize(fmt) * count
+            if end > len(view):
+                raise ValueError("数据包文件不完整")
+            self._views[name] = view[offset:end].cast(fmt)
+        self._string_offsets = self._views["string_offsets"]
+        self._blob = view[blob_start:]
+        if self._string_offsets[-1] > len(self._blob):
+            raise ValueError("数据包文件不完整")
+
+        self.built_at = built_at
+        self.poi_count = n_pois
+        self.keywords: Tuple[str, ...] = tuple(self._string(idx) for idx in self._views["keywords"])
+        self._keyword_bits = {keyword: 1 << bit for bit, keyword in enumerate(self.keywords)}
+        self._tag_cache: Dict[int, Tuple[str, ...]] = {}
+        cities = self._views["cities"]
+        self._cities: Dict[str, Tuple[int, int, int]] = {
+            self._string(cities[i]): (cities[i + 1], cities[i + 2], cities[i + 3])
+            for i in range(0, len(cities), _CITY_FIELDS)
+        }
+
+    @property
+    def cities(self) -> List[str]:
+        return list(self._cities)
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.built_at)
+
+    def has_city(self, city: str) -> bool:
+        return city in self._cities
+
+    def _string(self, idx: int) -> str:
+        return str(self._blob[self._string_offsets[idx]:self._string_offsets[idx + 1]], "utf-8")
+
+    def _tag_keywords(self, tags: int) -> Tuple[str, ...]:
+        # 标签组合很少,解码结果按位掩码缓存
+        keywords = self._tag_cache.get(tags)
+        if keywords is None:
+            keywords = self._tag_cache[tags] = tuple(
+                keyword for keyword, bit in self._keyword_bits.items() if tags & bit
+            )
+        return keywords
+
+    def _candidate(self, row: int) -> POICandidate:
+        views = self._views
+        cost = views["cost"][row]
+        return POICandidate(
+            id=self._string(views["id"][row]),
+            name=self._string(views["name"][row]),
+            category=self._string(views["category"][row]),
+            address=self._string(views["address"][row]),
+            longitude=views["longitude"][row] / _MICRO,
+            latitude=views["latitude"][row] / _MICRO,
+            rating=views["rating"][row] / 10,
+            cost=None if math.isnan(cost) else cost,
+            popularity=views["popularity"][row] / 100,
+            typecode=self._string(views["typecode"][row]),
+            keywords=self._tag_keywords(views["tags"][row]),
+        )
+
+    def _select(self, start: int, count: int, mask: int, limit: int) -> List[POICandidate]:
+        tags = self._views["tags"]
+        rows = []
+        for row in range(start, start + count):
+            if not mask or tags[row] & mask:
+                rows.append(row)
+                if len(rows) >= limit:
+                    break
+        return [self._candidate(row) for row in rows]
+
+    def attractions(
+        self, city: str, keywords: Optional[Iterable[str]] = None, limit: int = 20
+    ) -> Tuple[List[POICandidate], List[str]]:
+        """
+        按偏好关键词取景点候选
+
+        Args:
+            city: 规范城市名
+            keywords: 偏好关键词,为空时不过滤
+            limit: 最多返回的候选数
+
+        Returns:
+            (候选景点, 数据包未覆盖的关键词); 城市不在数据包中时全部关键词都未覆盖
+        """
+        keywords = list(keywords or [])
+        entry = self._cities.get(city)
+        if entry is None:
+            CITY_PACK_LOOKUPS.inc(kind="attraction", result="miss")
+            return [], keywords
+        missing = [keyword for keyword in keywords if keyword not in self._keyword_bits]
+        if keywords and len(missing) == len(keywords):
+            CITY_PACK_LOOKUPS.inc(kind="attraction", result="miss")
+            return [], missing
+        mask = 0
+        for keyword in keywords:
+            mask |= self._keyword_bits.get(keyword, 0)
+        start, n_attractions, _ = entry
+        candidates = self._select(start, n_attractions, mask, limit)
+        CITY_PACK_LOOKUPS.inc(kind="attraction", result="partial" if missing or not candidates else "hit")
+        return candidates, missing
+
+    def hotels(self, city: str, keyword: Optional[str] = None, limit: int = 10) -> List[POICandidate]:
+        """取酒店候选; 关键词(如"经济型酒店")在数据包中时按其过滤,否则按排名返回"""
+        entry = self._cities.get(city)
+        if entry is None:
+            CITY_PACK_LOOKUPS.inc(kind="hotel", result="miss")
+            return []
+        start, n_attractions, n_hotels = entry
+        mask = self._keyword_bits.get(keyword, 0) if keyword else 0
+        candidates = self._select(start + n_attractions, n_hotels, mask, limit)
+        if mask and not candidates:
+            candidates = self._select(start + n_attractions, n_hotels, 0, limit)
+        CITY_PACK_LOOKUPS.inc(kind="hotel", result="hit" if candidates else "miss")
+        return candidates
+
+    def close(self) -> None:
+        for view in self._views.values():
+            view.release()
+        self._blob.release()
+        self._mmap.close()
+
+
+# 全局数据包实例
+_city_pack: Optional[CityPack] = None
+_city_pack_loaded = False
+_city_pack_lock = threading.Lock()
+
+
+def _load_city_pack() -> Optional[CityPack]:
+    settings = get_settings()
+    if not settings.city_pack_enabled:
+        return None
+    path = Path(settings.city_pack_path) if settings.city_pack_path else DEFAULT_PACK_FILE
+    if not path.exists():
+        logger.bind(path=str(path)).info("未找到离线城市数据包,景点与酒店候选将实时查询")
+        return None
+    try:
+        pack = CityPack(path)
+    except (OSError, ValueError) as exc:
+        logger.bind(path=str(path)).warning("离线城市数据包加载失败,将实时查询: {}", exc)
+        return None
+    max_age = settings.city_pack_max_age_days * 86400
+    if max_age > 0 and pack.age_seconds > max_age:
+        logger.bind(path=str(path), age_days=round(pack.age_seconds / 86400, 1)).warning(
+            "离线城市数据包已过期,将实时查询; 请重新运行构建命令"
+        )
+        pack.close()
+        return None
+    logger.bind(path=str(path), cities=len(pack.cities), pois=pack.poi_count).info("离线城市数据包已加载")
+    return pack
+
+
+def get_city_pack() -> Optional[CityPack]:
+    """获取离线城市数据包实例(单例模式,首次调用时mmap); 未启用、不存在、损坏或过期时返回None"""
+    global _city_pack, _city_pack_loaded
+
+    if not _city_pack_loaded:
+        with _city_pack_lock:
+            if not _city_pack_loaded:
+                _city_pack = _load_city_pack()
+                _city_pack_loaded = True
+
+    return _city_pack
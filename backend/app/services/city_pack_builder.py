@@ -0,0 +1,128 @@
+"""离线城市数据包构建命令
+
+对每个城市按偏好关键词和住宿类型调用高德搜索(经过工具缓存与配额守卫),去重合并(见poi_dedup),
+取排名靠前的景点与酒店写入数据包。建议定期(如每周)重新构建,服务启动时加载新文件。
+
+用法(在backend目录下执行,需要AMAP_API_KEY):
+    python -m app.services.city_pack_builder --cities 北京,上海,杭州,成都,西安
+    python -m app.services.city_pack_builder --cities 北京 --details --output /data/city_packs.bin
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from ..config import get_settings
+from .amap_service import AmapService, get_amap_service
+from .city_pack import DEFAULT_PACK_FILE, write_city_pack
+from .gazetteer import canonical_city
+from .poi_candidates import POICandidate, candidate_from_amap
+from .poi_dedup import merge_candidates
+
+# 与前端的偏好/住宿选项一致; "景点"作为无偏好时的通用关键词
+DEFAULT_ATTRACTION_KEYWORDS = ("景点", "历史文化", "自然风光", "美食", "购物", "艺术", "休闲")
+DEFAULT_HOTEL_KEYWORDS = ("酒店", "经济型酒店", "舒适型酒店", "豪华酒店", "民宿")
+
+
+def _search_all(
+    service: AmapService, city: str, keywords: Sequence[str], executor: ThreadPoolExecutor
+) -> List[POICandidate]:
+    results = executor.map(lambda keyword: service.search_candidates(keyword, city), keywords)
+    return merge_candidates(results)
+
+
+def _fill_details(service: AmapService, candidates: List[POICandidate]) -> List[POICandidate]:
+    """文本搜索结果缺少评分/价格时,用POI详情补全(有限并发)"""
+    missing = [candidate.id for candidate in candidates if not candidate.rating]
+    if not missing:
+        return candidates
+    details = asyncio.run(service.get_poi_details(missing))
+    filled = []
+    for candidate in candidates:
+        detail = candidate_from_amap(details.get(candidate.id) or {})
+        if detail is not None:
+            candidate = replace(
+                candidate,
+                rating=candidate.rating or detail.rating,
+                cost=candidate.cost if candidate.cost is not None else detail.cost,
+                category=candidate.category or detail.category,
+            )
+        filled.append(candidate)
+    return filled
+
+
+def build_city(
+    service: AmapService,
+    city: str,
+    attraction_keywords: Sequence[str] = DEFAULT_ATTRACTION_KEYWORDS,
+    hotel_keywords: Sequence[str] = DEFAULT_HOTEL_KEYWORDS,
+    max_attractions: int = 150,
+    max_hotels: int = 60,
+    details: bool = False,
+    concurrency: int = 4,
+) -> Tuple[List[POICandidate], List[POICandidate]]:
+    """
+    抓取单个城市的景点与酒店候选
+
+    Returns:
+        (景点, 酒店),均按热度降序
+    """
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="city-pack") as executor:
+        attractions = _search_all(service, city, attraction_keywords, executor)[:max_attractions]
+        hotel_ids = {candidate.id for candidate in attractions}
+        hotels = [
+            candidate for candidate in _search_all(service, city, hotel_keywords, executor)
+            if candidate.id not in hotel_ids
+        ][:max_hotels]
+    if details:
+        attractions = _fill_details(service, attractions)
+        hotels = _fill_details(service, hotels)
+    return attractions, hotels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="构建离线城市数据包(热门景点与酒店快照)")
+    parser.add_argument("--cities", required=True, help="逗号分隔的城市列表")
+    parser.add_argument("--keywords", default=",".join(DEFAULT_ATTRACTION_KEYWORDS), help="景点搜索关键词")
+    parser.add_argument("--hotel-keywords", default=",".join(DEFAULT_HOTEL_KEYWORDS), help="酒店搜索关键词")
+    parser.add_argument("--max-attractions", type=int, default=150, help="每个城市保留的景点数")
+    parser.add_argument("--max-hotels", type=int, default=60, help="每个城市保留的酒店数")
+    parser.add_argument("--details", action="store_true", help="用POI详情补全评分与价格(调用次数较多)")
+    parser.add_argument("--concurrency", type=int, default=4, help="同一城市的并发搜索数")
+    parser.add_argument("--output", default="", help="输出文件,默认使用CITY_PACK_PATH或app/data/city_packs.bin")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    output = Path(args.output or settings.city_pack_path or DEFAULT_PACK_FILE)
+    attraction_keywords = [k.strip() for k in args.keywords.split(",") if k.strip()]
+    hotel_keywords = [k.strip() for k in args.hotel_keywords.split(",") if k.strip()]
+    service = get_amap_service()
+
+    packs: Dict[str, Tuple[List[POICandidate], List[POICandidate]]] = {}
+    for city in dict.fromkeys(canonical_city(c) for c in args.cities.split(",") if c.strip()):
+        started = time.perf_counter()
+        attractions, hotels = build_city(
+            service, city, attraction_keywords, hotel_keywords,
+            args.max_attractions, args.max_hotels, args.details, args.concurrency,
+        )
+        elapsed = time.perf_counter() - started
+        if not attractions and not hotels:
+            print(f"⚠️  {city}: 未获取到POI,跳过 ({elapsed:.1f}s)")
+            continue
+        packs[city] = (attractions, hotels)
+        print(f"✅ {city}: 景点{len(attractions)}个, 酒店{len(hotels)}个 ({elapsed:.1f}s)")
+
+    if not packs:
+        raise SystemExit("没有可写入的城市数据")
+    size = write_city_pack(output, packs)
+    print(f"📦 已写入 {output}: {len(packs)}个城市, {size / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""请求截止时间(deadline)
+
+每个规划请求创建一个Deadline,激活后写入contextvar,经bind_context传递到阶段线程、对冲尝试与LLM客户端:
+- Deadline.run(): 在独立线程中执行一个阶段,最多等待剩余时间; 超时后取消该请求所有进行中的LLM请求,
+  并抛出DeadlineExceeded,由调用方用已获得的部分结果组装降级计划
+- 仍在运行的落后任务(straggler)之后发起的LLM请求会被立即取消,高德工具调用直接返回错误(不消耗配额),
+  缓存命中的结果仍然可用
+- 异步任务被取消或超时时调用expire(),正在运行的阶段随LLM请求一起中止,规划线程尽快返回
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+
+from .llm_service import CancelScope, cancel_scope_var
+from .metrics import REGISTRY, bind_context
+
+T = TypeVar("T")
+
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    "aitp_deadline_exceeded_total", "Stages or tool calls abandoned because the request deadline expired", ("stage",)
+)
+
+# 留给降级计划组装与保存的时间(秒); 外层另有截止时间(如异步任务)时从中扣除
+RESULT_RESERVE_SECONDS = 2.0
+
+# 阶段使用独立线程池: 超时后调用方立即返回,落后的阶段在这里运行到结束,不占用请求处理线程
+_stage_executor = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix="deadline-stage")
+
+
+class DeadlineExceeded(Exception):
+    """请求超出截止时间"""
+
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"超出截止时间({budget:g}秒),中止于{stage}阶段")
+        self.stage = stage
+        self.budget = budget
+
+
+class Deadline:
+    """
+    单个请求的截止时间
+
+    Args:
+        budget: 从现在起可用的时间(秒)
+    """
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+        # 该请求的LLM调用都登记在这里(对冲尝试使用其子范围),到期时整体取消
+        self.scope = CancelScope()
+        self.expired_stage: Optional[str] = None
+
+    def remaining(self) -> float:
+        if self.expired_stage is not None:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        # expire()可能在到期前被调用(如任务被取消)
+        return self.expired_stage is not None or time.monotonic() >= self.expires_at
+
+    def expire(self, stage: str) -> DeadlineExceeded:
+        """标记到期并取消进行中的LLM请求,返回待抛出的异常"""
+        if self.expired_stage is None:
+            self.expired_stage = stage
+            DEADLINE_EXCEEDED.inc(stage=stage)
+        self.scope.cancel()
+        return DeadlineExceeded(stage, self.budget)
+
+    def check(self, stage: str) -> None:
+        """已到期时抛出DeadlineExceeded"""
+        if self.expired:
+            raise self.expire(stage)
+
+    def run(self, stage: str, func: Callable[..., T], *args) -> T:
+        """
+        在阶段线程中执行func,最多等待剩余时间
+
+        Raises:
+            DeadlineExceeded: 到期时(包括阶段因到期被取消而失败)
+        """
+        self.check(stage)
+        future = _stage_executor.submit(bind_context(func, *args))
+        try:
+            return future.result(timeout=self.remaining())
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise self.expire(stage) from None
+        except Exception:
+            # 同一截止时间下的其它阶段(如多城市中的另一个城市)到期时,本阶段的LLM请求也会被取消
+            if self.expired:
+                raise self.expire(stage) from None
+            raise
+
+    def enter(self, context: contextvars.Context) -> None:
+        """在给定上下文(如异步任务自有的上下文)中生效,不恢复; 之后在其中发起的规划沿用本截止时间"""
+        context.run(deadline_var.set, self)
+        context.run(cancel_scope_var.set, self.scope)
+
+    @contextmanager
+    def activate(self) -> Iterator["Deadline"]:
+        """在当前上下文中生效: 之后的LLM请求登记到本截止时间的取消范围"""
+        deadline_token = deadline_var.set(self)
+        scope_token = cancel_scope_var.set(self.scope)
+        try:
+            yield self
+        finally:
+            cancel_scope_var.reset(scope_token)
+            deadline_var.reset(deadline_token)
+
+
+# 当前请求的截止时间,跨越线程池边界时需配合bind_context传递
+deadline_var: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """当前请求的截止时间,未设置时为None"""
+    return deadline_var.get()
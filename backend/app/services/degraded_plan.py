@@ -0,0 +1,154 @@
+"""降级计划: 规划超出截止时间或失败时,用已获得的候选在本地组装行程(不调用LLM或外部服务)
+
+景点按排名依次作为每天的起点,再按距离就近补足当天的景点(贪心最近邻),同一天的景点集中在一个区域;
+酒店取离所选景点中心最近的候选。候选不足的日期只保留餐饮建议。结果带degraded标记与原因,不写入计划缓存。
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from ..models.schemas import Attraction, DayPlan, Hotel, Location, Meal, TripPlan, TripRequest
+from .plan_edit import recompute_budget
+from .poi_candidates import POICandidate
+from .poi_dedup import distance_m
+
+MAX_ATTRACTIONS_PER_DAY = 3
+_VISIT_MINUTES = 120
+_DATE_FORMAT = "%Y-%m-%d"
+
+
+@dataclass
+class PartialResults:
+    """规划过程中已获得的结构化结果(排序后的候选),截止时间到达时用于组装降级计划"""
+    attractions: List[POICandidate] = field(default_factory=list)
+    hotels: List[POICandidate] = field(default_factory=list)
+
+
+def group_by_day(
+    candidates: List[POICandidate], days: int, per_day: int = MAX_ATTRACTIONS_PER_DAY
+) -> List[List[POICandidate]]:
+    """
+    把排序后的候选分到各天: 剩余候选中排名最高的作为当天起点,之后每次取离上一个景点最近的候选
+
+    Returns:
+        每天的景点(按游览顺序); 候选不足时天数少于days
+    """
+    if not candidates or days <= 0:
+        return []
+    # 候选较少时均匀分到各天,而不是集中在前几天
+    per_day = max(1, min(per_day, math.ceil(len(candidates) / days)))
+    remaining = list(candidates[: days * per_day])
+    groups: List[List[POICandidate]] = []
+    while remaining and len(groups) < days:
+        group = [remaining.pop(0)]
+        while remaining and len(group) < per_day:
+            last = group[-1]
+            nearest = min(range(len(remaining)), key=lambda index: distance_m(last, remaining[index]))
+            group.append(remaining.pop(nearest))
+        groups.append(group)
+    return groups
+
+
+def _attraction(candidate: POICandidate, city: str) -> Attraction:
+    category = candidate.category.split(";")[-1] if candidate.category else "景点"
+    return Attraction(
+        name=candidate.name,
+        address=candidate.address or city,
+        location=Location(longitude=candidate.longitude, latitude=candidate.latitude),
+        visit_duration=_VISIT_MINUTES,
+        description=category,
+        category=category,
+        rating=candidate.rating or None,
+        poi_id=candidate.id,
+    )
+
+
+def _hotel(candidate: POICandidate, accommodation: str) -> Hotel:
+    return Hotel(
+        name=candidate.name,
+        address=candidate.address,
+        location=Location(longitude=candidate.longitude, latitude=candidate.latitude),
+        rating=f"{candidate.rating:.1f}" if candidate.rating else "",
+        type=accommodation,
+        estimated_cost=int(candidate.cost or 0),
+    )
+
+
+def _pick_hotel(hotels: List[POICandidate], attractions: List[POICandidate]) -> Optional[POICandidate]:
+    """离所选景点中心最近的酒店; 没有景点时取排名第一的酒店"""
+    if not hotels or not attractions:
+        return hotels[0] if hotels else None
+    center = POICandidate(
+        id="", name="", category="", address="",
+        longitude=sum(c.longitude for c in attractions) / len(attractions),
+        latitude=sum(c.latitude for c in attractions) / len(attractions),
+    )
+    return min(hotels, key=lambda hotel: distance_m(center, hotel))
+
+
+def _meals(day_number: int) -> List[Meal]:
+    return [
+        Meal(type="breakfast", name=f"第{day_number}天早餐", description="当地特色早餐"),
+        Meal(type="lunch", name=f"第{day_number}天午餐", description="在景点附近用餐"),
+        Meal(type="dinner", name=f"第{day_number}天晚餐", description="品尝当地特色"),
+    ]
+
+
+def build_degraded_plan(request: TripRequest, partial: PartialResults, reason: str) -> TripPlan:
+    """
+    用已获得的候选组装降级计划
+
+    Args:
+        request: 旅行请求(规范城市名)
+        partial: 已获得的景点/酒店候选(已排序)
+        reason: 降级原因,写入degraded_reason
+
+    Returns:
+        标记为degraded的旅行计划
+    """
+    groups = group_by_day(partial.attractions, request.travel_days)
+    selected = [candidate for group in groups for candidate in group]
+    hotel_candidate = _pick_hotel(partial.hotels, selected)
+    hotel = _hotel(hotel_candidate, request.accommodation) if hotel_candidate else None
+    start_date = datetime.strptime(request.start_date, _DATE_FORMAT)
+
+    days = []
+    for index in range(request.travel_days):
+        group = groups[index] if index < len(groups) else []
+        if group:
+            description = f"第{index + 1}天: {' → '.join(c.name for c in group)}(同一区域就近游览)"
+        else:
+            description = f"第{index + 1}天: 暂未获取到更多景点,建议自由活动或稍后重新生成行程"
+        days.append(DayPlan(
+            date=(start_date + timedelta(days=index)).strftime(_DATE_FORMAT),
+            day_index=index,
+            description=description,
+            transportation=request.transportation,
+            accommodation=request.accommodation,
+            hotel=hotel,
+            attractions=[_attraction(candidate, request.city) for candidate in group],
+            meals=_meals(index + 1),
+        ))
+
+    if selected:
+        summary = (
+            f"以下{request.city}{request.travel_days}日行程根据已获取的{len(selected)}个景点在本地生成,"
+            "未经行程规划模型优化,同一天的景点按位置就近安排"
+        )
+    else:
+        summary = f"暂未获取到{request.city}的景点数据,以下仅为每日框架"
+    return TripPlan(
+        city=request.city,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        days=days,
+        weather_info=[],
+        overall_suggestions=f"{reason}。{summary}; 建议稍后重新生成以获得完整计划,出行前请查看各景点的开放时间。",
+        budget=recompute_budget(days),
+        degraded=True,
+        degraded_reason=reason,
+    )
@@ -0,0 +1,235 @@
+"""中国城市地名索引(目的地规范化)"""
+
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_DATA_FILE = Path(__file__).resolve().parent.parent / "data" / "cities.tsv"
+
+# 行政区划后缀,按长度降序以便最长匹配
+_ADMIN_SUFFIXES = (
+    "特别行政区", "维吾尔自治区", "壮族自治区", "回族自治区", "自治区", "自治州",
+    "地区", "省", "市", "县", "区", "盟",
+)
+_ASCII_NOISE = re.compile(r"[\s'’\-_.]+")
+
+# 出现在这些动词之后的地名更可能是目的地
+_DESTINATION_CUES = ("去", "到", "前往", "飞往", "飞去", "回", "游")
+
+# 扫描文本时忽略的短别名长度(单字简称如"沪""蓉"只用于精确规范化)
+_MIN_SCAN_LENGTH = 2
+
+
+@dataclass(frozen=True)
+class CityEntry:
+    """城市条目"""
+    adcode: str
+    full_name: str
+    name: str
+    level: str
+    longitude: float
+    latitude: float
+    pinyin: str = ""
+    aliases: Tuple[str, ...] = field(default_factory=tuple)
+
+
+@dataclass(frozen=True)
+class CityMatch:
+    """文本中命中的城市"""
+    start: int
+    end: int
+    text: str
+    entry: CityEntry
+
+
+def _normalize_key(text: str) -> str:
+    """统一大小写并去掉空白与英文连接符"""
+    return _ASCII_NOISE.sub("", text.strip().lower())
+
+
+def _strip_admin_suffix(text: str) -> str:
+    for suffix in _ADMIN_SUFFIXES:
+        if text.endswith(suffix) and len(text) > len(suffix) + 1:
+            return text[: -len(suffix)]
+    return text
+
+
+class _AhoCorasick:
+    """多模式串匹配自动机,构建一次后对任意文本线性扫描"""
+
+    def __init__(self, patterns: Dict[str, CityEntry]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, CityEntry]]] = [[]]
+
+        for pattern, entry in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = nxt
+            self._output[node].append((len(pattern), entry))
+
+        queue = list(self._goto[0].values())
+        while queue:
+            next_queue = []
+            for node in queue:
+                for ch, child in self._goto[node].items():
+                    fallback = self._fail[node]
+                    while fallback and ch not in self._goto[fallback]:
+                        fallback = self._fail[fallback]
+                    candidate = self._goto[fallback].get(ch, 0)
+                    self._fail[child] = candidate if candidate != child else 0
+                    self._output[child] = self._output[child] + self._output[self._fail[child]]
+                    next_queue.append(child)
+            queue = next_queue
+
+    def iter_matches(self, text: str):
+        node = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for index, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, entry in output[node]:
+                yield index - length + 1, index + 1, entry
+
+
+class Gazetteer:
+    """城市名称、别名与拼音到规范城市的索引"""
+
+    def __init__(self, entries: List[CityEntry]):
+        self.entries = entries
+        self._exact: Dict[str, CityEntry] = {}
+        self._by_adcode: Dict[str, CityEntry] = {}
+
+        scan_patterns: Dict[str, CityEntry] = {}
+        for entry in entries:
+            self._by_adcode[entry.adcode] = entry
+            keys = [entry.full_name, entry.name, entry.pinyin, *entry.aliases]
+            for key in keys:
+                normalized = _normalize_key(key) if key else ""
+                if not normalized:
+                    continue
+                # 先出现的条目优先(直辖市/省级在前,避免被同名别名覆盖)
+                self._exact.setdefault(normalized, entry)
+                if len(normalized) >= _MIN_SCAN_LENGTH:
+                    scan_patterns.setdefault(normalized, entry)
+
+        self._automaton = _AhoCorasick(scan_patterns)
+
+    @classmethod
+    def from_file(cls, path: Path = _DATA_FILE) -> "Gazetteer":
+        entries: List[CityEntry] = []
+        with path.open(encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                adcode, full_name, name, level, lng, lat, pinyin, aliases = line.rstrip("\n").split("\t")
+                entries.append(CityEntry(
+                    adcode=adcode,
+                    full_name=full_name,
+                    name=name,
+                    level=level,
+                    longitude=float(lng),
+                    latitude=float(lat),
+                    pinyin=pinyin,
+                    aliases=tuple(a for a in aliases.split("|") if a),
+                ))
+        return cls(entries)
+
+    def lookup(self, name: Optional[str]) -> Optional[CityEntry]:
+        """精确查找(忽略行政区划后缀、大小写与空白)"""
+        if not name:
+            return None
+        key = _normalize_key(name)
+        if not key:
+            return None
+        entry = self._exact.get(key)
+        if entry is None:
+            entry = self._exact.get(_strip_admin_suffix(key))
+        return entry
+
+    def by_adcode(self, adcode: str) -> Optional[CityEntry]:
+        return self._by_adcode.get(adcode)
+
+    def find_all(self, text: str) -> List[CityMatch]:
+        """扫描文本,返回从左到右、互不重叠的最长匹配"""
+        if not text:
+            return []
+        lowered = text.lower()
+        candidates = sorted(
+            self._automaton.iter_matches(lowered),
+            key=lambda item: (item[0], -(item[1] - item[0])),
+        )
+        matches: List[CityMatch] = []
+        cursor = 0
+        for start, end, entry in candidates:
+            if start < cursor:
+                continue
+            if lowered[start:end].isascii() and not _ascii_word_boundary(lowered, start, end):
+                continue
+            matches.append(CityMatch(start=start, end=end, text=text[start:end], entry=entry))
+            cursor = end
+        return matches
+
+    def find_destination(self, text: str) -> Optional[CityMatch]:
+        """在自然语言中挑选最可能的目的地: 优先紧跟"去/到"等动词的城市"""
+        matches = self.find_all(text)
+        if not matches:
+            return None
+        for match in matches:
+            prefix = text[max(0, match.start - 2): match.start]
+            if prefix.endswith(_DESTINATION_CUES):
+                return match
+        return matches[0]
+
+    def canonicalize(self, name: Optional[str]) -> Optional[str]:
+        """返回规范城市名; 无法识别时保留原文(去除首尾空白)"""
+        if name is None:
+            return None
+        cleaned = name.strip()
+        entry = self.lookup(cleaned)
+        if entry is None:
+            matches = self.find_all(cleaned)
+            if len(matches) == 1:
+                entry = matches[0].entry
+        return entry.name if entry else cleaned
+
+
+def _ascii_word_boundary(text: str, start: int, end: int) -> bool:
+    """英文别名需要完整单词匹配,避免"dali"命中"vandalism"之类"""
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not (before.isascii() and before.isalnum()) and not (after.isascii() and after.isalnum())
+
+
+# 全局索引实例
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """获取城市索引实例(单例模式,首次调用时加载)"""
+    global _gazetteer
+
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.from_file()
+
+    return _gazetteer
+
+
+def canonical_city(name: Optional[str]) -> Optional[str]:
+    """规范化城市名,供请求字段、缓存键和高德工具参数统一使用"""
+    return get_gazetteer().canonicalize(name)
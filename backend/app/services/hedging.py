@@ -0,0 +1,167 @@
+"""对冲请求(hedged requests)
+
+首个请求在自适应阈值(近期耗时的百分位)内未完成时,再发起一个相同请求,先返回有效结果者胜出,
+落败一方通过CancelScope取消其进行中的LLM请求。对冲次数受预算限制: 每个请求积累budget_ratio个
+额度,每次对冲消耗1个,从而把额外的token花费控制在请求量的固定比例内。
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, TypeVar
+
+from ..logging_config import logger
+from .llm_service import CancelScope, cancel_scope_var
+from .metrics import REGISTRY, RETRIES, bind_context
+
+T = TypeVar("T")
+
+HEDGES_FIRED = REGISTRY.counter("aitp_hedges_fired_total", "Hedged requests started", ("stage",))
+HEDGES_SKIPPED = REGISTRY.counter(
+    "aitp_hedges_skipped_total", "Hedges not started because the budget was exhausted", ("stage",)
+)
+HEDGE_WINS = REGISTRY.counter(
+    "aitp_hedge_wins_total", "Which attempt produced the accepted result", ("stage", "winner")
+)
+
+# 对冲尝试使用独立线程池,避免占用请求处理或规划任务的线程
+_hedge_executor = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+
+class HedgePolicy:
+    """
+    对冲策略: 自适应延迟阈值 + 对冲预算
+
+    Args:
+        initial_delay: 样本不足时使用的阈值(秒)
+        percentile: 阈值取近期成功耗时的百分位
+        min_delay: 阈值下限(秒)
+        budget_ratio: 对冲请求数占请求总数的比例上限
+        min_samples: 开始使用百分位阈值所需的样本数
+        window: 保留的耗时样本数
+    """
+
+    def __init__(
+        self,
+        initial_delay: float,
+        percentile: float = 90.0,
+        min_delay: float = 1.0,
+        budget_ratio: float = 0.1,
+        min_samples: int = 10,
+        window: int = 200,
+    ):
+        self.initial_delay = initial_delay
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        # 允许少量突发对冲,之后按请求量积累
+        self._credit_cap = max(1.0, budget_ratio * 10)
+        self._credits = 1.0 if budget_ratio > 0 else 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def delay(self) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return max(self.min_delay, self.initial_delay)
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100.0))
+        return max(self.min_delay, samples[index])
+
+    def on_request(self) -> None:
+        with self._lock:
+            self._credits = min(self._credit_cap, self._credits + self.budget_ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._credits >= 1.0:
+                self._credits -= 1.0
+                return True
+            return False
+
+
+def run_hedged(
+    attempt: Callable[[], T],
+    policy: HedgePolicy,
+    is_valid: Callable[[T], bool],
+    stage: str,
+    max_attempts: int = 2,
+) -> T:
+    """
+    执行attempt,必要时对冲; 失败或无效结果会立即补发(不再等待),总尝试次数不超过max_attempts
+
+    Returns:
+        最先完成的有效结果; 均无效时返回最后一个结果,均失败时抛出最后一个异常
+    """
+    policy.on_request()
+    scopes: Dict[concurrent.futures.Future, CancelScope] = {}
+    started_at: Dict[concurrent.futures.Future, float] = {}
+    labels: Dict[concurrent.futures.Future, str] = {}
+
+    def run_in_scope(scope: CancelScope) -> T:
+        cancel_scope_var.set(scope)
+        return attempt()
+
+    def launch(label: str) -> concurrent.futures.Future:
+        # 作为请求截止时间取消范围的子范围: 到期时进行中的尝试一并取消
+        scope = CancelScope(parent=cancel_scope_var.get())
+        future = _hedge_executor.submit(bind_context(run_in_scope, scope))
+        scopes[future], started_at[future], labels[future] = scope, time.monotonic(), label
+        return future
+
+    primary = launch("primary")
+    pending = {primary}
+    hedge_armed = max_attempts > 1
+    last_result: Optional[T] = None
+    last_error: Optional[BaseException] = None
+    has_result = False
+
+    while pending:
+        timeout = None
+        if hedge_armed:
+            timeout = max(0.0, policy.delay() - (time.monotonic() - started_at[primary]))
+        done, pending = concurrent.futures.wait(pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+
+        if not done:
+            # 首个请求超过阈值仍未完成: 在预算内发起对冲
+            hedge_armed = False
+            if policy.try_acquire():
+                HEDGES_FIRED.inc(stage=stage)
+                logger.bind(stage=stage, threshold=round(policy.delay(), 2)).info("请求超过延迟阈值,发起对冲请求")
+                pending.add(launch("hedge"))
+            else:
+                HEDGES_SKIPPED.inc(stage=stage)
+            continue
+
+        for future in done:
+            try:
+                result = future.result()
+            except BaseException as exc:  # noqa: BLE001 - 包括落败方被取消时的CancelledError
+                last_error = exc
+                continue
+            if is_valid(result):
+                policy.observe(time.monotonic() - started_at[future])
+                HEDGE_WINS.inc(stage=stage, winner=labels[future])
+                for other in pending:
+                    scopes[other].cancel()
+                return result
+            last_result, has_result = result, True
+
+        # 已完成的尝试都无效且没有其它进行中的尝试: 有名额时立即补发
+        if not pending and len(scopes) < max_attempts:
+            hedge_armed = False
+            RETRIES.inc(stage=stage)
+            pending.add(launch("retry"))
+
+    if has_result:
+        return last_result  # type: ignore[return-value]
+    assert last_error is not None
+    raise last_error
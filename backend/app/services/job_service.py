@@ -0,0 +1,271 @@
+"""异步规划任务队列"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..config import get_settings
+from ..models.schemas import PlanningJobResponse
+from ..services.deadline import RESULT_RESERVE_SECONDS, Deadline
+from ..services.metrics import REGISTRY, bind_context, stage_timings_var
+
+JobRunner = Callable[[], Awaitable[Dict[str, Any]]]
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+JOB_TIMEOUT = "timeout"
+FINISHED_STATES = {JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED, JOB_TIMEOUT}
+_STATUS_MESSAGES = {
+    JOB_QUEUED: "任务排队中",
+    JOB_RUNNING: "任务执行中",
+    JOB_SUCCEEDED: "旅行计划生成成功",
+    JOB_FAILED: "任务执行失败",
+    JOB_CANCELLED: "任务已取消",
+    JOB_TIMEOUT: "任务超时",
+}
+
+
+class PlanningJobError(Exception):
+    """规划任务异常"""
+
+
+class JobQueueFullError(PlanningJobError):
+    """任务队列已满"""
+
+
+@dataclass
+class PlanningJob:
+    """一个排队中或已完成的规划任务"""
+    id: str
+    kind: str
+    runner: JobRunner = field(repr=False)
+    deadline_seconds: float
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    # 提交时的上下文(请求ID等),任务在worker中执行时沿用
+    context: contextvars.Context = field(default_factory=contextvars.copy_context, repr=False)
+    # 开始执行时创建,在任务上下文中生效; 取消或超时时使其到期,中止仍在线程池中运行的规划
+    deadline: Optional[Deadline] = field(default=None, repr=False)
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def deadline_at(self) -> float:
+        return self.created_at + self.deadline_seconds
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        def iso(ts: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts else None
+
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": iso(self.created_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "deadline_at": iso(self.deadline_at),
+            "error": self.error,
+            **self.result,
+        }
+
+    def to_response(self, message: Optional[str] = None) -> PlanningJobResponse:
+        return PlanningJobResponse(
+            success=self.status not in (JOB_FAILED, JOB_CANCELLED, JOB_TIMEOUT),
+            message=message or _STATUS_MESSAGES.get(self.status, ""),
+            **self.to_dict(),
+        )
+
+
+class PlanningJobManager:
+    """有界工作池: 固定数量的worker从有界队列取任务执行,结果保留一段时间供轮询"""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue: int = 32,
+        default_deadline: float = 180.0,
+        retention_seconds: float = 3600.0,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(1, max_queue)
+        self.default_deadline = default_deadline
+        self.retention_seconds = retention_seconds
+        # 规划调用是阻塞的,使用专用线程池以免占满默认executor
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="planning-job")
+        self._jobs: Dict[str, PlanningJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+
+    def _ensure_started(self) -> None:
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"planning-worker-{index}")
+            for index in range(self.max_workers)
+        ]
+
+    async def run_blocking(self, func: Callable, *args) -> Any:
+        """在任务专用线程池中执行阻塞函数"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, bind_context(func, *args))
+
+    def submit(self, kind: str, runner: JobRunner, deadline_seconds: Optional[float] = None) -> PlanningJob:
+        """提交任务,立即返回; 队列满时抛出JobQueueFullError"""
+        self._ensure_started()
+        self._purge_expired()
+
+        deadline = deadline_seconds if deadline_seconds and deadline_seconds > 0 else self.default_deadline
+        job = PlanningJob(id=uuid.uuid4().hex, kind=kind, runner=runner, deadline_seconds=deadline)
+        # 任务有独立的阶段耗时记录,不写入已结束的请求
+        job.context.run(stage_timings_var.set, {})
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull as exc:
+            raise JobQueueFullError(f"规划任务队列已满({self.max_queue}),请稍后重试") from exc
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[PlanningJob]:
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[PlanningJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job._task is not None:
+            job._task.cancel()
+            self._expire(job, "cancelled")
+        else:
+            # 仍在排队: 标记后worker取到时直接跳过
+            self._finish(job, JOB_CANCELLED, error="任务已取消")
+        return job
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def shutdown(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        for job in self._jobs.values():
+            if job._task is not None and not job.finished:
+                job._task.cancel()
+                self._expire(job, "cancelled")
+        self._workers = []
+        self._queue = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job: PlanningJob = await self._queue.get()
+            try:
+                if job.finished:
+                    continue
+                remaining = job.deadline_at - time.time()
+                if remaining <= 0:
+                    self._finish(job, JOB_TIMEOUT, error="任务排队超时")
+                    continue
+                await self._run(job, remaining)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: PlanningJob, remaining: float) -> None:
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        # 规划在任务截止前留出组装降级计划的时间(排队时间已从remaining中扣除)
+        job.deadline = Deadline(max(1.0, remaining - RESULT_RESERVE_SECONDS))
+        job.deadline.enter(job.context)
+        job._task = asyncio.create_task(job.runner(), context=job.context)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(job._task), timeout=remaining)
+        except asyncio.TimeoutError:
+            job._task.cancel()
+            self._expire(job, "job_timeout")
+            self._finish(job, JOB_TIMEOUT, error=f"任务超过截止时间({job.deadline_seconds:g}秒)")
+        except asyncio.CancelledError:
+            if not job._task.cancelled():
+                # worker自身被取消(应用关闭)
+                job._task.cancel()
+                self._expire(job, "cancelled")
+                self._finish(job, JOB_CANCELLED, error="服务关闭,任务已取消")
+                raise
+            self._finish(job, JOB_CANCELLED, error="任务已取消")
+        except Exception as exc:
+            self._finish(job, JOB_FAILED, error=str(exc) or exc.__class__.__name__)
+        else:
+            job.result = result or {}
+            self._finish(job, JOB_SUCCEEDED)
+        finally:
+            job._task = None
+
+    @staticmethod
+    def _expire(job: PlanningJob, stage: str) -> None:
+        """取消asyncio任务不会停止线程池中的规划: 使任务截止时间到期,进行中的阶段与LLM请求随之中止"""
+        if job.deadline is not None:
+            job.deadline.expire(stage)
+
+    @staticmethod
+    def _finish(job: PlanningJob, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# 全局任务管理器
+_job_manager: Optional[PlanningJobManager] = None
+
+
+def get_job_manager() -> PlanningJobManager:
+    """获取规划任务管理器实例(单例模式)"""
+    global _job_manager
+
+    if _job_manager is None:
+        settings = get_settings()
+        _job_manager = PlanningJobManager(
+            max_workers=settings.planning_job_workers,
+            max_queue=settings.planning_job_queue_size,
+            default_deadline=settings.planning_job_deadline_seconds,
+            retention_seconds=settings.planning_job_retention_seconds,
+        )
+        REGISTRY.gauge(
+            "aitp_planning_job_queue_depth", "Planning jobs waiting for a worker"
+        ).set_function(_job_manager.queue_depth)
+
+    return _job_manager
+
+
+async def shutdown_job_manager() -> None:
+    """应用关闭时取消仍在运行的任务"""
+    global _job_manager
+
+    if _job_manager is not None:
+        await _job_manager.shutdown()
+        _job_manager = None
@@ -0,0 +1,38 @@
+"""从工具/LLM的文本输出中提取JSON
+
+使用json.JSONDecoder.raw_decode从第一个"{"开始解码: 只向前扫描一次,遇到对象结束即停止,
+不像r'\\{.*\\}'那样贪婪匹配到文本末尾再回溯。前缀失败时最多再尝试少量候选起点,保证线性时间。
+"""
+
+import json
+from typing import Any, Optional
+
+_decoder = json.JSONDecoder()
+
+# 解码失败后继续尝试的"{"起点个数上限
+_MAX_CANDIDATES = 8
+
+
+def extract_json_object(text: str, max_candidates: int = _MAX_CANDIDATES) -> Optional[Any]:
+    """
+    提取文本中第一个完整的JSON对象
+
+    Args:
+        text: 原始文本(如"工具 'xxx' 执行结果:\\n{...}")
+        max_candidates: 最多尝试的"{"起点个数
+
+    Returns:
+        解析后的对象,找不到时返回None
+    """
+    if not text:
+        return None
+    index = text.find("{")
+    for _ in range(max_candidates):
+        if index == -1:
+            return None
+        try:
+            value, _ = _decoder.raw_decode(text, index)
+            return value
+        except ValueError:
+            index = text.find("{", index + 1)
+    return None
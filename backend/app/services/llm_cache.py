@@ -0,0 +1,137 @@
+"""LLM补全结果缓存
+
+按(模型, 消息, temperature, max_tokens, 其它参数)的哈希精确匹配:
+- 进程内LRU(条目数与TTL受限),可选写入共享缓存后端(sqlite/redis)以持久化并跨worker复用
+- temperature高于阈值、流式或多候选(n>1)等非确定性采样配置不缓存
+- 命中/未命中/跳过计入 aitp_cache_requests_total{cache="llm_completion"}
+- 回复先写入缓存,调用方校验失败(如计划无法解析)时调用discard_last_completion()删除,
+  避免重试/对冲命中同一个错误回复
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from aitravelplanner_core import AiTravelPlannerLLM
+from ..config import get_settings
+from .cache import TTLCache
+from .cache_backend import SharedCache, stable_key
+from .metrics import bind_context, record_cache
+
+_CACHE_NAME = "llm_completion"
+
+# 当前上下文中最近一次可缓存的补全(LLM实例, 缓存键),供调用方校验失败时删除
+_last_completion_var: contextvars.ContextVar[Optional[Tuple["CachedLLM", str]]] = contextvars.ContextVar(
+    "llm_last_completion", default=None
+)
+
+
+def discard_last_completion() -> None:
+    """删除当前上下文最近一次补全的缓存(命中或新写入的),下次相同请求重新调用LLM"""
+    last = _last_completion_var.get()
+    if last is not None:
+        llm, key = last
+        llm.discard(key)
+        _last_completion_var.set(None)
+
+
+class CachedLLM(AiTravelPlannerLLM):
+    """
+    带补全缓存的LLM客户端
+
+    只包装非流式的invoke/ainvoke(SimpleAgent与语音表单抽取均走这两个方法),其余接口保持原样。
+    子类通过覆盖_complete/_acomplete替换实际的请求方式。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        settings = get_settings()
+        self.cache_enabled = settings.llm_cache_enabled
+        self.cache_max_temperature = settings.llm_cache_max_temperature
+        self.completion_cache: TTLCache[str] = TTLCache(
+            settings.llm_cache_max_entries, settings.llm_cache_ttl_seconds, name=_CACHE_NAME
+        )
+        self.shared_cache: Optional[SharedCache] = (
+            SharedCache(f"{_CACHE_NAME}_shared", ttl=settings.llm_cache_ttl_seconds)
+            if settings.llm_cache_persist
+            else None
+        )
+        self.bypassed = 0
+
+    def invoke(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        key = self._lookup_key(messages, kwargs)
+        if key is None:
+            return self._complete(messages, **kwargs)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        response = self._complete(messages, **kwargs)
+        self._store(key, response)
+        return response
+
+    async def ainvoke(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        key = self._lookup_key(messages, kwargs)
+        if key is None:
+            return await self._acomplete(messages, **kwargs)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        response = await self._acomplete(messages, **kwargs)
+        self._store(key, response)
+        return response
+
+    def discard(self, key: str) -> None:
+        """删除一条补全缓存(调用方校验失败时)"""
+        self.completion_cache.delete(key)
+        if self.shared_cache is not None:
+            self.shared_cache.delete(key)
+
+    def _complete(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        return super().invoke(messages, **kwargs)
+
+    async def _acomplete(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, bind_context(self._complete, messages, **kwargs))
+
+    def _lookup_key(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> Optional[str]:
+        key = self.completion_key(messages, **kwargs) if self.cache_enabled else None
+        if key is None and self.cache_enabled:
+            self.bypassed += 1
+            record_cache(_CACHE_NAME, "bypass")
+        _last_completion_var.set((self, key) if key is not None else None)
+        return key
+
+    def _cached(self, key: str) -> Optional[str]:
+        cached = self.completion_cache.get(key)
+        if cached is None and self.shared_cache is not None:
+            cached = self.shared_cache.get(key)
+            if cached is not None:
+                self.completion_cache.set(key, cached)
+        return cached
+
+    def _store(self, key: str, response: str) -> None:
+        # 空回复通常意味着上游异常,不缓存
+        if response:
+            self.completion_cache.set(key, response)
+            if self.shared_cache is not None:
+                self.shared_cache.set(key, response)
+
+    def completion_key(self, messages: List[Dict[str, str]], **kwargs) -> Optional[str]:
+        """返回缓存键;非确定性采样配置返回None"""
+        temperature = kwargs.pop("temperature", self.temperature)
+        max_tokens = kwargs.pop("max_tokens", self.max_tokens)
+        if temperature is None or temperature > self.cache_max_temperature:
+            return None
+        if kwargs.get("stream") or (kwargs.get("n") or 1) != 1:
+            return None
+        raw = stable_key(self.model, messages, temperature, max_tokens, kwargs)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        stats = {**self.completion_cache.stats(), "bypassed": self.bypassed}
+        if self.shared_cache is not None:
+            stats["shared"] = self.shared_cache.stats()
+        return stats
@@ -1,37 +1,355 @@
-"""LLM服务模块"""
+"""LLM服务模块
+
+所有Agent与VoiceService共享同一个异步LLM客户端:
+- httpx.AsyncClient连接池(keep-alive),运行在独立的事件循环线程中
+- 全局令牌桶按每分钟请求数/token数限流,并限制并发请求数
+- 429/5xx与网络错误按指数退避重试(优先遵循Retry-After)
+同步调用(SimpleAgent)把请求提交到该事件循环并等待结果; 异步调用(VoiceService)直接await。
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import random
+import threading
+from typing import Any, Coroutine, Dict, List, Optional, Union
+
+import httpx
 
 from aitravelplanner_core import AiTravelPlannerLLM
 from ..config import get_settings
+from ..logging_config import logger
+from .llm_cache import CachedLLM
+from .metrics import RETRIES, span
+from .rate_limit import RateLimiter
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_MAX_RETRY_AFTER = 30.0
+
+
+class LLMServiceError(Exception):
+    """LLM请求失败(已用尽重试)"""
+
+
+class CancelScope:
+    """一组可整体取消的LLM请求(如对冲请求中落败的一方); 可嵌套,父范围取消时子范围一并取消"""
 
-# 全局LLM实例
-_llm_instance = None
+    def __init__(self, parent: Optional["CancelScope"] = None):
+        self._futures: List[Union[concurrent.futures.Future, "CancelScope"]] = []
+        self._cancelled = False
+        self._lock = threading.Lock()
+        if parent is not None:
+            parent.register(self)
 
+    def register(self, future: Union[concurrent.futures.Future, "CancelScope"]) -> None:
+        with self._lock:
+            if not self._cancelled:
+                self._futures.append(future)
+                return
+        future.cancel()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.cancel()
+
+
+# 当前线程/任务所属的取消范围; 同步调用会把请求登记进去
+cancel_scope_var: contextvars.ContextVar[Optional[CancelScope]] = contextvars.ContextVar(
+    "llm_cancel_scope", default=None
+)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int]) -> int:
+    """粗略估算一次请求消耗的token数(中文约每2字符1个token),用于限流预约"""
+    prompt = sum(len(str(message.get("content") or "")) for message in messages) // 2
+    return prompt + (max_tokens or 512)
+
+
+class AsyncLLMClient:
+    """
+    OpenAI兼容的异步LLM客户端(模型作为请求参数,不同模型共享连接池与限流)
 
-def get_llm() -> AiTravelPlannerLLM:
+    Args:
+        base_url: 服务地址
+        api_key: API密钥
+        timeout: 单次请求超时(秒)
+        rate_limiter: 全局限流器
+        max_concurrency: 同时进行的请求数上限
+        max_connections: 连接池大小
+        max_keepalive: 保持的空闲连接数
+        max_retries: 429/5xx重试次数
+        retry_base_delay: 退避基础延迟(秒)
     """
-    获取LLM实例(单例模式)
-    
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: float,
+        rate_limiter: RateLimiter,
+        max_concurrency: int = 8,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="llm-client", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=self.timeout,
+            limits=self._limits,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._ready.set()
+        self._loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """把协程提交到客户端事件循环,保留调用方的contextvars(请求ID、阶段耗时)"""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        context = contextvars.copy_context()
+
+        def on_done(task: asyncio.Task) -> None:
+            if task.cancelled():
+                future.cancel()
+                return
+            try:
+                if task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result())
+            except concurrent.futures.InvalidStateError:
+                # 调用方已取消
+                pass
+
+        def start() -> None:
+            if future.cancelled():
+                coro.close()
+                return
+            task = context.run(self._loop.create_task, coro)
+            task.add_done_callback(on_done)
+            # 调用方取消future时同时取消事件循环中的请求
+            future.add_done_callback(lambda f: f.cancelled() and self._loop.call_soon_threadsafe(task.cancel))
+
+        self._loop.call_soon_threadsafe(start)
+        return future
+
+    def complete_sync(self, **kwargs) -> str:
+        """同步调用(在线程中阻塞等待); 所属取消范围被取消时抛出CancelledError"""
+        future = self.submit(self.complete(**kwargs))
+        scope = cancel_scope_var.get()
+        if scope is not None:
+            scope.register(future)
+        return future.result()
+
+    async def acomplete(self, **kwargs) -> str:
+        """在任意事件循环中异步调用"""
+        return await asyncio.wrap_future(self.submit(self.complete(**kwargs)))
+
+    async def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        **kwargs: Any,
+    ) -> str:
+        """发送chat completion请求(需在客户端事件循环中运行)"""
+        payload: Dict[str, Any] = {"model": model, "messages": messages, **kwargs}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        estimated = estimate_tokens(messages, max_tokens)
+
+        attempt = 0
+        while True:
+            wait = self.rate_limiter.reserve(estimated)
+            if wait:
+                with span("llm_rate_limit", model):
+                    await asyncio.sleep(wait)
+            try:
+                async with self._semaphore:
+                    with span("llm_request", model) as state:
+                        response = await self._http.post("/chat/completions", json=payload)
+                        state["error"] = response.status_code >= 400
+            except httpx.HTTPError as exc:
+                self.rate_limiter.settle(estimated, 0)
+                if attempt >= self.max_retries:
+                    raise LLMServiceError(f"LLM调用失败: {exc}") from exc
+                error, retry_after = str(exc) or exc.__class__.__name__, None
+            else:
+                if response.status_code < 400:
+                    data = response.json()
+                    usage = data.get("usage") or {}
+                    if usage.get("total_tokens"):
+                        self.rate_limiter.settle(estimated, usage["total_tokens"])
+                    return data["choices"][0]["message"]["content"] or ""
+                self.rate_limiter.settle(estimated, 0)
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in _RETRY_STATUS or attempt >= self.max_retries:
+                    raise LLMServiceError(f"LLM调用失败: {error}")
+                retry_after = _parse_retry_after(response.headers.get("retry-after"))
+
+            attempt += 1
+            RETRIES.inc(stage="llm")
+            delay = retry_after if retry_after is not None else self.retry_base_delay * (2 ** (attempt - 1))
+            delay *= random.uniform(0.8, 1.2)
+            logger.bind(model=model, attempt=attempt, delay=round(delay, 2)).warning("LLM请求失败,准备重试: {}", error)
+            await asyncio.sleep(delay)
+
+    def close(self) -> None:
+        """关闭连接池并停止事件循环"""
+        if not self._loop.is_running():
+            return
+        try:
+            self.submit(self._http.aclose()).result(timeout=5)
+        except Exception as exc:
+            logger.warning("关闭LLM连接池失败: {}", exc)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return min(_MAX_RETRY_AFTER, max(0.0, float(value))) if value else None
+    except ValueError:
+        return None
+
+
+class PooledLLM(CachedLLM):
+    """经由共享异步客户端发送请求的LLM(接口与AiTravelPlannerLLM一致,并提供ainvoke)"""
+
+    def __init__(self, client: AsyncLLMClient, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+
+    def _complete(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        return self.client.complete_sync(**self._request_args(messages, kwargs))
+
+    async def _acomplete(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        return await self.client.acomplete(**self._request_args(messages, kwargs))
+
+    def _request_args(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **kwargs,
+            "model": self.model,
+            "messages": messages,
+            "temperature": kwargs.get("temperature", self.temperature),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+        }
+
+
+# 全局LLM实例(按模型)与共享客户端
+_llm_instances: Dict[str, PooledLLM] = {}
+_llm_client: Optional[AsyncLLMClient] = None
+_llm_lock = threading.Lock()
+
+
+def get_llm_client() -> AsyncLLMClient:
+    """
+    获取共享的异步LLM客户端(单例模式)
+
     Returns:
-        AiTravelPlannerLLM实例
+        AsyncLLMClient实例
+    """
+    global _llm_client
+
+    if _llm_client is None:
+        with _llm_lock:
+            if _llm_client is None:
+                settings = get_settings()
+                # 复用SDK的凭据解析逻辑(LLM_*或各厂商的环境变量)
+                credentials = AiTravelPlannerLLM()
+                _llm_client = AsyncLLMClient(
+                    base_url=credentials.base_url,
+                    api_key=credentials.api_key,
+                    timeout=credentials.timeout,
+                    rate_limiter=RateLimiter(settings.llm_requests_per_minute, settings.llm_tokens_per_minute),
+                    max_concurrency=settings.llm_max_concurrency,
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive=settings.llm_max_keepalive,
+                    max_retries=settings.llm_max_retries,
+                    retry_base_delay=settings.llm_retry_base_delay,
+                )
+                logger.bind(
+                    base_url=credentials.base_url,
+                    requests_per_minute=settings.llm_requests_per_minute,
+                    tokens_per_minute=settings.llm_tokens_per_minute,
+                    max_concurrency=settings.llm_max_concurrency,
+                ).info("LLM客户端初始化成功")
+
+    return _llm_client
+
+
+def get_llm(model: Optional[str] = None) -> PooledLLM:
     """
-    global _llm_instance
-    
-    if _llm_instance is None:
+    获取LLM实例(单例模式,每个模型一个实例,共享同一个客户端)
+
+    Args:
+        model: 模型名称,为空时使用默认模型(LLM_MODEL_ID)
+
+    Returns:
+        PooledLLM实例
+    """
+    key = model or ""
+    llm = _llm_instances.get(key)
+
+    if llm is None:
         settings = get_settings()
-        
+
         # AiTravelPlannerLLM会自动从环境变量读取配置
         # 包括OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL等
-        _llm_instance = AiTravelPlannerLLM()
-        
-        print(f"✅ LLM服务初始化成功")
-        print(f"   提供商: {_llm_instance.provider}")
-        print(f"   模型: {_llm_instance.model}")
-    
-    return _llm_instance
+        llm = PooledLLM(get_llm_client(), model=model or None, temperature=settings.llm_temperature)
+        llm = _llm_instances.setdefault(key, llm)
+
+        logger.bind(
+            provider=llm.provider,
+            model=llm.model,
+            completion_cache=settings.llm_cache_enabled,
+        ).info("LLM服务初始化成功")
+
+    return llm
+
+
+def get_llm_for(role: str) -> PooledLLM:
+    """
+    按调用方获取LLM(attraction/weather/hotel/planner/voice),未单独配置模型时使用默认模型
+
+    Returns:
+        PooledLLM实例
+    """
+    return get_llm(getattr(get_settings(), f"llm_model_{role}", "") or None)
 
 
 def reset_llm():
     """重置LLM实例(用于测试或重新配置)"""
-    global _llm_instance
-    _llm_instance = None
+    _llm_instances.clear()
+
 
+def shutdown_llm_client() -> None:
+    """关闭共享LLM客户端(应用退出时调用)"""
+    global _llm_client
+    with _llm_lock:
+        if _llm_client is not None:
+            _llm_client.close()
+            _llm_client = None
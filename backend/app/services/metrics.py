@@ -0,0 +1,289 @@
+"""分阶段耗时埋点与Prometheus指标
+
+- span(): 记录阶段耗时直方图、错误计数与并发中的调用数
+- request_id: 由HTTP中间件写入contextvar,所有阶段与日志共享同一请求ID
+- render_metrics(): 输出Prometheus文本格式,供 /metrics 抓取
+
+多worker部署时每个进程各自暴露指标,由Prometheus按实例聚合。
+"""
+
+from __future__ import annotations
+
+import abc
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 当前请求ID,跨越async/线程池边界时需配合bind_context传递
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+# 当前请求内各阶段耗时(秒),供日志汇总
+stage_timings_var: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "stage_timings", default=None
+)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    """指标基类: 子类实现samples()输出各标签组合的样本行"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Prometheus文本格式的样本行(不含HELP/TYPE)"""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值; 也可绑定回调在抓取时取值"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各桶计数..., 总数, 总和]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += 1
+            state[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines: List[str] = []
+        for key, state in items:
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "aitp_stage_duration_seconds", "Latency of instrumented stages", ("stage", "target")
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "aitp_stage_errors_total", "Failed calls per instrumented stage", ("stage", "target")
+)
+STAGE_INFLIGHT = REGISTRY.gauge(
+    "aitp_stage_inflight", "Calls currently running per stage", ("stage",)
+)
+RETRIES = REGISTRY.counter("aitp_retries_total", "Retry attempts", ("stage",))
+CACHE_REQUESTS = REGISTRY.counter(
+    "aitp_cache_requests_total", "Cache lookups by result (hit/miss/error)", ("cache", "result")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "aitp_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+HTTP_INFLIGHT = REGISTRY.gauge("aitp_http_inflight_requests", "HTTP requests in flight")
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def get_request_id() -> str:
+    return request_id_var.get()
+
+
+@contextmanager
+def span(stage: str, target: str = "") -> Iterator[Dict[str, object]]:
+    """
+    记录一个阶段的耗时
+
+    Args:
+        stage: 阶段名,如"agent"、"mcp_call"、"planner_attempt"
+        target: 细分对象,如Agent名称或工具名(需为有限取值)
+
+    Yields:
+        可写入"error"标记的状态字典(适用于以返回值表示失败的调用)
+    """
+    state: Dict[str, object] = {"error": False}
+    STAGE_INFLIGHT.inc(stage=stage)
+    started = time.perf_counter()
+    try:
+        yield state
+    except BaseException:
+        state["error"] = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_INFLIGHT.dec(stage=stage)
+        STAGE_LATENCY.observe(elapsed, stage=stage, target=target)
+        if state["error"]:
+            STAGE_ERRORS.inc(stage=stage, target=target)
+        timings = stage_timings_var.get()
+        if timings is not None:
+            name = f"{stage}:{target}" if target else stage
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def record_cache(cache: str, result: str) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+
+
+def bind_context(func: Callable, *args, **kwargs) -> Callable[[], object]:
+    """把当前contextvars(请求ID等)绑定到函数上,供run_in_executor在线程中执行"""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, func, *args, **kwargs)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
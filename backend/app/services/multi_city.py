@@ -0,0 +1,95 @@
+"""多城市行程: 天数分配、拆分为单城市请求、拼接为一个计划(纯本地计算)"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List
+
+from ..models.schemas import Budget, DayPlan, Meal, MultiCityTripRequest, TripPlan, TripRequest
+from .plan_edit import recompute_budget
+
+_DATE_FORMAT = "%Y-%m-%d"
+
+
+def split_days(request: MultiCityTripRequest) -> List[int]:
+    """
+    为每个城市分配游玩天数; 相邻城市之间各留一天城际交通日
+
+    Raises:
+        ValueError: 天数不足或city_days与总天数不一致
+    """
+    transfers = len(request.cities) - 1
+    available = request.travel_days - transfers
+    if request.city_days is not None:
+        if len(request.city_days) != len(request.cities):
+            raise ValueError("city_days的长度必须与cities一致")
+        if sum(request.city_days) != available:
+            raise ValueError(f"各城市天数之和应为{available}天(总天数{request.travel_days}减去{transfers}个城际交通日)")
+        return list(request.city_days)
+    if available < len(request.cities):
+        raise ValueError(f"{request.travel_days}天不足以游览{len(request.cities)}个城市(每个城市至少1天,另需{transfers}个城际交通日)")
+    base, extra = divmod(available, len(request.cities))
+    return [base + (1 if index < extra else 0) for index in range(len(request.cities))]
+
+
+def build_city_requests(request: MultiCityTripRequest, city_days: List[int]) -> List[TripRequest]:
+    """按分配的天数拆分为单城市请求(日期依次衔接,中间跳过城际交通日)"""
+    current = datetime.strptime(request.start_date, _DATE_FORMAT)
+    requests = []
+    for city, days in zip(request.cities, city_days):
+        end = current + timedelta(days=days - 1)
+        requests.append(TripRequest(
+            city=city,
+            start_date=current.strftime(_DATE_FORMAT),
+            end_date=end.strftime(_DATE_FORMAT),
+            travel_days=days,
+            transportation=request.transportation,
+            accommodation=request.accommodation,
+            preferences=request.preferences,
+            free_text_input=request.free_text_input,
+        ))
+        current = end + timedelta(days=2)
+    return requests
+
+
+def _transfer_day(request: MultiCityTripRequest, origin: TripPlan, destination: TripPlan) -> DayPlan:
+    date = datetime.strptime(origin.end_date, _DATE_FORMAT) + timedelta(days=1)
+    return DayPlan(
+        date=date.strftime(_DATE_FORMAT),
+        day_index=0,
+        description=f"城际交通日: {origin.city} → {destination.city},乘坐{request.inter_city_transportation}前往下一站,抵达后入住休整",
+        transportation=request.inter_city_transportation,
+        accommodation=request.accommodation,
+        # 当晚入住下一站第一天的酒店
+        hotel=destination.days[0].hotel if destination.days else None,
+        attractions=[],
+        meals=[
+            Meal(type="breakfast", name=f"{origin.city}早餐", description="出发前在酒店或附近用餐"),
+            Meal(type="dinner", name=f"{destination.city}晚餐", description="抵达后品尝当地特色"),
+        ],
+    )
+
+
+def stitch_plans(request: MultiCityTripRequest, plans: List[TripPlan]) -> TripPlan:
+    """把各城市的计划按顺序拼接,插入城际交通日并重排day_index、合并天气、预算与降级标记"""
+    days: List[DayPlan] = []
+    for index, plan in enumerate(plans):
+        if index > 0:
+            days.append(_transfer_day(request, plans[index - 1], plan))
+        days.extend(plan.days)
+    days = [day.model_copy(update={"day_index": index}) for index, day in enumerate(days)]
+
+    transportation = sum(plan.budget.total_transportation for plan in plans if plan.budget)
+    suggestions = "\n".join(f"【{plan.city}】{plan.overall_suggestions}" for plan in plans if plan.overall_suggestions)
+    return TripPlan(
+        city=" → ".join(plan.city for plan in plans),
+        start_date=plans[0].start_date,
+        end_date=days[-1].date,
+        days=days,
+        weather_info=[weather for plan in plans for weather in plan.weather_info],
+        overall_suggestions=f"多城市行程: 城市之间安排了{len(plans) - 1}个城际交通日,建议提前购买{request.inter_city_transportation}票。\n{suggestions}",
+        budget=recompute_budget(days, Budget(total_transportation=transportation)),
+        # 任一城市为降级结果时整个计划标记为降级
+        degraded=any(plan.degraded for plan in plans),
+        degraded_reason="; ".join(f"【{plan.city}】{plan.degraded_reason}" for plan in plans if plan.degraded) or None,
+    )
@@ -0,0 +1,62 @@
+"""行程增量编辑的本地计算: 日期平移、天气对齐、预算重算(不调用LLM或外部服务)"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ..models.schemas import Budget, DayPlan, TripPlan, WeatherInfo
+
+_DATE_FORMAT = "%Y-%m-%d"
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.strptime(value, _DATE_FORMAT)
+
+
+def shift_plan_dates(plan: TripPlan, new_start_date: str) -> TripPlan:
+    """把整个行程平移到新的开始日期,每天的安排保持不变"""
+    delta = _parse_date(new_start_date) - _parse_date(plan.start_date)
+    days = [
+        day.model_copy(update={"date": (_parse_date(day.date) + delta).strftime(_DATE_FORMAT)})
+        for day in plan.days
+    ]
+    end_date = (_parse_date(plan.end_date) + delta).strftime(_DATE_FORMAT)
+    return plan.model_copy(update={"start_date": new_start_date, "end_date": end_date, "days": days})
+
+
+def align_weather(days: List[DayPlan], known: List[WeatherInfo]) -> List[WeatherInfo]:
+    """按行程日期挑选已有的天气数据;没有数据的日期不返回(避免展示错位的天气)"""
+    by_date: Dict[str, WeatherInfo] = {item.date: item for item in known}
+    return [by_date[day.date] for day in days if day.date in by_date]
+
+
+def recompute_budget(days: List[DayPlan], previous: Optional[Budget] = None) -> Budget:
+    """
+    按每日安排重算预算
+
+    门票、餐饮、酒店按每日安排直接求和; 交通费无法从计划中推算,沿用原预算。
+    """
+    total_attractions = sum(attraction.ticket_price or 0 for day in days for attraction in day.attractions)
+    total_meals = sum(meal.estimated_cost or 0 for day in days for meal in day.meals)
+    total_hotels = sum(day.hotel.estimated_cost or 0 for day in days if day.hotel)
+    total_transportation = previous.total_transportation if previous else 0
+    return Budget(
+        total_attractions=total_attractions,
+        total_hotels=total_hotels,
+        total_meals=total_meals,
+        total_transportation=total_transportation,
+        total=total_attractions + total_hotels + total_meals + total_transportation,
+    )
+
+
+def finalize_edit(plan: TripPlan, days: List[DayPlan], weather_source: Optional[List[WeatherInfo]] = None) -> TripPlan:
+    """替换每日安排后重算日期范围、天气与预算"""
+    days = sorted(days, key=lambda day: day.day_index)
+    return plan.model_copy(update={
+        "days": days,
+        "start_date": days[0].date if days else plan.start_date,
+        "end_date": days[-1].date if days else plan.end_date,
+        "weather_info": align_weather(days, weather_source if weather_source is not None else plan.weather_info),
+        "budget": recompute_budget(days, plan.budget),
+    })
@@ -0,0 +1,160 @@
+"""行程计划存储
+
+生成的计划写入本机SQLite(WAL),正文为zlib压缩的JSON,按城市和开始日期建索引。
+计划ID由内容哈希得到: 相同计划(如命中规划缓存)只存一份,重复保存是幂等的。
+刷新页面、分享链接和再次查看都直接读取存储,不会重新调用LLM。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional
+
+from ..config import get_settings
+from ..logging_config import logger
+from ..models.schemas import PlanSummary, TripPlan
+
+_COMPRESS_LEVEL = 6
+
+
+class PlanStore:
+    """
+    基于SQLite的行程计划存储(线程安全,多进程可共享同一文件)
+
+    Args:
+        path: 数据库文件路径
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            " id TEXT PRIMARY KEY,"
+            " city TEXT NOT NULL,"
+            " start_date TEXT NOT NULL,"
+            " end_date TEXT NOT NULL,"
+            " days INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " data BLOB NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_plans_city_date ON plans(city, start_date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_plans_created ON plans(created_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 每个线程一个连接; autocommit模式,WAL允许读写并发
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def plan_id_for(payload: bytes) -> str:
+        return hashlib.sha256(payload).hexdigest()[:20]
+
+    def save(self, plan: TripPlan) -> TripPlan:
+        """保存计划,返回带plan_id的计划"""
+        payload = plan.model_dump_json(exclude={"plan_id"}).encode("utf-8")
+        plan_id = self.plan_id_for(payload)
+        self._connection().execute(
+            "INSERT OR IGNORE INTO plans (id, city, start_date, end_date, days, created_at, size, data)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                plan_id, plan.city, plan.start_date, plan.end_date, len(plan.days),
+                time.time(), len(payload), sqlite3.Binary(zlib.compress(payload, _COMPRESS_LEVEL)),
+            ),
+        )
+        return plan.model_copy(update={"plan_id": plan_id})
+
+    def get(self, plan_id: str) -> Optional[TripPlan]:
+        row = self._connection().execute("SELECT data FROM plans WHERE id = ?", (plan_id,)).fetchone()
+        if row is None:
+            return None
+        plan = TripPlan.model_validate_json(zlib.decompress(row[0]))
+        return plan.model_copy(update={"plan_id": plan_id})
+
+    def list(
+        self,
+        city: Optional[str] = None,
+        start_date_from: Optional[str] = None,
+        start_date_to: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> List[PlanSummary]:
+        """按城市/开始日期范围列出计划摘要(不读取正文),按开始日期倒序"""
+        clauses, params = [], []
+        if city:
+            clauses.append("city = ?")
+            params.append(city)
+        if start_date_from:
+            clauses.append("start_date >= ?")
+            params.append(start_date_from)
+        if start_date_to:
+            clauses.append("start_date <= ?")
+            params.append(start_date_to)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT id, city, start_date, end_date, days, created_at FROM plans {where}"
+            " ORDER BY start_date DESC, created_at DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        return [
+            PlanSummary(
+                plan_id=row[0], city=row[1], start_date=row[2], end_date=row[3], days=row[4],
+                created_at=time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(row[5])),
+            )
+            for row in rows
+        ]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# 全局计划存储实例
+_plan_store: Optional[PlanStore] = None
+_plan_store_lock = threading.Lock()
+
+
+def get_plan_store() -> Optional[PlanStore]:
+    """获取计划存储实例(单例模式),未启用时返回None"""
+    global _plan_store
+
+    settings = get_settings()
+    if not settings.plan_store_enabled:
+        return None
+    if _plan_store is None:
+        with _plan_store_lock:
+            if _plan_store is None:
+                path = settings.plan_store_path or str(Path(tempfile.gettempdir()) / "aitravelplanner_plans.sqlite3")
+                _plan_store = PlanStore(Path(path))
+                logger.bind(path=path).info("行程计划存储已启用")
+
+    return _plan_store
+
+
+def save_plan(plan: TripPlan) -> TripPlan:
+    """保存计划并写入plan_id; 存储未启用或写入失败时原样返回(不影响规划结果)"""
+    store = get_plan_store()
+    if store is None:
+        return plan
+    try:
+        return store.save(plan)
+    except Exception as exc:
+        logger.warning("保存行程计划失败: {}", exc)
+        return plan
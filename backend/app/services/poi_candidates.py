@@ -0,0 +1,115 @@
+"""POI候选: 高德搜索结果与离线城市数据包共用的候选景点/酒店表示"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .json_extract import extract_json_object
+
+
+@dataclass(frozen=True)
+class POICandidate:
+    """候选POI"""
+    id: str
+    name: str
+    category: str
+    address: str
+    longitude: float
+    latitude: float
+    rating: float = 0.0  # 0表示未知
+    cost: Optional[float] = None  # 门票/人均价格(元)
+    popularity: float = 0.0  # 在各次搜索结果中的排名得分
+    typecode: str = ""
+    tel: str = ""
+    keywords: Tuple[str, ...] = field(default_factory=tuple)  # 命中该POI的搜索关键词
+
+    def to_prompt_line(self) -> str:
+        """给规划Agent的单行描述(名称/类别/地址/坐标/评分/价格)"""
+        parts = [f"- {self.name}"]
+        if self.category:
+            parts.append(f"[{self.category.split(';')[-1]}]")
+        if self.address:
+            parts.append(self.address)
+        parts.append(f"({self.longitude:.6f},{self.latitude:.6f})")
+        if self.rating:
+            parts.append(f"评分{self.rating:.1f}")
+        if self.cost is not None:
+            parts.append(f"{self.cost:.0f}元")
+        return " ".join(parts)
+
+
+def _text(value: Any) -> str:
+    # 高德对空字段返回[]而不是""
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def parse_location(value: Any) -> Optional[Tuple[float, float]]:
+    """解析高德"lng,lat"格式的坐标"""
+    parts = _text(value).split(",")
+    if len(parts) != 2:
+        return None
+    longitude, latitude = _number(parts[0]), _number(parts[1])
+    if longitude is None or latitude is None:
+        return None
+    return longitude, latitude
+
+
+def candidate_from_amap(poi: Dict[str, Any], keyword: str = "", rank: int = 0, total: int = 1) -> Optional[POICandidate]:
+    """
+    高德POI字典转换为候选; 缺少ID/名称/坐标时返回None
+
+    Args:
+        poi: 高德返回的单个POI
+        keyword: 搜索关键词
+        rank: 在该次搜索结果中的名次(从0开始)
+        total: 该次搜索的结果数
+    """
+    poi_id, name = _text(poi.get("id")), _text(poi.get("name"))
+    location = parse_location(poi.get("location"))
+    if not poi_id or not name or location is None:
+        return None
+    biz_ext = poi.get("biz_ext") if isinstance(poi.get("biz_ext"), dict) else {}
+    return POICandidate(
+        id=poi_id,
+        name=name,
+        category=_text(poi.get("type")),
+        address=_text(poi.get("address")),
+        longitude=location[0],
+        latitude=location[1],
+        rating=_number(biz_ext.get("rating")) or 0.0,
+        cost=_number(biz_ext.get("cost")),
+        popularity=(total - rank) / total if total else 0.0,
+        typecode=_text(poi.get("typecode")),
+        tel=_text(poi.get("tel")),
+        keywords=(keyword,) if keyword else (),
+    )
+
+
+def parse_poi_search(result: str, keyword: str = "") -> List[POICandidate]:
+    """解析maps_text_search/maps_around_search的工具输出(错误文本或无法解析时返回空列表)"""
+    data = extract_json_object(result)
+    pois = data.get("pois") if isinstance(data, dict) else None
+    if not isinstance(pois, list):
+        return []
+    candidates = []
+    for rank, poi in enumerate(pois):
+        candidate = candidate_from_amap(poi, keyword, rank, len(pois)) if isinstance(poi, dict) else None
+        if candidate is not None:
+            candidates.append(candidate)
+    return candidates
+
+
+def format_candidates(candidates: Iterable[POICandidate]) -> str:
+    """候选列表转换为规划提示词中的文本段"""
+    return "\n".join(candidate.to_prompt_line() for candidate in candidates)
+
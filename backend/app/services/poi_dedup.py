@@ -0,0 +1,167 @@
+"""POI去重: 按POI ID、规范化名称与geohash邻近网格合并同一地点
+
+景点/酒店/多个关键词的搜索结果经常重复,同一地点还会以子入口或不同写法出现
+(如"故宫博物院"与"故宫-午门")。判重规则:
+- ID相同
+- 或规范化名称的主体相同,且两者距离不超过radius_m
+名称主体: NFKC + 小写,去掉表示入口的括号内容、分隔符("-"/"·"等)之后的子地点、方位门/入口等后缀,
+再去掉"博物院/景区"等通用后缀; 连锁分店(括号或分隔符后以"店"结尾)保留分店名,不会被合并。
+候选按(名称主体, geohash网格)分桶,每个候选只与所在网格及8个相邻网格中同名称主体的簇比较,总体近似线性。
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from dataclasses import replace
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, Iterable, List, Tuple
+
+from .poi_candidates import POICandidate
+
+_BRACKETS = re.compile(r"[(\[【]([^)\]】]*)[)\]】]")
+_SEPARATORS = re.compile(r"[-—–·•|/]")
+_SPACES = re.compile(r"\s+")
+# 子入口/附属设施后缀(只在剩余部分不少于2个字时去掉)
+_ENTRANCE_SUFFIX = re.compile(
+    r"(?:[东西南北正主侧]\d*[号]?门|\d+号门|[东西南北主]?(?:入口|出口)|售票处|检票口|停车场|游客(?:服务)?中心)$"
+)
+# 括号/分隔符后的部分以这些结尾时表示入口(如"故宫(东华门)"),以"店"结尾表示连锁分店,不能合并
+_ENTRANCE_PART = re.compile(r"(?:门|口|售票处|检票口|停车场|游客(?:服务)?中心)$")
+# 通用后缀: "故宫博物院"与"故宫"视为同一名称主体
+_GENERIC_SUFFIXES = ("风景名胜区", "旅游景区", "风景区", "旅游区", "景区", "博物院", "景点")
+_MIN_CORE_LENGTH = 2
+
+# 默认网格精度与合并半径: geohash 5位的网格约4.9km×4.9km,相邻网格足以覆盖半径
+DEFAULT_PRECISION = 5
+DEFAULT_RADIUS_M = 1500.0
+_EARTH_RADIUS_M = 6_371_000.0
+
+
+@lru_cache(maxsize=8192)
+def name_core(name: str) -> Tuple[str, bool]:
+    """
+    规范化名称主体
+
+    Returns:
+        (名称主体, 是否为子入口/子地点)
+    """
+    text = _SPACES.sub("", unicodedata.normalize("NFKC", name).lower())
+    is_sub = False
+    # 括号: 入口说明去掉,其它内容(如分店名)保留为名称的一部分
+    parts = _BRACKETS.findall(text)
+    base = _BRACKETS.sub("", text)
+    if parts and all(_ENTRANCE_PART.search(part) for part in parts):
+        is_sub = True
+    else:
+        base += "".join(parts)
+    head, *rest = _SEPARATORS.split(base, maxsplit=1)
+    if rest and len(head) >= _MIN_CORE_LENGTH and not rest[0].endswith("店"):
+        base, is_sub = head, True
+    stripped = _ENTRANCE_SUFFIX.sub("", base)
+    if stripped != base and len(stripped) >= _MIN_CORE_LENGTH:
+        base, is_sub = stripped, True
+    for suffix in _GENERIC_SUFFIXES:
+        if base.endswith(suffix) and len(base) - len(suffix) >= _MIN_CORE_LENGTH:
+            base = base[: -len(suffix)]
+            break
+    return base, is_sub
+
+
+def geohash_cell(latitude: float, longitude: float, precision: int = DEFAULT_PRECISION) -> Tuple[int, int]:
+    """
+    geohash网格的(经度序号, 纬度序号)
+
+    geohash把经度/纬度各自二分后交错编码,precision位字符对应的网格就是这两个序号;
+    直接使用序号对,相邻网格只需加减1,不必再编码/解码字符串。
+    """
+    bits = precision * 5
+    lng_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lng_index = int((longitude + 180.0) / 360.0 * (1 << lng_bits))
+    lat_index = int((latitude + 90.0) / 180.0 * (1 << lat_bits))
+    return min(lng_index, (1 << lng_bits) - 1), min(lat_index, (1 << lat_bits) - 1)
+
+
+def distance_m(a: POICandidate, b: POICandidate) -> float:
+    """两点间距离(等距圆柱近似,城市尺度内误差可忽略)"""
+    mean_lat = math.radians((a.latitude + b.latitude) / 2)
+    dx = math.radians(b.longitude - a.longitude) * math.cos(mean_lat)
+    dy = math.radians(b.latitude - a.latitude)
+    return _EARTH_RADIUS_M * math.hypot(dx, dy)
+
+
+def _merge(primary: POICandidate, other: POICandidate) -> POICandidate:
+    """合并两个重复候选: 热度累加、关键词合并、评分/价格互相补全"""
+    return replace(
+        primary,
+        popularity=primary.popularity + other.popularity,
+        keywords=primary.keywords + tuple(k for k in other.keywords if k not in primary.keywords),
+        rating=max(primary.rating, other.rating),
+        cost=primary.cost if primary.cost is not None else other.cost,
+    )
+
+
+def dedupe_candidates(
+    candidates: Iterable[POICandidate],
+    radius_m: float = DEFAULT_RADIUS_M,
+    precision: int = DEFAULT_PRECISION,
+) -> List[POICandidate]:
+    """
+    合并重复的候选,保持各簇首次出现的顺序
+
+    每个簇以主地点(非子入口)作为代表,子入口的热度与关键词并入代表。
+
+    Args:
+        candidates: 可能重复的候选(可来自多次搜索)
+        radius_m: 名称主体相同时视为同一地点的最大距离
+        precision: geohash网格精度,网格边长应不小于radius_m
+
+    Returns:
+        去重后的候选
+    """
+    clusters: List[POICandidate] = []
+    is_sub: List[bool] = []
+    by_id: Dict[str, int] = {}
+    buckets: Dict[Tuple[str, int, int], List[int]] = {}
+
+    for candidate in candidates:
+        index = by_id.get(candidate.id)
+        if index is None:
+            core, sub = name_core(candidate.name)
+            lng_index, lat_index = geohash_cell(candidate.latitude, candidate.longitude, precision)
+            index = next(
+                (
+                    other
+                    for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                    for other in buckets.get((core, lng_index + dx, lat_index + dy), ())
+                    if distance_m(clusters[other], candidate) <= radius_m
+                ),
+                None,
+            )
+            if index is None:
+                index = len(clusters)
+                clusters.append(candidate)
+                is_sub.append(sub)
+                buckets.setdefault((core, lng_index, lat_index), []).append(index)
+                by_id[candidate.id] = index
+                continue
+            by_id[candidate.id] = index
+            if is_sub[index] and not sub:
+                # 主地点出现后替换子入口作为代表(保持簇的位置与分桶不变)
+                clusters[index], is_sub[index] = _merge(candidate, clusters[index]), False
+                continue
+        clusters[index] = _merge(clusters[index], candidate)
+    return clusters
+
+
+def merge_candidates(results: Iterable[Iterable[POICandidate]]) -> List[POICandidate]:
+    """
+    合并多次搜索的结果(去重后热度累加、关键词合并)
+
+    Returns:
+        合并后的候选,按(热度, 评分)降序
+    """
+    merged = dedupe_candidates(chain.from_iterable(results))
+    return sorted(merged, key=lambda candidate: (-candidate.popularity, -candidate.rating))
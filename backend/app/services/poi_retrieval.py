@@ -0,0 +1,188 @@
+"""景点候选检索与排序
+
+每个偏好关键词各取一组候选(离线数据包优先,未覆盖的关键词并发实时搜索),去重合并后
+用向量化的打分器排序,只把前K个候选交给规划Agent:
+    score = w_pref·偏好匹配率 + w_rating·评分/5 + w_pop·热度/最大热度 + w_dist·exp(-距市中心km/尺度)
+安装numpy时打分与排序在数组上一次完成,否则退回等价的纯Python实现(结果一致)。
+"""
+
+from __future__ import annotations
+
+import math
+from concurrent.futures import Executor, wait
+from dataclasses import dataclass
+from itertools import chain
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .city_pack import CityPack
+from .gazetteer import get_gazetteer
+from .metrics import bind_context
+from .poi_candidates import POICandidate
+from .poi_dedup import dedupe_candidates
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+@dataclass(frozen=True)
+class RankWeights:
+    """各项得分的权重"""
+    preference: float = 0.4
+    rating: float = 0.25
+    popularity: float = 0.2
+    distance: float = 0.15
+
+
+DEFAULT_WEIGHTS = RankWeights()
+
+# 没有评分的POI按该评分计算,避免被有评分的普通POI一律压过
+_UNKNOWN_RATING = 3.5
+# 距市中心该距离(km)时距离得分降为1/e
+_DISTANCE_SCALE_KM = 8.0
+_KM_PER_DEGREE = 111.32
+
+SearchFunc = Callable[[str, str], List[POICandidate]]
+
+
+def _preference_hits(candidate: POICandidate, preferences: Sequence[str]) -> int:
+    """命中的偏好数: 由该偏好搜索到,或名称/类别中包含偏好词"""
+    # 候选数可达数千,这里是打分的主要Python开销,保持为最简单的循环
+    keywords, text = candidate.keywords, candidate.name + "|" + candidate.category
+    hits = 0
+    for preference in preferences:
+        if preference in keywords or preference in text:
+            hits += 1
+    return hits
+
+
+def city_center(city: str) -> Optional[Tuple[float, float]]:
+    """城市中心坐标(经度, 纬度),来自城市索引"""
+    entry = get_gazetteer().lookup(city)
+    return (entry.longitude, entry.latitude) if entry else None
+
+
+def _score_numpy(
+    candidates: Sequence[POICandidate], preferences: Sequence[str], center: Tuple[float, float], weights: RankWeights
+):
+    n = len(candidates)
+    hits = np.fromiter((_preference_hits(c, preferences) for c in candidates), dtype=np.float64, count=n)
+    rating = np.fromiter((c.rating for c in candidates), dtype=np.float64, count=n)
+    popularity = np.fromiter((c.popularity for c in candidates), dtype=np.float64, count=n)
+    longitude = np.fromiter((c.longitude for c in candidates), dtype=np.float64, count=n)
+    latitude = np.fromiter((c.latitude for c in candidates), dtype=np.float64, count=n)
+
+    max_popularity = popularity.max()
+    dx = (longitude - center[0]) * math.cos(math.radians(center[1])) * _KM_PER_DEGREE
+    dy = (latitude - center[1]) * _KM_PER_DEGREE
+    return (
+        weights.preference * hits / max(1, len(preferences))
+        + weights.rating * np.where(rating > 0, rating, _UNKNOWN_RATING) / 5.0
+        + weights.popularity * (popularity / max_popularity if max_popularity > 0 else popularity)
+        + weights.distance * np.exp(-np.hypot(dx, dy) / _DISTANCE_SCALE_KM)
+    )
+
+
+def _score_python(
+    candidates: Sequence[POICandidate], preferences: Sequence[str], center: Tuple[float, float], weights: RankWeights
+) -> List[float]:
+    max_popularity = max(c.popularity for c in candidates)
+    cos_lat = math.cos(math.radians(center[1]))
+    scores = []
+    for c in candidates:
+        dx = (c.longitude - center[0]) * cos_lat * _KM_PER_DEGREE
+        dy = (c.latitude - center[1]) * _KM_PER_DEGREE
+        scores.append(
+            weights.preference * _preference_hits(c, preferences) / max(1, len(preferences))
+            + weights.rating * (c.rating if c.rating > 0 else _UNKNOWN_RATING) / 5.0
+            + weights.popularity * (c.popularity / max_popularity if max_popularity > 0 else c.popularity)
+            + weights.distance * math.exp(-math.hypot(dx, dy) / _DISTANCE_SCALE_KM)
+        )
+    return scores
+
+
+def rank_candidates(
+    candidates: Sequence[POICandidate],
+    preferences: Sequence[str],
+    center: Optional[Tuple[float, float]] = None,
+    top_k: int = 20,
+    weights: RankWeights = DEFAULT_WEIGHTS,
+    use_numpy: Optional[bool] = None,
+) -> List[POICandidate]:
+    """
+    打分并返回得分最高的top_k个候选(同分时保持输入顺序)
+
+    Args:
+        candidates: 合并后的候选
+        preferences: 用户偏好
+        center: 市中心(经度, 纬度),未知时取候选的平均位置
+        top_k: 返回的候选数
+        weights: 各项权重
+        use_numpy: 是否使用numpy,默认已安装时使用
+    """
+    if not candidates or top_k <= 0:
+        return []
+    if center is None:
+        center = (
+            sum(c.longitude for c in candidates) / len(candidates),
+            sum(c.latitude for c in candidates) / len(candidates),
+        )
+    if use_numpy is None:
+        use_numpy = np is not None
+
+    if use_numpy:
+        scores = _score_numpy(candidates, preferences, center, weights)
+        order = np.argsort(-scores, kind="stable")[:top_k].tolist()
+    else:
+        scores = _score_python(candidates, preferences, center, weights)
+        order = sorted(range(len(candidates)), key=lambda i: -scores[i])[:top_k]
+    return [candidates[i] for i in order]
+
+
+def retrieve_candidates(
+    city: str,
+    preferences: Sequence[str],
+    pack: Optional[CityPack] = None,
+    search: Optional[SearchFunc] = None,
+    executor: Optional[Executor] = None,
+    pack_limit: int = 100,
+    top_k: int = 20,
+    timeout: Optional[float] = None,
+) -> List[POICandidate]:
+    """
+    检索并排序景点候选
+
+    Args:
+        city: 规范城市名
+        preferences: 用户偏好,为空时使用"景点"
+        pack: 离线城市数据包
+        search: 实时搜索函数(关键词, 城市) -> 候选,用于数据包未覆盖的关键词
+        executor: 并发执行实时搜索的线程池,为空时依次搜索
+        pack_limit: 从数据包最多取的候选数
+        top_k: 返回的候选数
+        timeout: 等待实时搜索的最长时间(秒),到时只使用已返回的结果(需要executor)
+
+    Returns:
+        排序后的前top_k个候选; 所有来源都没有结果时为空列表
+    """
+    keywords = list(dict.fromkeys(preferences)) or ["景点"]
+    pools: List[List[POICandidate]] = []
+    missing = keywords
+    if pack is not None:
+        from_pack, missing = pack.attractions(city, keywords, limit=pack_limit)
+        pools.append(from_pack)
+
+    if missing and search is not None:
+        if executor is not None and (len(missing) > 1 or timeout is not None):
+            futures = [executor.submit(bind_context(search, keyword, city)) for keyword in missing]
+            done, not_done = wait(futures, timeout=timeout)
+            for future in not_done:
+                # 尚未开始的搜索不再执行; 已在进行的搜索完成后仍会写入工具缓存
+                future.cancel()
+            pools.extend(future.result() for future in futures if future in done)
+        else:
+            pools.extend(search(keyword, city) for keyword in missing)
+
+    # 多个关键词/来源的结果中同一地点(含子入口、不同写法)只保留一个,再交给打分器
+    return rank_candidates(dedupe_candidates(chain.from_iterable(pools)), keywords, city_center(city), top_k)
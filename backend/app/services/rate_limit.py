@@ -0,0 +1,117 @@
+"""令牌桶限流与每日预算
+
+采用预约方式: reserve()立即扣减令牌(允许透支)并返回调用方需要等待的秒数,
+同步调用方time.sleep、异步调用方asyncio.sleep,两种调用共享同一个桶且按到达顺序排队。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    Args:
+        rate_per_minute: 每分钟补充的令牌数,<=0表示不限制
+        capacity: 桶容量(允许的突发量),默认等于每分钟速率
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = max(0.0, float(rate_per_minute)) / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """预约amount个令牌,返回需要等待的秒数"""
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, delta: float) -> None:
+        """按实际用量修正预约(正数追加扣减,负数退还)"""
+        if self.unlimited or not delta:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+    def available(self) -> float:
+        if self.unlimited:
+            return float("inf")
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class RateLimiter:
+    """请求数与token数两个维度的限流"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def reserve(self, tokens: float) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def settle(self, estimated: float, actual: float) -> None:
+        """请求结束后用实际token数修正预估值"""
+        self.tokens.adjust(actual - estimated)
+
+
+class DailyBudget:
+    """
+    按自然日计数的调用预算(北京时间零点重置,与高德配额周期一致)
+
+    Args:
+        limit: 每日可用次数,<=0表示不限制
+    """
+
+    _TZ = timezone(timedelta(hours=8))
+
+    def __init__(self, limit: int):
+        self.limit = int(limit)
+        self._day = self._today()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _today(cls) -> date:
+        return datetime.now(cls._TZ).date()
+
+    def _roll(self) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day, self._used = today, 0
+
+    def try_consume(self, amount: int = 1) -> bool:
+        """预算充足时扣减并返回True"""
+        with self._lock:
+            self._roll()
+            if self.limit > 0 and self._used + amount > self.limit:
+                return False
+            self._used += amount
+            return True
+
+    @property
+    def used(self) -> int:
+        with self._lock:
+            self._roll()
+            return self._used
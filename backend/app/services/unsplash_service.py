@@ -3,6 +3,9 @@
 import requests
 from typing import List, Optional
 from ..config import get_settings
+from ..services.cache_backend import SharedCache, stable_key
+from ..services.metrics import span
+from ..logging_config import logger
 
 class UnsplashService:
     """Unsplash图片服务类"""
@@ -12,6 +15,8 @@ class UnsplashService:
         settings = get_settings()
         self.access_key = settings.unsplash_access_key
         self.base_url = "https://api.unsplash.com"
+        # 同一关键词的图片结果在各worker间共享,减少API配额消耗
+        self._photo_cache = SharedCache("unsplash_photo", ttl=settings.photo_cache_ttl_seconds)
     
     def search_photos(self, query: str, per_page: int = 5) -> List[dict]:
         """
@@ -24,6 +29,11 @@ class UnsplashService:
         Returns:
             图片列表
         """
+        cache_key = stable_key(query.strip().lower(), per_page)
+        cached = self._photo_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             url = f"{self.base_url}/search/photos"
             params = {
@@ -32,8 +42,9 @@ class UnsplashService:
                 "client_id": self.access_key
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            with span("unsplash", "search_photos"):
+                response = requests.get(url, params=params, timeout=10)
+                response.raise_for_status()
             
             data = response.json()
             results = data.get("results", [])
@@ -49,10 +60,11 @@ class UnsplashService:
                     "photographer": photo.get("user", {}).get("name")
                 })
             
+            self._photo_cache.set(cache_key, photos)
             return photos
             
         except Exception as e:
-            print(f"❌ Unsplash搜索失败: {str(e)}")
+            logger.error("Unsplash搜索失败: {}", e)
             return []
     
     def get_photo_url(self, query: str) -> Optional[str]:
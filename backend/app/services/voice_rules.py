@@ -0,0 +1,369 @@
+"""语音表单规则抽取(LLM前置快速通道)"""
+
+from __future__ import annotations
+
+import re
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from ..models.schemas import VoiceFormSuggestion
+from ..services.gazetteer import get_gazetteer
+
+# ============ 词表 ============
+
+_CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_NUM = r"[0-9]+|[零〇一二两三四五六七八九十]+"
+_WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6, "末": 5}
+_RANGE_MARKERS = ("到", "至", "-", "~", "～")
+_HOLIDAYS = {"元旦": (1, 1), "五一": (5, 1), "劳动节": (5, 1), "国庆": (10, 1), "国庆节": (10, 1)}
+
+PREFERENCE_KEYWORDS = {
+    "历史文化": ("历史", "文化", "古迹", "博物馆", "古镇", "古城", "寺庙", "遗址"),
+    "自然风光": ("自然", "风景", "风光", "爬山", "登山", "湖边", "山水", "看海", "海边"),
+    "美食": ("美食", "小吃", "好吃", "吃吃喝喝", "特色菜", "吃货"),
+    "购物": ("购物", "逛街", "买买买", "商场", "血拼"),
+    "艺术": ("艺术", "美术馆", "展览", "画展", "看展"),
+    "休闲": ("休闲", "放松", "度假", "悠闲", "慢节奏"),
+    "亲子": ("亲子", "带娃", "带孩子", "小朋友", "遛娃", "游乐园"),
+    "户外": ("户外", "徒步", "露营", "骑行", "潜水"),
+    "动漫": ("动漫", "二次元", "漫展", "手办"),
+    "夜生活": ("夜生活", "酒吧", "夜市", "蹦迪", "夜景"),
+}
+
+TRANSPORTATION_KEYWORDS = {
+    "自驾": ("自驾", "开车", "租车", "自己开"),
+    "步行": ("步行", "走路", "暴走"),
+    "公共交通": ("公共交通", "公交", "地铁", "坐车"),
+}
+
+ACCOMMODATION_KEYWORDS = {
+    "民宿": ("民宿", "客栈"),
+    "豪华酒店": ("豪华", "五星", "高档", "奢华"),
+    "舒适型酒店": ("舒适型", "舒适一点", "四星"),
+    "经济型酒店": ("经济型", "快捷酒店", "便宜的酒店", "便宜点的酒店", "青旅", "青年旅舍"),
+}
+
+_EXTRA_PATTERNS = (
+    re.compile(r"预算[^，,。.;；!！?？]*"),
+    re.compile(r"(?:带着?|和|跟)(?:孩子|小孩|老人|父母|爸妈|家人|朋友|女朋友|男朋友|老婆|老公|对象)(?:一起)?"),
+)
+
+# 不计入"未解析内容"的语气词与连接词
+_FILLER_CHARS = set("我们想要打算准备计划去到玩一下的吧呢啊了和跟从在请帮给安排个趟次出发旅游旅行游玩，。,.!！?？;； ")
+
+# 置信度权重: 城市、出发日期、时长(天数或结束日期)
+_FIELD_WEIGHTS = {"city": 0.35, "start_date": 0.3, "duration": 0.25}
+_COVERAGE_WEIGHT = 0.1
+_MAX_UNPARSED_CHARS = 8
+
+_CITY_PATTERN = re.compile(
+    r"(?:去|到|前往|飞往|飞去|回)([一-鿿]{2,4}?)"
+    r"(?=玩|旅游|旅行|游玩|逛|看看|度假|待|住|呆|过|吃|出差|[0-9零一二两三四五六七八九十半]|[，,。.!！?？\s]|$)"
+)
+_CITY_BEFORE_TOUR = re.compile(r"([一-鿿]{2,3})(?:" + _NUM + r")日游")
+_CITY_STOP_CHARS = set("月号周礼拜")
+_CITY_STOP_PREFIXES = ("今天", "明天", "后天", "下", "这", "本", "星期")
+
+
+def cn_to_int(text: str) -> Optional[int]:
+    """将阿拉伯数字或中文数字(最多到九十九)转换为整数"""
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+    if text == "十":
+        return 10
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        tens_value = _CN_DIGITS.get(tens, None) if tens else 1
+        ones_value = _CN_DIGITS.get(ones, None) if ones else 0
+        if tens_value is None or ones_value is None:
+            return None
+        return tens_value * 10 + ones_value
+    if len(text) == 1:
+        return _CN_DIGITS.get(text)
+    # "二〇二五"之类逐位读法
+    digits = [_CN_DIGITS.get(ch) for ch in text]
+    if any(d is None for d in digits):
+        return None
+    return int("".join(str(d) for d in digits))
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _upcoming(today: date, month: int, day: int) -> Optional[date]:
+    """未指明年份时取今天及以后最近的一次"""
+    candidate = _safe_date(today.year, month, day)
+    if candidate and candidate < today:
+        candidate = _safe_date(today.year + 1, month, day)
+    return candidate
+
+
+class _Extractor:
+    """单次抽取的状态: 记录已匹配区间用于计算覆盖率"""
+
+    def __init__(self, text: str, today: date):
+        self.text = text
+        self.today = today
+        self.spans: List[Tuple[int, int]] = []
+
+    def _mark(self, start: int, end: int) -> None:
+        self.spans.append((start, end))
+
+    def _overlaps(self, start: int, end: int) -> bool:
+        return any(s < end and start < e for s, e in self.spans)
+
+    def unparsed_chars(self) -> int:
+        covered = [False] * len(self.text)
+        for start, end in self.spans:
+            for i in range(start, min(end, len(self.text))):
+                covered[i] = True
+        return sum(
+            1 for i, ch in enumerate(self.text)
+            if not covered[i] and ch not in _FILLER_CHARS
+        )
+
+    # ---------- 日期 ----------
+
+    def dates(self) -> List[date]:
+        found: List[Tuple[int, date]] = []
+        today = self.today
+
+        patterns = (
+            (re.compile(r"(\d{4})[-/年](\d{1,2})[-/月](\d{1,2})[日号]?"), "ymd"),
+            (re.compile(r"(下个?月|这个?月|本月)?(" + _NUM + r")月(" + _NUM + r")[日号]"), "md"),
+            (re.compile(r"(下个?月|这个?月|本月)(" + _NUM + r")[日号]"), "rel_month_day"),
+            # 星期要先于"N日"匹配,否则"周六日"中的"六日"会被当成某月6日
+            (re.compile(r"(下下|下|这|本)?(?:个)?(?:周|星期|礼拜)([一二三四五六日天末])(?:(?<=六)([日天]))?"), "weekday"),
+            (re.compile(r"(?<![月\d])(" + _NUM + r")[日号](?!游)"), "day"),
+            (re.compile(r"(大后天|后天|明天|今天)"), "relative"),
+            (re.compile("|".join(sorted(_HOLIDAYS, key=len, reverse=True))), "holiday"),
+        )
+
+        for pattern, kind in patterns:
+            for match in pattern.finditer(self.text):
+                start, end = match.span()
+                if self._overlaps(start, end):
+                    continue
+                value: Optional[date] = None
+                if kind == "ymd":
+                    value = _safe_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+                elif kind == "md":
+                    prefix = match.group(1)
+                    month = cn_to_int(match.group(2))
+                    day = cn_to_int(match.group(3))
+                    if month and day:
+                        if prefix and prefix.startswith("下"):
+                            year = today.year + (1 if today.month == 12 else 0)
+                            value = _safe_date(year, month, day)
+                        else:
+                            value = _upcoming(today, month, day)
+                elif kind == "rel_month_day":
+                    day = cn_to_int(match.group(2))
+                    if day:
+                        if match.group(1).startswith("下"):
+                            year, month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+                        else:
+                            year, month = today.year, today.month
+                        value = _safe_date(year, month, day)
+                elif kind == "day":
+                    day = cn_to_int(match.group(1))
+                    if day and day <= 31:
+                        value = self._resolve_bare_day(day, found, start)
+                elif kind == "relative":
+                    offset = {"今天": 0, "明天": 1, "后天": 2, "大后天": 3}[match.group(1)]
+                    value = today + timedelta(days=offset)
+                elif kind == "weekday":
+                    value = self._resolve_weekday(match.group(1), match.group(2), found, start)
+                    if value and match.group(3):
+                        # "周六日": 周六到周日两天
+                        found.append((start + 1, value + timedelta(days=1)))
+                elif kind == "holiday":
+                    month, day = _HOLIDAYS[match.group(0)]
+                    value = _upcoming(today, month, day)
+                if value:
+                    found.append((start, value))
+                    self._mark(start, end)
+
+        found.sort(key=lambda item: item[0])
+        return [value for _, value in found]
+
+    def _resolve_bare_day(self, day: int, found: List[Tuple[int, date]], position: int) -> Optional[date]:
+        """"3号"这类只有日的写法: 跟随前一个日期的月份,否则取最近的一次"""
+        previous = [value for pos, value in found if pos < position]
+        if previous:
+            anchor = previous[-1]
+            candidate = _safe_date(anchor.year, anchor.month, day)
+            if candidate and candidate < anchor:
+                month = anchor.month % 12 + 1
+                year = anchor.year + (1 if anchor.month == 12 else 0)
+                candidate = _safe_date(year, month, day)
+            return candidate
+        candidate = _safe_date(self.today.year, self.today.month, day)
+        if candidate and candidate < self.today:
+            month = self.today.month % 12 + 1
+            year = self.today.year + (1 if self.today.month == 12 else 0)
+            candidate = _safe_date(year, month, day)
+        return candidate
+
+    def _resolve_weekday(
+        self, prefix: Optional[str], token: str, found: List[Tuple[int, date]], position: int
+    ) -> date:
+        today = self.today
+        weekday = _WEEKDAYS[token]
+        previous = [value for pos, value in found if pos < position]
+        if not prefix and previous and self.text[:position].rstrip().endswith(_RANGE_MARKERS):
+            # "下周一到周三": 区间终点取起点当天或之后最近的该星期几
+            anchor = previous[-1]
+            return anchor + timedelta(days=(weekday - anchor.weekday()) % 7)
+        monday = today - timedelta(days=today.weekday())
+        if prefix == "下下":
+            return monday + timedelta(days=14 + weekday)
+        if prefix == "下":
+            return monday + timedelta(days=7 + weekday)
+        if prefix in ("这", "本"):
+            return monday + timedelta(days=weekday)
+        candidate = monday + timedelta(days=weekday)
+        if candidate < today:
+            candidate += timedelta(days=7)
+        return candidate
+
+    # ---------- 天数 ----------
+
+    def travel_days(self) -> Optional[int]:
+        patterns = (
+            (re.compile(r"(" + _NUM + r")天(?:" + _NUM + r")?[晚夜]?"), 0),
+            (re.compile(r"(" + _NUM + r")日游"), 0),
+            (re.compile(r"(" + _NUM + r")[晚夜](?!上)"), 1),
+        )
+        for pattern, extra in patterns:
+            for match in pattern.finditer(self.text):
+                start, end = match.span()
+                if self._overlaps(start, end):
+                    continue
+                days = cn_to_int(match.group(1))
+                if days:
+                    self._mark(start, end)
+                    return days + extra
+        for phrase, days in (("半个月", 15), ("一个星期", 7), ("一周", 7), ("一个礼拜", 7)):
+            idx = self.text.find(phrase)
+            if idx != -1 and not self._overlaps(idx, idx + len(phrase)):
+                self._mark(idx, idx + len(phrase))
+                return days
+        return None
+
+    # ---------- 城市 ----------
+
+    def city(self) -> Optional[str]:
+        match = get_gazetteer().find_destination(self.text)
+        if match:
+            self._mark(match.start, match.end)
+            return match.entry.name
+        # 地名索引未收录时按句式猜测
+        for pattern in (_CITY_PATTERN, _CITY_BEFORE_TOUR):
+            for match in pattern.finditer(self.text):
+                candidate = match.group(1)
+                if any(ch in _CITY_STOP_CHARS for ch in candidate) or candidate.startswith(_CITY_STOP_PREFIXES):
+                    continue
+                self._mark(*match.span(1))
+                return candidate
+        return None
+
+    # ---------- 关键词类字段 ----------
+
+    def _keyword_hits(self, table: dict) -> List[str]:
+        hits = []
+        for label, keywords in table.items():
+            for keyword in keywords:
+                idx = self.text.find(keyword)
+                if idx != -1:
+                    self._mark(idx, idx + len(keyword))
+                    hits.append(label)
+                    break
+        return hits
+
+    def preferences(self) -> List[str]:
+        return self._keyword_hits(PREFERENCE_KEYWORDS)
+
+    def transportation(self) -> Optional[str]:
+        hits = self._keyword_hits(TRANSPORTATION_KEYWORDS)
+        if not hits:
+            return None
+        return hits[0] if len(hits) == 1 else "混合"
+
+    def accommodation(self) -> Optional[str]:
+        hits = self._keyword_hits(ACCOMMODATION_KEYWORDS)
+        return hits[0] if hits else None
+
+    def extras(self) -> Optional[str]:
+        parts = []
+        for pattern in _EXTRA_PATTERNS:
+            for match in pattern.finditer(self.text):
+                self._mark(*match.span())
+                parts.append(match.group(0))
+        return "；".join(parts) if parts else None
+
+
+def extract_form_by_rules(transcript: str, today: Optional[date] = None) -> VoiceFormSuggestion:
+    """
+    使用确定性规则从语音文本中抽取表单字段
+
+    Args:
+        transcript: 语音识别文本
+        today: 相对日期的参照日,默认当天
+
+    Returns:
+        带confidence的表单建议; confidence越高越无需调用LLM
+    """
+    text = (transcript or "").strip()
+    if not text:
+        return VoiceFormSuggestion(confidence=0.0)
+
+    extractor = _Extractor(text, today or date.today())
+    found_dates = extractor.dates()
+    travel_days = extractor.travel_days()
+
+    start_date: Optional[date] = found_dates[0] if found_dates else None
+    end_date: Optional[date] = None
+    if len(found_dates) >= 2 and found_dates[-1] >= found_dates[0]:
+        end_date = found_dates[-1]
+    if start_date and travel_days is None and "周末" in text:
+        travel_days = 2
+
+    city = extractor.city()
+    preferences = extractor.preferences()
+    transportation = extractor.transportation()
+    accommodation = extractor.accommodation()
+    free_text = extractor.extras()
+
+    if start_date and travel_days and not end_date:
+        end_date = start_date + timedelta(days=travel_days - 1)
+    if start_date and end_date and not travel_days:
+        travel_days = (end_date - start_date).days + 1
+
+    confidence = 0.0
+    if city:
+        confidence += _FIELD_WEIGHTS["city"]
+    if start_date:
+        confidence += _FIELD_WEIGHTS["start_date"]
+    if travel_days or end_date:
+        confidence += _FIELD_WEIGHTS["duration"]
+    if extractor.unparsed_chars() <= _MAX_UNPARSED_CHARS:
+        confidence += _COVERAGE_WEIGHT
+
+    return VoiceFormSuggestion(
+        city=city,
+        start_date=start_date.isoformat() if start_date else None,
+        end_date=end_date.isoformat() if end_date else None,
+        travel_days=travel_days,
+        transportation=transportation,
+        accommodation=accommodation,
+        preferences=preferences,
+        free_text_input=free_text,
+        confidence=round(confidence, 2),
+    )
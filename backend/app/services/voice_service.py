@@ -8,7 +8,8 @@ import io
 import json
 import os
 import wave
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from concurrent.futures import Executor
 from typing import List, Optional, Tuple
 
 from dateutil import parser as date_parser
@@ -23,7 +24,13 @@ except ImportError:  # pragma: no cover
 from ..agents.trip_planner_agent import get_trip_planner_agent
 from ..config import get_settings
 from ..models.schemas import TripPlan, TripRequest, VoiceFormSuggestion
-from ..services.llm_service import get_llm
+from ..services.cache import TTLCache, hash_bytes
+from ..services.cache_backend import SharedCache
+from ..services.gazetteer import canonical_city
+from ..services.llm_service import get_llm_for
+from ..services.metrics import bind_context, span
+from ..services.voice_rules import extract_form_by_rules
+from ..logging_config import logger
 
 
 class VoiceServiceError(Exception):
@@ -119,6 +126,33 @@ def _valid_travel_days(value: Optional[int]) -> bool:
     return isinstance(value, int) and value > 0
 
 
+def _merge_rule_form(form: VoiceFormSuggestion, rule_form: VoiceFormSuggestion, min_confidence: float) -> None:
+    """
+    合并规则抽取结果: 规则置信度足够或LLM未给出日期时,日期以规则为准(LLM不知道当前日期);
+    其余字段只补空缺
+    """
+    rule_dates = bool(rule_form.start_date) and (
+        (rule_form.confidence or 0.0) >= min_confidence or not form.start_date
+    )
+    if rule_dates:
+        form.start_date = rule_form.start_date
+        if rule_form.end_date:
+            form.end_date = rule_form.end_date
+    for field in ("city", "end_date", "travel_days", "transportation", "accommodation", "free_text_input"):
+        if field == "end_date" and not rule_dates:
+            # 保留LLM的日期时不混入规则的结束日期
+            continue
+        if getattr(form, field) in (None, "") and getattr(rule_form, field):
+            setattr(form, field, getattr(rule_form, field))
+    form.preferences = list(form.preferences or []) + list(rule_form.preferences)
+
+
+def _transcript_cache_key(transcript: str) -> str:
+    """规范化识别文本作为表单缓存键; 带上日期,因为"明天""下周五"依赖当天"""
+    normalized = " ".join(transcript.split()).rstrip("。.!！?？")
+    return f"{date.today().isoformat()}|{normalized}"
+
+
 def _infer_end_date(start_iso: Optional[str], travel_days: Optional[int]) -> Optional[str]:
     if not start_iso or not _valid_travel_days(travel_days):
         return None
@@ -135,7 +169,15 @@ class VoiceService:
 
     def __init__(self):
         self.settings = get_settings()
-        self.llm = get_llm()
+        self.llm = get_llm_for("voice")
+        # /voice/transcribe 预览后紧接着 /voice/plan 会提交同一段音频,缓存避免重复识别与解析
+        cache_size = self.settings.voice_cache_max_entries
+        cache_ttl = self.settings.voice_cache_ttl_seconds
+        self._transcript_cache: TTLCache[str] = TTLCache(cache_size, cache_ttl, name="voice_transcript")
+        self._form_cache: TTLCache[VoiceFormSuggestion] = TTLCache(cache_size, cache_ttl, name="voice_form")
+        # 进程内缓存未命中时查共享缓存: 多worker部署下两次请求可能落在不同进程
+        self._shared_transcripts = SharedCache("voice_transcript", ttl=cache_ttl)
+        self._shared_forms = SharedCache("voice_form", ttl=cache_ttl)
 
     def _resolve_bailian_config(self) -> dict:
         api_key = os.getenv("BAILIAN_API_KEY") or self.settings.bailian_api_key
@@ -266,8 +308,20 @@ class VoiceService:
 
     async def transcribe_audio(self, audio_bytes: bytes) -> str:
         """上传音频到阿里云百炼并返回识别文本"""
+        audio_key = hash_bytes(audio_bytes or b"")
+        cached = self._transcript_cache.get(audio_key)
+        if cached is None:
+            cached = self._shared_transcripts.get(audio_key)
+            if cached is not None:
+                self._transcript_cache.set(audio_key, cached)
+        if cached is not None:
+            return cached
+
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self._transcribe_sync, audio_bytes)
+        transcript = await loop.run_in_executor(None, bind_context(self._transcribe_sync, audio_bytes))
+        self._transcript_cache.set(audio_key, transcript)
+        self._shared_transcripts.set(audio_key, transcript)
+        return transcript
 
     def _transcribe_sync(self, audio_bytes: bytes) -> str:
         config = self._ensure_credentials()
@@ -291,13 +345,14 @@ class VoiceService:
             if config.get("language"):
                 asr_options["language"] = config["language"]
 
-            response = MultiModalConversation.call(
-                api_key=config["api_key"],
-                model=config["model"],
-                messages=messages,
-                result_format="message",
-                asr_options=asr_options,
-            )
+            with span("asr", config["model"] or "default"):
+                response = MultiModalConversation.call(
+                    api_key=config["api_key"],
+                    model=config["model"],
+                    messages=messages,
+                    result_format="message",
+                    asr_options=asr_options,
+                )
         except Exception as exc:
             raise VoiceServiceError(f"语音识别请求失败: {exc}") from exc
 
@@ -310,14 +365,61 @@ class VoiceService:
         if not transcript:
             return VoiceFormSuggestion()
 
-        loop = asyncio.get_running_loop()
+        cache_key = _transcript_cache_key(transcript)
+        cached = self._form_cache.get(cache_key)
+        if cached is None:
+            shared = self._shared_forms.get(cache_key)
+            if shared is not None:
+                cached = VoiceFormSuggestion.model_validate(shared)
+                self._form_cache.set(cache_key, cached)
+        if cached is not None:
+            # 调用方会回填end_date/travel_days,返回副本避免污染缓存
+            return cached.model_copy(deep=True)
+
+        form, cacheable = await self._parse_form_uncached(transcript)
+        if cacheable and (form.city or form.start_date or form.travel_days):
+            self._form_cache.set(cache_key, form.model_copy(deep=True))
+            self._shared_forms.set(cache_key, form.model_dump(mode="json"))
+        return form
+
+    async def _parse_form_uncached(self, transcript: str) -> Tuple[VoiceFormSuggestion, bool]:
+        """
+        Returns:
+            (表单建议, 是否可缓存); LLM失败时退回的规则结果不完整,不缓存,下次请求重试LLM
+        """
+        rule_form = self._parse_form_by_rules(transcript)
+        if rule_form is not None and self._rule_form_sufficient(rule_form):
+            return self._finalize_form(rule_form), True
+
         try:
-            data = await loop.run_in_executor(None, self._parse_form_sync, transcript)
+            data = await self._parse_form_llm(transcript)
         except VoiceServiceError as exc:
-            print(f"[VoiceService] 解析语音文本失败: {exc}")
-            return VoiceFormSuggestion()
+            logger.warning("解析语音文本失败: {}", exc)
+            # LLM不可用时退回规则抽取结果
+            return (self._finalize_form(rule_form) if rule_form else VoiceFormSuggestion()), False
         form = VoiceFormSuggestion(**data) if data else VoiceFormSuggestion()
+        form.confidence = None
+        if rule_form is not None:
+            _merge_rule_form(form, rule_form, self.settings.voice_rule_min_confidence)
+        return self._finalize_form(form), True
 
+    def _parse_form_by_rules(self, transcript: str) -> Optional[VoiceFormSuggestion]:
+        if not self.settings.voice_rule_enabled:
+            return None
+        try:
+            return extract_form_by_rules(transcript)
+        except Exception as exc:  # 规则通道只做加速,异常时交给LLM
+            logger.warning("规则抽取失败: {}", exc)
+            return None
+
+    def _rule_form_sufficient(self, form: VoiceFormSuggestion) -> bool:
+        if (form.confidence or 0.0) < self.settings.voice_rule_min_confidence:
+            return False
+        return not _format_missing_fields(form, require_travel_days=True)
+
+    @staticmethod
+    def _finalize_form(form: VoiceFormSuggestion) -> VoiceFormSuggestion:
+        form.city = canonical_city(form.city) or None
         form.start_date = _normalize_date(form.start_date)
         form.end_date = _normalize_date(form.end_date)
         if not form.end_date:
@@ -331,13 +433,15 @@ class VoiceService:
         form.preferences = _normalize_preferences(form.preferences)
         return form
 
-    def _parse_form_sync(self, transcript: str) -> dict:
+    async def _parse_form_llm(self, transcript: str) -> dict:
         messages = [
             {"role": "system", "content": VOICE_FORM_SYSTEM_PROMPT.strip()},
             {"role": "user", "content": transcript.strip()},
         ]
         try:
-            response_text = self.llm.invoke(messages, temperature=0.2, max_tokens=512)
+            # 共享LLM客户端的异步接口,不再占用线程池
+            with span("llm", "voice_form"):
+                response_text = await self.llm.ainvoke(messages, temperature=0.2, max_tokens=512)
         except Exception as exc:
             raise VoiceServiceError(f"LLM解析语音文本失败: {exc}") from exc
         data = _safe_json_loads(response_text)
@@ -397,7 +501,11 @@ class VoiceService:
             free_text_input=free_text,
         )
 
-    async def plan_trip_from_voice(self, audio_bytes: bytes) -> Tuple[str, VoiceFormSuggestion, TripPlan]:
+    async def plan_trip_from_voice(
+        self,
+        audio_bytes: bytes,
+        executor: Optional[Executor] = None,
+    ) -> Tuple[str, VoiceFormSuggestion, TripPlan]:
         transcript = await self.transcribe_audio(audio_bytes)
         suggestion = await self.parse_form_suggestion(transcript)
 
@@ -409,10 +517,14 @@ class VoiceService:
 
         loop = asyncio.get_running_loop()
         agent = get_trip_planner_agent()
-        trip_plan: TripPlan = await loop.run_in_executor(None, agent.plan_trip, trip_request)
+        trip_plan: TripPlan = await loop.run_in_executor(executor, bind_context(agent.plan_trip, trip_request))
         return transcript, suggestion, trip_plan
 
-    async def plan_trip_from_transcript(self, transcript: str) -> Tuple[str, VoiceFormSuggestion, TripPlan]:
+    async def plan_trip_from_transcript(
+        self,
+        transcript: str,
+        executor: Optional[Executor] = None,
+    ) -> Tuple[str, VoiceFormSuggestion, TripPlan]:
         clean_text = (transcript or "").strip()
         if not clean_text:
             raise VoiceServiceError("请输入有效的语音文本")
@@ -425,7 +537,7 @@ class VoiceService:
         trip_request = self._build_trip_request(suggestion)
         loop = asyncio.get_running_loop()
         agent = get_trip_planner_agent()
-        trip_plan: TripPlan = await loop.run_in_executor(None, agent.plan_trip, trip_request)
+        trip_plan: TripPlan = await loop.run_in_executor(executor, bind_context(agent.plan_trip, trip_request))
         return clean_text, suggestion, trip_plan
 
     def get_missing_fields(self, suggestion: VoiceFormSuggestion, require_travel_days: bool = False) -> List[str]:
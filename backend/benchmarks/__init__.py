@@ -0,0 +1 @@
+"""性能基准与离线评测脚本"""
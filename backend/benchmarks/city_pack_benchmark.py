@@ -0,0 +1,110 @@
+"""离线城市数据包基准: 文件大小、mmap加载耗时与候选查询耗时
+
+用假高德服务(benchmarks.fake_amap_mcp)的搜索结果为若干城市构建数据包,不访问网络。对比:
+- pack: 从mmap数据包按偏好取景点候选、按住宿类型取酒店候选
+- cached_json: 已命中工具缓存时解析搜索结果文本(不含MCP子进程与网络耗时,是实时路径的下限)
+
+用法(在backend目录下执行):
+    python -m benchmarks.city_pack_benchmark
+    python -m benchmarks.city_pack_benchmark --cities 300 --budget-us 50   # 查询超出预算时退出码为1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.services.city_pack import CityPack, write_city_pack
+from app.services.city_pack_builder import DEFAULT_ATTRACTION_KEYWORDS, DEFAULT_HOTEL_KEYWORDS
+from app.services.gazetteer import get_gazetteer
+from app.services.poi_candidates import POICandidate, parse_poi_search
+from app.services.poi_dedup import merge_candidates
+from benchmarks.fake_amap_mcp import _text_search
+
+
+def _search_text(keyword: str, city: str) -> str:
+    payload = _text_search({"keywords": keyword, "city": city})
+    return f"工具 'maps_text_search' 执行结果:\n{json.dumps(payload, ensure_ascii=False)}"
+
+
+def build_packs(n_cities: int) -> Dict[str, Tuple[List[POICandidate], List[POICandidate]]]:
+    cities = [entry.name for entry in get_gazetteer().entries[:n_cities]]
+    return {
+        city: (
+            merge_candidates(parse_poi_search(_search_text(k, city), k) for k in DEFAULT_ATTRACTION_KEYWORDS),
+            merge_candidates(parse_poi_search(_search_text(k, city), k) for k in DEFAULT_HOTEL_KEYWORDS),
+        )
+        for city in cities
+    }
+
+
+def wall_time_us(func, iterations: int) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run(n_cities: int, iterations: int) -> Dict[str, object]:
+    packs = build_packs(n_cities)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "city_packs.bin"
+        size = write_city_pack(path, packs)
+
+        started = time.perf_counter()
+        pack = CityPack(path)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        city = pack.cities[len(pack.cities) // 2]
+        preferences = ["历史文化", "美食"]
+        candidates, missing = pack.attractions(city, preferences, limit=20)
+        assert candidates and not missing, "数据包未命中"
+        expected = {c.id for c in packs[city][0] if set(c.keywords) & set(preferences)}
+        assert {c.id for c in candidates} <= expected, "数据包返回了不匹配偏好的候选"
+
+        texts = [_search_text(keyword, city) for keyword in preferences]
+        report = {
+            "cities": len(pack.cities),
+            "pois": pack.poi_count,
+            "file_kib": round(size / 1024, 1),
+            "load_ms": round(load_ms, 2),
+            "pack_attractions_us": round(wall_time_us(lambda: pack.attractions(city, preferences, limit=20), iterations), 1),
+            "pack_hotels_us": round(wall_time_us(lambda: pack.hotels(city, "经济型酒店", limit=8), iterations), 1),
+            "cached_json_us": round(wall_time_us(
+                lambda: merge_candidates(parse_poi_search(text, k) for text, k in zip(texts, preferences)), iterations
+            ), 1),
+        }
+        pack.close()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="离线城市数据包基准")
+    parser.add_argument("--cities", type=int, default=100, help="数据包中的城市数")
+    parser.add_argument("--iterations", type=int, default=2000, help="查询重复次数")
+    parser.add_argument("--budget-us", type=float, default=None, help="单次景点候选查询允许的耗时(微秒)")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    report = run(args.cities, args.iterations)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"城市 {report['cities']}  POI {report['pois']}  文件 {report['file_kib']} KiB  加载 {report['load_ms']} ms")
+        print(f"数据包景点候选: {report['pack_attractions_us']} us")
+        print(f"数据包酒店候选: {report['pack_hotels_us']} us")
+        print(f"解析缓存的搜索结果: {report['cached_json_us']} us")
+
+    if args.budget_us is not None and report["pack_attractions_us"] > args.budget_us:
+        print(f"数据包查询耗时超出预算({args.budget_us}us)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
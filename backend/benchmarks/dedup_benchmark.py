@@ -0,0 +1,101 @@
+"""POI去重基准: 去重耗时随候选数的增长(应近似线性)与去重结果的正确性
+
+构造若干个不同地点,每个地点以多种形式重复出现: 同ID重复(多个关键词命中)、子入口("X-东门"、
+"X(北门)")、通用后缀写法("X景区"); 另加同名但相距较远的地点与连锁酒店的不同分店,验证不会被误合并。
+
+用法(在backend目录下执行):
+    python -m benchmarks.dedup_benchmark
+    python -m benchmarks.dedup_benchmark --sizes 1000 10000 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import Dict, List, Tuple
+
+from app.services.poi_candidates import POICandidate
+from app.services.poi_dedup import dedupe_candidates, name_core
+
+_CENTER = (116.397, 39.909)
+
+
+def _candidate(poi_id: str, name: str, lng: float, lat: float, keyword: str) -> POICandidate:
+    return POICandidate(
+        id=poi_id, name=name, category="风景名胜", address="", longitude=lng, latitude=lat,
+        popularity=1.0, keywords=(keyword,),
+    )
+
+
+def make_candidates(places: int, seed: int = 0) -> Tuple[List[POICandidate], int]:
+    """返回(打乱后的候选, 应保留的地点数)"""
+    rng = random.Random(seed)
+    keywords = ("景点", "历史文化", "自然风光", "休闲")
+    candidates: List[POICandidate] = []
+    for index in range(places):
+        lng = _CENTER[0] + rng.uniform(-0.4, 0.4)
+        lat = _CENTER[1] + rng.uniform(-0.3, 0.3)
+        name = f"地点{index}"
+        candidates.append(_candidate(f"P{index}", name, lng, lat, rng.choice(keywords)))
+        candidates.append(_candidate(f"P{index}", name, lng, lat, rng.choice(keywords)))
+        candidates.append(_candidate(f"P{index}E", f"{name}-东门", lng + 0.002, lat + 0.001, rng.choice(keywords)))
+        candidates.append(_candidate(f"P{index}N", f"{name}(北门)", lng - 0.001, lat + 0.002, rng.choice(keywords)))
+        candidates.append(_candidate(f"P{index}S", f"{name}景区", lng + 0.001, lat - 0.001, rng.choice(keywords)))
+    # 同名但相距约20km的地点,以及同一品牌的不同分店,都应保留
+    far = [
+        _candidate(f"F{index}", f"地点{index}", _CENTER[0] + 1.0 + rng.uniform(0, 0.1), _CENTER[1] + 0.5, "景点")
+        for index in range(0, places, 10)
+    ]
+    branches = [
+        _candidate(f"B{index}", f"连锁酒店({index}号店)", _CENTER[0] + index * 1e-4, _CENTER[1], "酒店")
+        for index in range(max(1, places // 10))
+    ]
+    candidates.extend(far + branches)
+    rng.shuffle(candidates)
+    return candidates, places + len(far) + len(branches)
+
+
+def run(sizes: List[int], iterations: int) -> List[Dict[str, object]]:
+    rows = []
+    for places in sizes:
+        candidates, expected = make_candidates(places)
+        result = dedupe_candidates(candidates)
+        assert len(result) == expected, f"去重后应有{expected}个地点,实际{len(result)}个"
+        assert not any(c.name.endswith(("东门", "(北门)")) for c in result), "子入口未合并到主地点"
+
+        elapsed = 0.0
+        for _ in range(iterations):
+            # 按冷缓存计时: 线上每次检索的名称大多是新出现的
+            name_core.cache_clear()
+            started = time.perf_counter()
+            dedupe_candidates(candidates)
+            elapsed += (time.perf_counter() - started) / iterations
+        rows.append({
+            "candidates": len(candidates),
+            "kept": len(result),
+            "ms": round(elapsed * 1000, 2),
+            "us_per_candidate": round(elapsed * 1e6 / len(candidates), 2),
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="POI去重基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 5000, 20000], help="不同地点数")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    rows = run(args.sizes, args.iterations)
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    print(f"{'候选数':>7} {'保留':>6} {'耗时(ms)':>9} {'us/候选':>8}")
+    for row in rows:
+        print(f"{row['candidates']:>7} {row['kept']:>6} {row['ms']:>9} {row['us_per_candidate']:>8}")
+
+
+if __name__ == "__main__":
+    main()
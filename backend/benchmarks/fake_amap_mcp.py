@@ -0,0 +1,333 @@
+"""本地替身: 通过stdio讲MCP协议的假高德地图服务
+
+实现 initialize / tools/list / tools/call 等最小子集,工具名称与参数和 amap-mcp-server 一致,
+返回结构相近的JSON,内容由参数哈希确定(同样的请求得到同样的结果)。不依赖MCP SDK。
+
+用法(在backend目录下执行,一般由压测脚本通过 AMAP_MCP_COMMAND 启动):
+    AMAP_MCP_COMMAND="python -m benchmarks.fake_amap_mcp --latency-ms 50" uvicorn app.api.main:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.gazetteer import get_gazetteer
+
+PROTOCOL_VERSION = "2024-11-05"
+
+_POI_SUFFIXES = ("博物馆", "公园", "古镇", "寺", "广场", "老街", "美术馆", "湖", "山", "大酒店", "宾馆", "餐厅")
+_WEATHERS = ("晴", "多云", "阴", "小雨", "阵雨")
+_WINDS = ("东", "南", "西", "北", "东北", "西南")
+
+
+def _rng(*parts: Any) -> random.Random:
+    digest = hashlib.md5(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def _city_center(city: Optional[str]):
+    entry = get_gazetteer().lookup(city or "")
+    if entry is None:
+        return city or "北京", "110000", 116.397, 39.909
+    return entry.name, entry.adcode, entry.longitude, entry.latitude
+
+
+def _text_search(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    keywords = str(arguments.get("keywords") or "景点")
+    city, adcode, lng, lat = _city_center(arguments.get("city"))
+    rng = _rng("text_search", keywords, city)
+    pois = []
+    for index in range(10):
+        suffix = rng.choice(_POI_SUFFIXES)
+        pois.append({
+            "id": f"B0{adcode}{index:04d}",
+            "name": f"{city}{keywords}{suffix}{index + 1}",
+            "address": f"{city}市中心路{rng.randint(1, 300)}号",
+            "typecode": "110000",
+            "location": f"{lng + rng.uniform(-0.08, 0.08):.6f},{lat + rng.uniform(-0.06, 0.06):.6f}",
+        })
+    return {"suggestion": {"keywords": [], "ciytes": []}, "pois": pois}
+
+
+def _around_search(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    location = str(arguments.get("location") or "116.397,39.909")
+    keywords = str(arguments.get("keywords") or "")
+    rng = _rng("around", location, keywords)
+    lng, lat = (float(part) for part in location.split(",")[:2])
+    return {
+        "pois": [
+            {
+                "id": f"B0AROUND{index:04d}",
+                "name": f"{keywords or '周边'}{rng.choice(_POI_SUFFIXES)}{index + 1}",
+                "address": f"附近{rng.randint(1, 99)}号",
+                "typecode": "050000",
+                "location": f"{lng + rng.uniform(-0.01, 0.01):.6f},{lat + rng.uniform(-0.01, 0.01):.6f}",
+            }
+            for index in range(5)
+        ]
+    }
+
+
+def _search_detail(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    poi_id = str(arguments.get("id") or "")
+    rng = _rng("detail", poi_id)
+    return {
+        "id": poi_id,
+        "name": f"景点{poi_id[-4:]}",
+        "location": f"{116.3 + rng.uniform(0, 0.2):.6f},{39.8 + rng.uniform(0, 0.2):.6f}",
+        "address": f"中心路{rng.randint(1, 300)}号",
+        "business_area": "市中心",
+        "city": "北京市",
+        "type": "风景名胜;风景名胜;国家级景点",
+        "alias": "",
+        "biz_ext": {"rating": f"{rng.uniform(3.8, 4.9):.1f}", "cost": str(rng.choice([0, 30, 60, 120]))},
+        "photos": [{"url": f"https://example.com/poi/{poi_id}.jpg", "title": ""}],
+    }
+
+
+def _weather(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    city, _, _, _ = _city_center(arguments.get("city"))
+    rng = _rng("weather", city, date.today().isoformat())
+    forecasts = []
+    for offset in range(4):
+        day = date.today() + timedelta(days=offset)
+        high = rng.randint(10, 32)
+        forecasts.append({
+            "date": day.isoformat(),
+            "week": str(day.isoweekday()),
+            "dayweather": rng.choice(_WEATHERS),
+            "nightweather": rng.choice(_WEATHERS),
+            "daytemp": str(high),
+            "nighttemp": str(high - rng.randint(4, 10)),
+            "daywind": rng.choice(_WINDS),
+            "nightwind": rng.choice(_WINDS),
+            "daypower": "1-3",
+            "nightpower": "1-3",
+        })
+    return {"city": f"{city}市", "forecasts": forecasts}
+
+
+def _geo(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    address = str(arguments.get("address") or "")
+    city, adcode, lng, lat = _city_center(arguments.get("city") or address)
+    rng = _rng("geo", address)
+    return {
+        "results": [{
+            "country": "中国",
+            "province": city,
+            "city": city,
+            "citycode": adcode[:4],
+            "district": "",
+            "street": "",
+            "number": "",
+            "adcode": adcode,
+            "location": f"{lng + rng.uniform(-0.05, 0.05):.6f},{lat + rng.uniform(-0.05, 0.05):.6f}",
+            "level": "兴趣点",
+        }]
+    }
+
+
+def _regeocode(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return {"province": "北京市", "city": "北京市", "district": "东城区"}
+
+
+def _direction(mode: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    speed = {"walking": 1.2, "bicycling": 4.0, "driving": 10.0, "transit_integrated": 6.0}[mode]
+
+    def handler(arguments: Dict[str, Any]) -> Dict[str, Any]:
+        origin = str(arguments.get("origin") or "")
+        destination = str(arguments.get("destination") or "")
+        rng = _rng(mode, origin, destination)
+        distance = rng.randint(800, 15000)
+        duration = int(distance / speed)
+        return {
+            "route": {
+                "origin": origin,
+                "destination": destination,
+                "paths": [{
+                    "distance": str(distance),
+                    "duration": str(duration),
+                    "steps": [
+                        {"instruction": f"沿道路前行{distance // 2}米", "road": "中心路", "distance": str(distance // 2)},
+                        {"instruction": f"右转前行{distance - distance // 2}米到达终点", "road": "", "distance": str(distance - distance // 2)},
+                    ],
+                }],
+            }
+        }
+
+    return handler
+
+
+def _distance(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    rng = _rng("distance", arguments.get("origins"), arguments.get("destination"))
+    return {"results": [{"distance": str(rng.randint(500, 20000)), "duration": str(rng.randint(300, 3600))}]}
+
+
+def _schema(properties: Dict[str, str], required: List[str]) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {name: {"type": "string", "description": desc} for name, desc in properties.items()},
+        "required": required,
+    }
+
+
+TOOLS: Dict[str, Dict[str, Any]] = {
+    "maps_text_search": {
+        "description": "关键词搜索POI",
+        "inputSchema": _schema({"keywords": "搜索关键词", "city": "查询城市", "citylimit": "是否限制城市范围"}, ["keywords"]),
+        "handler": _text_search,
+    },
+    "maps_around_search": {
+        "description": "周边搜索POI",
+        "inputSchema": _schema({"location": "中心点经纬度", "radius": "搜索半径", "keywords": "搜索关键词"}, ["location"]),
+        "handler": _around_search,
+    },
+    "maps_search_detail": {
+        "description": "查询POI详情",
+        "inputSchema": _schema({"id": "POI ID"}, ["id"]),
+        "handler": _search_detail,
+    },
+    "maps_weather": {
+        "description": "查询城市天气",
+        "inputSchema": _schema({"city": "城市名称或adcode"}, ["city"]),
+        "handler": _weather,
+    },
+    "maps_geo": {
+        "description": "地址转经纬度",
+        "inputSchema": _schema({"address": "结构化地址", "city": "城市"}, ["address"]),
+        "handler": _geo,
+    },
+    "maps_regeocode": {
+        "description": "经纬度转地址",
+        "inputSchema": _schema({"location": "经纬度"}, ["location"]),
+        "handler": _regeocode,
+    },
+    "maps_direction_walking": {
+        "description": "步行路径规划",
+        "inputSchema": _schema({"origin": "起点经纬度", "destination": "终点经纬度"}, ["origin", "destination"]),
+        "handler": _direction("walking"),
+    },
+    "maps_direction_bicycling": {
+        "description": "骑行路径规划",
+        "inputSchema": _schema({"origin": "起点经纬度", "destination": "终点经纬度"}, ["origin", "destination"]),
+        "handler": _direction("bicycling"),
+    },
+    "maps_direction_driving": {
+        "description": "驾车路径规划",
+        "inputSchema": _schema({"origin": "起点经纬度", "destination": "终点经纬度"}, ["origin", "destination"]),
+        "handler": _direction("driving"),
+    },
+    "maps_direction_transit_integrated": {
+        "description": "公交路径规划",
+        "inputSchema": _schema(
+            {"origin": "起点经纬度", "destination": "终点经纬度", "city": "起点城市", "cityd": "终点城市"},
+            ["origin", "destination", "city", "cityd"],
+        ),
+        "handler": _direction("transit_integrated"),
+    },
+    "maps_distance": {
+        "description": "距离测量",
+        "inputSchema": _schema({"origins": "起点经纬度", "destination": "终点经纬度", "type": "测量类型"}, ["origins", "destination"]),
+        "handler": _distance,
+    },
+}
+
+
+class FakeAmapServer:
+    """逐行读取JSON-RPC请求并写回响应"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def handle(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        method = request.get("method", "")
+        request_id = request.get("id")
+        if request_id is None:
+            # 通知(如notifications/initialized)无需响应
+            return None
+        params = request.get("params") or {}
+
+        if method == "initialize":
+            result = {
+                "protocolVersion": params.get("protocolVersion") or PROTOCOL_VERSION,
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": {"name": "fake-amap-mcp", "version": "0.1.0"},
+            }
+        elif method == "ping":
+            result = {}
+        elif method == "tools/list":
+            result = {
+                "tools": [
+                    {"name": name, "description": spec["description"], "inputSchema": spec["inputSchema"]}
+                    for name, spec in TOOLS.items()
+                ]
+            }
+        elif method == "tools/call":
+            result = self._call_tool(params.get("name", ""), params.get("arguments") or {})
+        elif method in ("resources/list", "resources/templates/list"):
+            result = {"resources": []} if method == "resources/list" else {"resourceTemplates": []}
+        elif method == "prompts/list":
+            result = {"prompts": []}
+        else:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": f"Method not found: {method}"}}
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def _call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        self._sleep()
+        spec = TOOLS.get(name)
+        if spec is None:
+            return {"content": [{"type": "text", "text": f"Unknown tool: {name}"}], "isError": True}
+        if self.error_rate and self._random.random() < self.error_rate:
+            return {"content": [{"type": "text", "text": "API调用失败: SERVICE_NOT_AVAILABLE"}], "isError": True}
+        payload = spec["handler"](arguments)
+        return {"content": [{"type": "text", "text": json.dumps(payload, ensure_ascii=False)}], "isError": False}
+
+    def _sleep(self) -> None:
+        delay = self.latency_ms + (self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def serve(self, stdin=None, stdout=None) -> None:
+        stdin = stdin or sys.stdin
+        stdout = stdout or sys.stdout
+        for line in stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}
+            else:
+                response = self.handle(request)
+            if response is not None:
+                stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+                stdout.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="假高德地图MCP服务(stdio)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="每次工具调用的模拟延迟")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="延迟抖动范围")
+    parser.add_argument("--startup-ms", type=float, default=0.0, help="模拟进程启动耗时(uvx拉起约数百毫秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="工具调用失败比例")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.startup_ms > 0:
+        time.sleep(args.startup_ms / 1000.0)
+    FakeAmapServer(args.latency_ms, args.jitter_ms, args.error_rate, args.seed).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""本地替身: OpenAI兼容的假LLM服务
+
+按系统提示词识别调用方,返回脚本化的回复:
+- 景点/天气/酒店Agent: 首轮返回 [TOOL_CALL:...],拿到工具结果后返回摘要
+- 行程规划Agent: 根据请求中的城市/日期/天数生成可通过TripPlan校验的JSON
+- 行程调整Agent: 在原有当天安排的基础上替换景点,返回单日JSON
+- 语音表单抽取: 用规则抽取器生成表单JSON
+延迟可配置(基础延迟+抖动,规划Agent可单独设置),不消耗任何真实token。
+
+用法(在backend目录下执行):
+    python -m benchmarks.fake_llm_server --port 18080 --latency-ms 300 --planner-latency-ms 1500
+    LLM_BASE_URL=http://127.0.0.1:18080/v1 LLM_API_KEY=fake LLM_MODEL_ID=fake-model uvicorn app.api.main:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.gazetteer import get_gazetteer
+from app.services.voice_rules import extract_form_by_rules
+
+_TOOL_RESULT_PREFIX = "工具执行结果"
+
+
+def _last_user_message(messages: List[Dict[str, Any]]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return str(message.get("content") or "")
+    return ""
+
+
+def _system_prompt(messages: List[Dict[str, Any]]) -> str:
+    for message in messages:
+        if message.get("role") == "system":
+            return str(message.get("content") or "")
+    return ""
+
+
+def _search(pattern: str, text: str, default: str = "") -> str:
+    match = re.search(pattern, text)
+    return match.group(1).strip() if match else default
+
+
+def _summarize_tool_results(kind: str, text: str) -> str:
+    body = text.split("\n", 1)[-1].strip()
+    return f"{kind}查询完成,以下为工具返回的主要结果:\n{body[:1200]}"
+
+
+def _attraction_reply(user: str) -> str:
+    call = re.search(r"\[TOOL_CALL:[^\]]+\]", user)
+    if call:
+        return f"好的,我来搜索景点。\n{call.group(0)}"
+    city = _search(r"搜索(.+?)的", user, "北京")
+    return f"[TOOL_CALL:amap_maps_text_search:keywords=景点,city={city}]"
+
+
+def _weather_reply(user: str) -> str:
+    city = _search(r"查询(.+?)的天气", user, "北京")
+    return f"[TOOL_CALL:amap_maps_weather:city={city}]"
+
+
+def _hotel_reply(user: str) -> str:
+    city = _search(r"搜索(.+?)的", user, "北京")
+    kind = _search(r"搜索.+?的(.+?)酒店", user, "酒店") or "酒店"
+    return f"[TOOL_CALL:amap_maps_text_search:keywords={kind},city={city}]"
+
+
+def _planner_reply(user: str, rng: random.Random) -> str:
+    city = _search(r"- 城市:\s*(.+)", user, "北京")
+    start = _search(r"- 日期:\s*(\d{4}-\d{2}-\d{2})", user, date.today().isoformat())
+    end = _search(r"至\s*(\d{4}-\d{2}-\d{2})", user, start)
+    days = int(_search(r"- 天数:\s*(\d+)", user, "1") or 1)
+    transportation = _search(r"- 交通方式:\s*(.+)", user, "公共交通")
+    accommodation = _search(r"- 住宿:\s*(.+)", user, "经济型酒店")
+
+    entry = get_gazetteer().lookup(city)
+    lng, lat = (entry.longitude, entry.latitude) if entry else (116.397, 39.909)
+    start_dt = datetime.strptime(start, "%Y-%m-%d")
+
+    plan_days, weather = [], []
+    totals = {"total_attractions": 0, "total_hotels": 0, "total_meals": 0, "total_transportation": 0}
+    for index in range(days):
+        current = (start_dt + timedelta(days=index)).strftime("%Y-%m-%d")
+        attractions = []
+        for slot in range(3):
+            price = rng.choice([0, 40, 60, 120])
+            totals["total_attractions"] += price
+            attractions.append({
+                "name": f"{city}景点{index + 1}-{slot + 1}",
+                "address": f"{city}市中心路{rng.randint(1, 300)}号",
+                "location": {"longitude": round(lng + rng.uniform(-0.05, 0.05), 6), "latitude": round(lat + rng.uniform(-0.05, 0.05), 6)},
+                "visit_duration": rng.choice([60, 90, 120, 180]),
+                "description": f"{city}的代表性景点",
+                "category": "景点",
+                "ticket_price": price,
+            })
+        meals = []
+        for meal_type, cost in (("breakfast", 20), ("lunch", 60), ("dinner", 90)):
+            totals["total_meals"] += cost
+            meals.append({"type": meal_type, "name": f"{city}特色{meal_type}", "description": "当地人气餐厅", "estimated_cost": cost})
+        hotel_cost = rng.choice([200, 350, 600])
+        totals["total_hotels"] += hotel_cost
+        totals["total_transportation"] += 50
+        plan_days.append({
+            "date": current,
+            "day_index": index,
+            "description": f"第{index + 1}天: 游览{city}核心景点",
+            "transportation": transportation,
+            "accommodation": accommodation,
+            "hotel": {
+                "name": f"{city}{accommodation}",
+                "address": f"{city}市中心",
+                "location": {"longitude": round(lng, 6), "latitude": round(lat, 6)},
+                "price_range": f"{hotel_cost - 50}-{hotel_cost + 50}元",
+                "rating": "4.5",
+                "distance": "距离景点2公里",
+                "type": accommodation,
+                "estimated_cost": hotel_cost,
+            },
+            "attractions": attractions,
+            "meals": meals,
+        })
+        weather.append({
+            "date": current,
+            "day_weather": rng.choice(["晴", "多云", "阴"]),
+            "night_weather": "晴",
+            "day_temp": rng.randint(15, 30),
+            "night_temp": rng.randint(5, 14),
+            "wind_direction": "南风",
+            "wind_power": "1-3级",
+        })
+
+    plan = {
+        "city": city,
+        "start_date": start,
+        "end_date": end,
+        "days": plan_days,
+        "weather_info": weather,
+        "overall_suggestions": f"{city}{days}日游,建议提前预约热门景点。",
+        "budget": {**totals, "total": sum(totals.values())},
+    }
+    return "```json\n" + json.dumps(plan, ensure_ascii=False, indent=2) + "\n```"
+
+
+def _day_editor_reply(user: str, rng: random.Random) -> str:
+    day = json.loads(_search(r"\*\*当天原安排:\*\*\s*\n(.+)", user, "{}") or "{}")
+    target = _search(r"把景点「(.+?)」替换为", user)
+    city = _search(r"请调整(.+?)旅行计划中", user, "")
+    for slot, attraction in enumerate(day.get("attractions", [])):
+        if target and attraction.get("name") != target:
+            continue
+        attraction.update({
+            "name": f"{city}新景点{rng.randint(1, 999)}",
+            "ticket_price": rng.choice([0, 40, 60, 120]),
+            "visit_duration": rng.choice([60, 90, 120]),
+        })
+    day["description"] = f"{day.get('description', '')}(已调整)"
+    return "```json\n" + json.dumps(day, ensure_ascii=False, indent=2) + "\n```"
+
+
+def _voice_form_reply(user: str) -> str:
+    form = extract_form_by_rules(user)
+    return json.dumps(form.model_dump(exclude={"confidence"}), ensure_ascii=False)
+
+
+class ScriptedLLM:
+    """根据消息内容生成脚本化回复"""
+
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        planner_latency_ms: Optional[float] = None,
+        jitter_ms: float = 50.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.planner_latency_ms = latency_ms if planner_latency_ms is None else planner_latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+
+    def reply(self, messages: List[Dict[str, Any]]) -> Tuple[str, str]:
+        system = _system_prompt(messages)
+        user = _last_user_message(messages)
+        with self._lock:
+            rng = random.Random(self._random.random())
+
+        if system.startswith("你是行程规划专家"):
+            role, content = "planner", _planner_reply(user, rng)
+        elif system.startswith("你是行程调整专家"):
+            role, content = "day_editor", _day_editor_reply(user, rng)
+        elif "旅行表单抽取助手" in system:
+            role, content = "voice_form", _voice_form_reply(user)
+        elif system.startswith(("你是景点搜索专家", "你是天气查询专家", "你是酒店推荐专家")):
+            kind = system[2:6]
+            role = {"景点搜索": "attraction", "天气查询": "weather", "酒店推荐": "hotel"}.get(kind, "agent")
+            if user.startswith(_TOOL_RESULT_PREFIX):
+                content = _summarize_tool_results(kind, user)
+            elif role == "attraction":
+                content = _attraction_reply(user)
+            elif role == "weather":
+                content = _weather_reply(user)
+            else:
+                content = _hotel_reply(user)
+        else:
+            role, content = "other", "好的。"
+
+        with self._lock:
+            self.calls[role] = self.calls.get(role, 0) + 1
+        return role, content
+
+    def delay_seconds(self, role: str) -> float:
+        base = self.planner_latency_ms if role == "planner" else self.latency_ms
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, base + jitter) / 1000.0
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+def _make_handler(llm: ScriptedLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - 与基类签名一致
+            return
+
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端已取消请求(如对冲请求中落败的一方)
+                self.close_connection = True
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            messages = request.get("messages") or []
+
+            role, content = llm.reply(messages)
+            time.sleep(llm.delay_seconds(role))
+            if llm.should_fail():
+                self._send_json(503, {"error": {"message": "fake upstream overloaded", "type": "server_error"}})
+                return
+
+            prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 2
+            completion_tokens = len(content) // 2
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model") or "fake-model",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+
+    return Handler
+
+
+def start_server(llm: ScriptedLLM, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """在后台线程启动服务,返回server(server.server_address[1]为实际端口)"""
+    server = ThreadingHTTPServer((host, port), _make_handler(llm))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI兼容的假LLM服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="普通Agent调用的模拟延迟")
+    parser.add_argument("--planner-latency-ms", type=float, default=None, help="行程规划Agent的模拟延迟")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回503的比例")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    llm = ScriptedLLM(args.latency_ms, args.planner_latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(llm))
+    server.daemon_threads = True
+    print(f"fake LLM listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""端到端离线压测: 假LLM + 假高德MCP,按并发度驱动规划/地图/语音文本接口
+
+默认在本机拉起全部依赖:
+1. 假LLM服务(benchmarks.fake_llm_server,后台线程)
+2. 后端应用(uvicorn子进程),AMAP_MCP_COMMAND指向 benchmarks.fake_amap_mcp
+然后对各场景发起请求,输出 p50/p95/p99 延迟、吞吐与降级计划数(2xx但degraded的计划不计入成功)。也可用 --base-url 压测已运行的服务。
+
+用法(在backend目录下执行):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --scenarios trip,voice_text --concurrency 8 --requests 40
+    python -m benchmarks.load_test --llm-latency-ms 800 --planner-latency-ms 3000 --workers 2 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.fake_llm_server import ScriptedLLM, start_server
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+CITIES = ["北京", "上海", "杭州", "成都", "西安", "广州", "南京", "重庆", "厦门", "青岛", "苏州", "长沙"]
+PREFERENCES = ["历史文化", "自然风光", "美食", "购物", "艺术", "休闲"]
+
+RequestSpec = Tuple[str, str, Dict[str, Any]]
+
+
+def _trip_request(index: int) -> RequestSpec:
+    # 每个请求的城市/日期组合不同,避免命中行程计划缓存
+    start = date.today() + timedelta(days=7 + index)
+    days = 2 + index % 3
+    return "POST", "/api/trip/plan", {"json": {
+        "city": CITIES[index % len(CITIES)],
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=days - 1)).isoformat(),
+        "travel_days": days,
+        "transportation": "公共交通",
+        "accommodation": "经济型酒店",
+        "preferences": [PREFERENCES[index % len(PREFERENCES)]],
+        "free_text_input": "",
+    }}
+
+
+def _map_poi_request(index: int) -> RequestSpec:
+    return "GET", "/api/map/poi", {"params": {
+        "keywords": PREFERENCES[index % len(PREFERENCES)],
+        "city": CITIES[index % len(CITIES)],
+    }}
+
+
+def _map_weather_request(index: int) -> RequestSpec:
+    return "GET", "/api/map/weather", {"params": {"city": CITIES[index % len(CITIES)]}}
+
+
+def _map_route_request(index: int) -> RequestSpec:
+    city = CITIES[index % len(CITIES)]
+    return "POST", "/api/map/route", {"json": {
+        "origin_address": f"{city}火车站",
+        "destination_address": f"{city}博物馆{index}",
+        "origin_city": city,
+        "destination_city": city,
+        "route_type": "walking",
+    }}
+
+
+def _voice_text_request(index: int) -> RequestSpec:
+    city = CITIES[index % len(CITIES)]
+    month_day = date.today() + timedelta(days=10 + index)
+    transcript = (
+        f"{month_day.month}月{month_day.day}号去{city}玩{2 + index % 3}天,"
+        f"喜欢{PREFERENCES[index % len(PREFERENCES)]},坐公共交通,住经济型酒店"
+    )
+    return "POST", "/api/voice/plan-text", {"json": {"transcript": transcript}}
+
+
+SCENARIOS: Dict[str, Callable[[int], RequestSpec]] = {
+    "trip": _trip_request,
+    "map_poi": _map_poi_request,
+    "map_weather": _map_weather_request,
+    "map_route": _map_route_request,
+    "voice_text": _voice_text_request,
+}
+
+# AmapService.plan_route尚未解析路线数据(返回空结果,接口固定返回500),
+# map_route只测到错误路径,会拉低整体延迟与错误率统计,默认不运行; 需要时用--scenarios显式指定
+DEFAULT_SCENARIOS = [name for name in SCENARIOS if name != "map_route"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩百分位"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def _is_degraded(response: httpx.Response) -> bool:
+    """规划类接口返回的计划是否为降级计划"""
+    try:
+        data = response.json().get("data")
+    except (ValueError, AttributeError):
+        return False
+    return isinstance(data, dict) and bool(data.get("degraded"))
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    total: int,
+    concurrency: int,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    build = SCENARIOS[name]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    degraded = 0
+
+    async def one(index: int) -> None:
+        nonlocal degraded
+        method, path, kwargs = build(offset + index)
+        response: Optional[httpx.Response] = None
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = str(response.status_code)
+            except httpx.HTTPError as exc:
+                status = exc.__class__.__name__
+            elapsed = (time.perf_counter() - started) * 1000
+        latencies.append(elapsed)
+        if not status.startswith("2"):
+            errors[status] = errors.get(status, 0) + 1
+        elif _is_degraded(response):
+            degraded += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(total)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        # 2xx但为降级计划(LLM/高德失败或超出截止时间后本地组装),不计入成功
+        "degraded": degraded,
+        "success_rate": round((total - sum(errors.values()) - degraded) / total, 3) if total else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "throughput_rps": round(total / wall, 2) if wall else 0.0,
+        "wall_seconds": round(wall, 2),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _spawn_backend(args: argparse.Namespace, llm_port: int) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    mcp_command = " ".join([
+        shlex.quote(sys.executable), "-m", "benchmarks.fake_amap_mcp",
+        "--latency-ms", str(args.mcp_latency_ms),
+        "--startup-ms", str(args.mcp_startup_ms),
+    ])
+    env = {
+        **os.environ,
+        "LLM_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "LLM_API_KEY": "fake-key",
+        "LLM_MODEL_ID": "fake-model",
+        "AMAP_API_KEY": "fake-amap-key",
+        "AMAP_MCP_COMMAND": mcp_command,
+        "LOG_LEVEL": args.log_level,
+        "PYTHONPATH": str(BACKEND_DIR),
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", "app.api.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    process = subprocess.Popen(
+        command,
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.show_server_logs else subprocess.DEVNULL,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def _wait_ready(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/metrics")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"后端在{timeout:g}秒内未就绪: {base_url}")
+
+
+async def run(args: argparse.Namespace, base_url: str) -> List[Dict[str, Any]]:
+    await _wait_ready(base_url, args.startup_timeout)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency)
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for name in args.scenarios:
+            if args.warmup:
+                await run_scenario(client, name, args.warmup, min(args.warmup, args.concurrency), offset=10_000)
+            results.append(await run_scenario(client, name, args.requests, args.concurrency))
+    return results
+
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    header = (
+        f"{'场景':<12}{'请求':>6}{'并发':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'吞吐(rps)':>11}"
+        f"{'降级':>6}{'成功率':>8}  错误"
+    )
+    print(header)
+    print("-" * len(header.encode("gbk", "ignore")))
+    for row in results:
+        errors = ",".join(f"{code}x{count}" for code, count in row["errors"].items()) or "-"
+        print(
+            f"{row['scenario']:<12}{row['requests']:>6}{row['concurrency']:>6}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['throughput_rps']:>11.2f}"
+            f"{row['degraded']:>6}{row['success_rate']:>9.1%}  {errors}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None, help="压测已运行的服务,不再拉起替身和后端")
+    parser.add_argument(
+        "--scenarios", default=",".join(DEFAULT_SCENARIOS),
+        help=f"逗号分隔: {','.join(SCENARIOS)} (默认不含map_route)",
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20, help="每个场景的请求数")
+    parser.add_argument("--warmup", type=int, default=2, help="每个场景正式计时前的预热请求数")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker数")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--planner-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=30.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--mcp-latency-ms", type=float, default=50.0)
+    parser.add_argument("--mcp-startup-ms", type=float, default=0.0, help="模拟每次拉起MCP子进程的额外耗时")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--log-level", default="WARNING", help="后端日志级别")
+    parser.add_argument("--show-server-logs", action="store_true")
+    parser.add_argument("--json", action="store_true", help="输出JSON结果")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知场景: {', '.join(unknown)}")
+
+    process: Optional[subprocess.Popen] = None
+    llm: Optional[ScriptedLLM] = None
+    base_url = args.base_url
+    if base_url is None:
+        llm = ScriptedLLM(args.llm_latency_ms, args.planner_latency_ms, args.llm_jitter_ms, args.llm_error_rate)
+        llm_server = start_server(llm)
+        process, base_url = _spawn_backend(args, llm_server.server_address[1])
+
+    try:
+        results = asyncio.run(run(args, base_url))
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    if args.json:
+        print(json.dumps({"results": results, "llm_calls": llm.calls if llm else None}, ensure_ascii=False, indent=2))
+        return
+    _print_table(results)
+    if llm is not None:
+        print(f"\n假LLM调用次数: {llm.calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""日志开销基准: 对比同步print与队列化loguru在请求线程上的单次调用耗时
+
+日志输出重定向到/dev/null; --write-latency-us 模拟被下游(终端/管道/日志采集)拖慢的stdout,
+此时同步print的耗时随之上升,而入队日志的调用开销保持不变。
+
+用法(在backend目录下执行):
+    python -m benchmarks.logging_benchmark
+    python -m benchmarks.logging_benchmark --write-latency-us 200 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict
+
+from app.logging_config import log_preview, logger, setup_logging, shutdown_logging
+
+PAYLOAD = "景点搜索结果: " + "故宫博物院 天安门广场 颐和园 " * 200
+
+
+class SlowStream:
+    """每次写入额外等待固定时间的输出流"""
+
+    def __init__(self, stream, latency_seconds: float):
+        self.stream = stream
+        self.latency_seconds = latency_seconds
+
+    def write(self, data: str) -> int:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self.stream.write(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def measure(name: str, func: Callable[[int], None], iterations: int) -> Dict[str, object]:
+    for index in range(min(1000, iterations)):
+        func(index)
+    start = time.perf_counter()
+    for index in range(iterations):
+        func(index)
+    elapsed = time.perf_counter() - start
+    return {"name": name, "iterations": iterations, "per_call_us": round(elapsed / iterations * 1e6, 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--write-latency-us", type=float, default=0.0, help="模拟stdout每次写入的阻塞时间(微秒)")
+    parser.add_argument("--json", action="store_true", help="输出JSON结果")
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    original_stdout, original_stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = SlowStream(devnull, args.write_latency_us / 1e6)
+    try:
+        setup_logging()
+        results = [
+            measure("print(同步,含200字预览)", lambda i: print(f"景点搜索结果: {PAYLOAD[:200]}...", flush=True), args.iterations),
+            measure("logger.info(入队)", lambda i: logger.bind(step=i).info("请求完成"), args.iterations),
+            measure("log_preview(采样)", lambda i: log_preview("景点搜索结果", PAYLOAD), args.iterations),
+            measure("logger.debug(低于级别)", lambda i: logger.debug("忽略 {}", i), args.iterations),
+        ]
+        shutdown_logging()
+    finally:
+        sys.stdout, sys.stderr = original_stdout, original_stderr
+        devnull.close()
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for result in results:
+        print(f"{result['name']:<28} {result['per_call_us']:>8.3f} µs/次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""候选排序基准: 向量化(numpy)与纯Python打分排序的耗时,并校验两者结果一致
+
+候选由假高德服务(benchmarks.fake_amap_mcp)的搜索结果扩展而来,带随机评分与热度,不访问网络。
+
+用法(在backend目录下执行):
+    python -m benchmarks.ranking_benchmark
+    python -m benchmarks.ranking_benchmark --sizes 200 2000 --top-k 20 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from dataclasses import replace
+from typing import Dict, List
+
+from app.services.poi_candidates import POICandidate, parse_poi_search
+from app.services.poi_retrieval import city_center, np, rank_candidates
+from benchmarks.fake_amap_mcp import _text_search
+
+_PREFERENCES = ["历史文化", "美食", "自然风光"]
+
+
+def make_candidates(size: int, city: str = "北京", seed: int = 0) -> List[POICandidate]:
+    rng = random.Random(seed)
+    base = []
+    for keyword in _PREFERENCES + ["景点", "购物"]:
+        payload = _text_search({"keywords": keyword, "city": city})
+        text = f"工具 'maps_text_search' 执行结果:\n{json.dumps(payload, ensure_ascii=False)}"
+        base.extend(parse_poi_search(text, keyword))
+    candidates = []
+    for index in range(size):
+        candidate = base[index % len(base)]
+        candidates.append(replace(
+            candidate,
+            id=f"{candidate.id}-{index}",
+            longitude=candidate.longitude + rng.uniform(-0.2, 0.2),
+            latitude=candidate.latitude + rng.uniform(-0.15, 0.15),
+            rating=rng.choice([0.0, round(rng.uniform(3.0, 5.0), 1)]),
+            popularity=rng.uniform(0, 3),
+        ))
+    return candidates
+
+
+def wall_time_us(func, iterations: int) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run(sizes: List[int], top_k: int, iterations: int) -> List[Dict[str, object]]:
+    center = city_center("北京")
+    rows = []
+    for size in sizes:
+        candidates = make_candidates(size)
+        python_top = rank_candidates(candidates, _PREFERENCES, center, top_k, use_numpy=False)
+        row: Dict[str, object] = {
+            "candidates": size,
+            "python_us": round(wall_time_us(
+                lambda: rank_candidates(candidates, _PREFERENCES, center, top_k, use_numpy=False), iterations
+            ), 1),
+        }
+        if np is not None:
+            numpy_top = rank_candidates(candidates, _PREFERENCES, center, top_k, use_numpy=True)
+            assert [c.id for c in numpy_top] == [c.id for c in python_top], "numpy与纯Python的排序结果不一致"
+            row["numpy_us"] = round(wall_time_us(
+                lambda: rank_candidates(candidates, _PREFERENCES, center, top_k, use_numpy=True), iterations
+            ), 1)
+            row["speedup"] = round(row["python_us"] / row["numpy_us"], 2)
+        rows.append(row)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="候选排序基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000, 5000], help="候选数")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    rows = run(args.sizes, args.top_k, args.iterations)
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    if np is None:
+        print("未安装numpy,只测量纯Python实现")
+    print(f"{'候选数':>6} {'python(us)':>11} {'numpy(us)':>10} {'加速':>6}")
+    for row in rows:
+        print(f"{row['candidates']:>6} {row['python_us']:>11} {row.get('numpy_us', '-'):>10} {row.get('speedup', '-'):>6}x")
+
+
+if __name__ == "__main__":
+    main()
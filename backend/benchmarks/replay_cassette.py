@@ -0,0 +1,116 @@
+"""离线回放cassette,比较当前规划流水线与录制时的延迟和输出
+
+录制(真实环境或压测替身均可,建议使用memory缓存):
+    CASSETTE_MODE=record CASSETTE_PATH=/tmp/trips.jsonl uvicorn app.api.main:app
+    CASSETTE_MODE=record CASSETTE_PATH=/tmp/trips.jsonl python -m benchmarks.load_test --scenarios trip
+
+回放(在backend目录下执行,不访问LLM和高德):
+    python -m benchmarks.replay_cassette /tmp/trips.jsonl
+    python -m benchmarks.replay_cassette /tmp/trips.jsonl --speed 1 --json
+
+cassette中每条"plan"记录是一次完整规划的请求与最终计划;回放时用同样的请求重新执行
+MultiAgentTripPlanner,其中的Agent与MCP调用由cassette返回。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def _attraction_names(plan: Dict[str, Any]) -> List[str]:
+    return [a.get("name", "") for day in plan.get("days") or [] for a in day.get("attractions") or []]
+
+
+def compare_plans(recorded: Dict[str, Any], replayed: Dict[str, Any]) -> Dict[str, Any]:
+    """输出差异: 完全一致、天数、景点重合度"""
+    before, after = _attraction_names(recorded), _attraction_names(replayed)
+    overlap = len(set(before) & set(after)) / len(set(before) | set(after)) if (before or after) else 1.0
+    return {
+        "identical": recorded == replayed,
+        "days": [len(recorded.get("days") or []), len(replayed.get("days") or [])],
+        "attraction_overlap": round(overlap, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", type=Path)
+    parser.add_argument("--speed", type=float, default=0.0, help="回放耗时倍率: 0立即返回, 1按录制速度")
+    parser.add_argument("--limit", type=int, default=0, help="最多回放的规划数,0为全部")
+    parser.add_argument("--json", action="store_true", help="输出JSON结果")
+    args = parser.parse_args()
+
+    # 回放不访问外部服务,但初始化LLM/高德客户端仍需要配置项存在
+    os.environ.update({
+        "CASSETTE_MODE": "replay",
+        "CASSETTE_PATH": str(args.cassette),
+        "CASSETTE_REPLAY_SPEED": str(args.speed),
+        "CACHE_BACKEND": "memory",
+    })
+    for name, value in (
+        ("LLM_API_KEY", "replay"),
+        ("LLM_BASE_URL", "http://127.0.0.1:9/v1"),
+        ("LLM_MODEL_ID", "replay"),
+        ("AMAP_API_KEY", "replay"),
+    ):
+        os.environ.setdefault(name, value)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from app.agents.trip_planner_agent import MultiAgentTripPlanner
+    from app.logging_config import setup_logging
+    from app.models.schemas import TripRequest
+    from app.services.cassette import Cassette, get_cassette
+
+    setup_logging()
+    plans = [entry for entry in Cassette.entries(args.cassette) if entry.get("kind") == "plan"]
+    if args.limit:
+        plans = plans[: args.limit]
+    if not plans:
+        parser.error("cassette中没有plan记录(录制时需经过 /api/trip/plan 或规划任务接口)")
+
+    planner = MultiAgentTripPlanner()
+    rows = []
+    for entry in plans:
+        request = TripRequest.model_validate(entry["request"]["request"])
+        started = time.perf_counter()
+        plan = planner.plan_trip(request)
+        elapsed = time.perf_counter() - started
+        rows.append({
+            "city": request.city,
+            "recorded_ms": round(entry["duration"] * 1000, 1),
+            "replayed_ms": round(elapsed * 1000, 1),
+            **compare_plans(entry["response"], plan.model_dump(mode="json")),
+        })
+
+    cassette = get_cassette()
+    summary = {
+        "plans": len(rows),
+        "identical": sum(row["identical"] for row in rows),
+        "recorded_total_ms": round(sum(row["recorded_ms"] for row in rows), 1),
+        "replayed_total_ms": round(sum(row["replayed_ms"] for row in rows), 1),
+        "replayed_interactions": cassette.replayed,
+        "misses": cassette.misses,
+    }
+
+    if args.json:
+        print(json.dumps({"summary": summary, "plans": rows}, ensure_ascii=False, indent=2))
+        return
+    print(f"{'城市':<8}{'录制(ms)':>12}{'回放(ms)':>12}{'一致':>6}{'景点重合':>10}")
+    for row in rows:
+        print(
+            f"{row['city']:<8}{row['recorded_ms']:>12.1f}{row['replayed_ms']:>12.1f}"
+            f"{'是' if row['identical'] else '否':>6}{row['attraction_overlap']:>10.3f}"
+        )
+    print(
+        f"\n共{summary['plans']}个规划, 输出一致{summary['identical']}个; "
+        f"回放交互{summary['replayed_interactions']}次, 未命中{summary['misses']}次"
+    )
+
+
+if __name__ == "__main__":
+    main()
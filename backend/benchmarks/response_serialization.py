@@ -0,0 +1,103 @@
+"""响应序列化基准: 对比FastAPI默认路径(按response_model再校验+标准json)与FastJSONResponse的CPU耗时
+
+用法(在backend目录下执行):
+    python -m benchmarks.response_serialization
+    python -m benchmarks.response_serialization --days 3 7 30 --iterations 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.api.responses import FastJSONResponse
+from app.models.schemas import TripPlan, TripPlanResponse, VoicePlanResponse
+from benchmarks.fake_llm_server import _planner_reply
+
+
+def build_plan(days: int, seed: int = 0) -> TripPlan:
+    """用假LLM的规划输出构造指定天数的计划"""
+    user = f"- 城市: 北京\n- 日期: 2026-01-01 至 2026-01-01\n- 天数: {days}\n"
+    reply = _planner_reply(user, random.Random(seed))
+    return TripPlan.model_validate_json(reply.split("```json\n", 1)[1].rsplit("\n```", 1)[0])
+
+
+def _default_path(model) -> Callable[[], bytes]:
+    """FastAPI对返回模型对象的处理: 按response_model校验并转成dict,再由JSONResponse编码"""
+    field = create_model_field(name="Response", type_=type(model), mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    async def serialize() -> bytes:
+        content = await serialize_response(field=field, response_content=model, is_coroutine=True)
+        return JSONResponse(content).body
+
+    return lambda: loop.run_until_complete(serialize())
+
+
+def _fast_path(model) -> Callable[[], bytes]:
+    return lambda: FastJSONResponse(model).body
+
+
+def cpu_time_us(func: Callable[[], bytes], iterations: int) -> float:
+    func()
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def run(days_list: List[int], iterations: int) -> List[Dict[str, object]]:
+    results = []
+    for days in days_list:
+        plan = build_plan(days)
+        responses = {
+            "TripPlanResponse": TripPlanResponse(success=True, message="旅行计划生成成功", data=plan),
+            "VoicePlanResponse": VoicePlanResponse(success=True, message="语音规划成功", transcript="北京三日游", data=plan),
+        }
+        for name, model in responses.items():
+            default, fast = _default_path(model), _fast_path(model)
+            # 两条路径输出的JSON内容必须一致
+            assert json.loads(default()) == json.loads(fast()), f"{name} 序列化结果不一致"
+            default_us = cpu_time_us(default, iterations)
+            fast_us = cpu_time_us(fast, iterations)
+            results.append({
+                "days": days,
+                "response": name,
+                "bytes": len(fast()),
+                "default_us": round(default_us, 1),
+                "fast_us": round(fast_us, 1),
+                "speedup": round(default_us / fast_us, 2) if fast_us else None,
+            })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="响应序列化基准")
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 7, 30], help="计划天数")
+    parser.add_argument("--iterations", type=int, default=300, help="每种情况的重复次数")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    results = run(args.days, args.iterations)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    print(f"{'天数':>4} {'响应':<18} {'大小(B)':>8} {'默认(us)':>10} {'Fast(us)':>10} {'加速':>6}")
+    for row in results:
+        print(
+            f"{row['days']:>4} {row['response']:<18} {row['bytes']:>8} "
+            f"{row['default_us']:>10} {row['fast_us']:>10} {row['speedup']:>6}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
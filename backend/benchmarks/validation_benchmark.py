@@ -0,0 +1,118 @@
+"""计划校验基准: LLM输出解析为TripPlan的CPU耗时(按计划天数),用于防止校验路径退化
+
+对比:
+- legacy: json.loads得到dict后TripPlan(**data),且对冲判定与最终采用各解析一次(改造前的路径)
+- single: JSON文本直接TripPlan.model_validate_json,每个输出只解析一次
+另外单独测量温度字段解析(parse_temperature)的单次耗时。
+
+用法(在backend目录下执行):
+    python -m benchmarks.validation_benchmark
+    python -m benchmarks.validation_benchmark --days 3 7 30 --budget-us-per-day 40   # 超出预算时退出码为1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+from app.models.schemas import TripPlan, TripPlanResponse, WeatherInfo
+from benchmarks.fake_llm_server import _planner_reply
+
+
+def llm_output(days: int, seed: int = 0) -> str:
+    """构造与LLM输出相同形态的JSON文本(温度带单位,需要经过parse_temperature)"""
+    user = f"- 城市: 北京\n- 日期: 2026-01-01 至 2026-01-01\n- 天数: {days}\n"
+    data = json.loads(_planner_reply(user, random.Random(seed)).split("```json\n", 1)[1].rsplit("\n```", 1)[0])
+    for weather in data["weather_info"]:
+        weather["day_temp"] = f"{weather['day_temp']}°C"
+        weather["night_temp"] = f"{weather['night_temp']}℃"
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _legacy(text: str) -> TripPlanResponse:
+    plan = TripPlan(**json.loads(text))  # 对冲判定时解析一次
+    plan = TripPlan(**json.loads(text))  # 采用结果时再解析一次
+    return TripPlanResponse(success=True, message="ok", data=plan)
+
+
+def _single(text: str) -> TripPlanResponse:
+    return TripPlanResponse(success=True, message="ok", data=TripPlan.model_validate_json(text))
+
+
+def _legacy_temperature(cls, v):
+    if isinstance(v, str):
+        v = v.replace('°C', '').replace('℃', '').replace('°', '').strip()
+        try:
+            return int(v)
+        except ValueError:
+            return 0
+    return v
+
+
+def cpu_time_us(func: Callable[[], object], iterations: int) -> float:
+    func()
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def run(days_list: List[int], iterations: int) -> Dict[str, object]:
+    plans = []
+    for days in days_list:
+        text = llm_output(days)
+        assert _legacy(text) == _single(text), "两条路径的解析结果不一致"
+        legacy_us = cpu_time_us(lambda: _legacy(text), iterations)
+        single_us = cpu_time_us(lambda: _single(text), iterations)
+        plans.append({
+            "days": days,
+            "bytes": len(text.encode("utf-8")),
+            "legacy_us": round(legacy_us, 1),
+            "single_us": round(single_us, 1),
+            "single_us_per_day": round(single_us / days, 2),
+            "speedup": round(legacy_us / single_us, 2),
+        })
+
+    samples = ["25°C", "-3℃", " 18 ", "30°"]
+    current_temperature = WeatherInfo.parse_temperature.__func__
+    temperature = {
+        name: round(cpu_time_us(lambda: [func(WeatherInfo, v) for v in samples], iterations * 20) * 1000 / len(samples), 1)
+        for name, func in (("legacy_ns", _legacy_temperature), ("current_ns", current_temperature))
+    }
+    return {"plans": plans, "parse_temperature": temperature}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="计划校验基准")
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 7, 14, 30], help="计划天数")
+    parser.add_argument("--iterations", type=int, default=200, help="每种情况的重复次数")
+    parser.add_argument("--budget-us-per-day", type=float, default=None, help="单次解析每天允许的CPU耗时(微秒)")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    report = run(args.days, args.iterations)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'天数':>4} {'大小(B)':>8} {'legacy(us)':>11} {'single(us)':>11} {'us/天':>7} {'加速':>6}")
+        for row in report["plans"]:
+            print(
+                f"{row['days']:>4} {row['bytes']:>8} {row['legacy_us']:>11} {row['single_us']:>11} "
+                f"{row['single_us_per_day']:>7} {row['speedup']:>6}x"
+            )
+        temperature = report["parse_temperature"]
+        print(f"parse_temperature: legacy={temperature['legacy_ns']}ns current={temperature['current_ns']}ns")
+
+    if args.budget_us_per_day is not None:
+        over = [row for row in report["plans"] if row["single_us_per_day"] > args.budget_us_per_day]
+        if over:
+            print(f"校验耗时超出预算({args.budget_us_per_day}us/天): {[row['days'] for row in over]}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
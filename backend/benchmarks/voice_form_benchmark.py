@@ -0,0 +1,130 @@
+"""语音表单抽取基准: 对比规则快速通道与LLM通道的准确率和延迟
+
+用法(在backend目录下执行):
+    python -m benchmarks.voice_form_benchmark
+    python -m benchmarks.voice_form_benchmark --llm   # 同时评测LLM通道(需要配置LLM_API_KEY)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from app.config import get_settings
+from app.models.schemas import VoiceFormSuggestion
+from app.services.voice_rules import extract_form_by_rules
+
+DEFAULT_DATASET = Path(__file__).resolve().parent / "data" / "voice_transcripts.jsonl"
+FIELDS = ("city", "start_date", "end_date", "travel_days", "transportation", "accommodation", "preferences")
+
+
+def load_dataset(path: Path) -> List[dict]:
+    with path.open(encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def _field_matches(field: str, expected, actual) -> bool:
+    if field == "preferences":
+        return set(expected or []) <= set(actual or [])
+    return expected == actual
+
+
+def evaluate(name: str, samples: List[dict], extractor: Callable[[dict], VoiceFormSuggestion]) -> Dict[str, object]:
+    latencies: List[float] = []
+    field_hits = {field: 0 for field in FIELDS}
+    field_total = {field: 0 for field in FIELDS}
+    exact = 0
+
+    for sample in samples:
+        start = time.perf_counter()
+        form = extractor(sample)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        all_match = True
+        for field, expected in sample["expected"].items():
+            if field not in field_total:
+                continue
+            field_total[field] += 1
+            if _field_matches(field, expected, getattr(form, field)):
+                field_hits[field] += 1
+            else:
+                all_match = False
+        exact += int(all_match)
+
+    latencies.sort()
+    p95_index = max(0, int(round(0.95 * len(latencies))) - 1)
+    return {
+        "path": name,
+        "samples": len(samples),
+        "exact_match": exact / len(samples),
+        "field_accuracy": {
+            field: field_hits[field] / field_total[field]
+            for field in FIELDS if field_total[field]
+        },
+        "latency_ms": {
+            "mean": statistics.fmean(latencies),
+            "p50": statistics.median(latencies),
+            "p95": latencies[p95_index],
+        },
+    }
+
+
+def _rule_extractor(sample: dict) -> VoiceFormSuggestion:
+    return extract_form_by_rules(sample["transcript"], today=date.fromisoformat(sample["today"]))
+
+
+def _llm_extractor() -> Callable[[dict], VoiceFormSuggestion]:
+    from app.services.voice_service import get_voice_service
+
+    service = get_voice_service()
+
+    def run(sample: dict) -> VoiceFormSuggestion:
+        data = asyncio.run(service._parse_form_llm(sample["transcript"]))
+        return service._finalize_form(VoiceFormSuggestion(**data))
+
+    return run
+
+
+def print_report(report: Dict[str, object]) -> None:
+    latency = report["latency_ms"]
+    print(f"\n[{report['path']}] 样本数={report['samples']} 完全匹配率={report['exact_match']:.1%}")
+    print(f"  延迟(ms): mean={latency['mean']:.3f} p50={latency['p50']:.3f} p95={latency['p95']:.3f}")
+    for field, accuracy in report["field_accuracy"].items():
+        print(f"  {field:<15} {accuracy:.1%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="语音表单抽取基准")
+    parser.add_argument("--dataset", type=Path, default=DEFAULT_DATASET, help="JSONL标注数据")
+    parser.add_argument("--llm", action="store_true", help="同时评测LLM通道")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args()
+
+    samples = load_dataset(args.dataset)
+    threshold = get_settings().voice_rule_min_confidence
+    fast_path = sum(
+        1 for sample in samples
+        if (_rule_extractor(sample).confidence or 0.0) >= threshold
+    )
+
+    reports = [evaluate("rules", samples, _rule_extractor)]
+    if args.llm:
+        reports.append(evaluate("llm", samples, _llm_extractor()))
+
+    if args.json:
+        print(json.dumps({"fast_path_share": fast_path / len(samples), "reports": reports}, ensure_ascii=False, indent=2))
+        return
+
+    print(f"规则通道命中率(confidence>={threshold}): {fast_path}/{len(samples)}")
+    for report in reports:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -74,6 +74,8 @@ export interface TripPlan {
   weather_info: WeatherInfo[]
   overall_suggestions: string
   budget?: Budget
+  degraded?: boolean
+  degraded_reason?: string
 }
 
 export interface TripFormData {